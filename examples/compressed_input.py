@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+# Benchmark: reading compressed vs. plain files.
+#
+# All parsers in pwtools.parse and dcd.read_dcd_data() accept .gz, .bz2 and
+# .xz files, which are decompressed on the fly (no temp files). Here we write
+# a random trajectory as text (axsf) and as dcd file, compress both and compare
+# read times and throughput (MB of uncompressed data per second).
+#
+# Example output:
+#
+#   nstep=1000 natoms=100
+#   file   ext       size/MB     time/s       MB/s
+#   axsf   plain        5.95      0.186       32.0
+#   axsf   .gz          2.63      0.288       20.7
+#   axsf   .bz2         2.25      1.429        4.2
+#   axsf   .xz          2.36      0.914        6.5
+#   dcd    plain        1.22      0.000     2767.4
+#   dcd    .gz          1.04      0.010      122.8
+#   dcd    .bz2         1.04      0.092       13.3
+#   dcd    .xz          1.01      0.088       13.8
+#
+# gzip costs little, bz2 and xz are limited by decompression speed.
+#
+# usage:
+#   ./compressed_input.py [nstep [natoms]]
+
+import os, sys, shutil, tempfile, timeit
+import numpy as np
+from pwtools import io, dcd, common, crys
+
+nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+natoms = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+tmpdir = tempfile.mkdtemp(prefix='pwtools_compressed_input_')
+traj = crys.Trajectory(coords_frac=np.random.rand(nstep,natoms,3),
+                       cell=np.eye(3)*10,
+                       symbols=['H']*natoms)
+fn_txt = os.path.join(tmpdir, 'traj.axsf')
+io.write_axsf(fn_txt, traj)
+
+# fake dcd: valid header + nstep data blocks, see dcd.read_dcd_data()
+fn_dcd = os.path.join(tmpdir, 'traj.dcd')
+hdr = np.zeros(1, dtype=dcd.HEADER_DTYPE)
+hdr['natoms'] = natoms
+blk = np.zeros(nstep, dtype=[('x0', 'i4'), ('x1', 'f8', (6,)),
+                             ('x2', 'i4', (2,)), ('x3', 'f4', (natoms,)),
+                             ('x4', 'i4', (2,)), ('x5', 'f4', (natoms,)),
+                             ('x6', 'i4', (2,)), ('x7', 'f4', (natoms,)),
+                             ('x8', 'i4')])
+for name in ['x3', 'x5', 'x7']:
+    blk[name] = np.random.rand(nstep, natoms)
+with open(fn_dcd, 'wb') as fd:
+    fd.write(hdr.tobytes())
+    fd.write(blk.tobytes())
+
+readers = [('axsf', fn_txt, lambda fn: io.read_axsf(fn, use_index_file=False)),
+           ('dcd', fn_dcd, dcd.read_dcd_data)]
+print("nstep={} natoms={}".format(nstep, natoms))
+print("{:6} {:6} {:>10} {:>10} {:>10}".format('file', 'ext', 'size/MB',
+                                              'time/s', 'MB/s'))
+for name, fn, func in readers:
+    mb = os.path.getsize(fn) / 1024.0**2
+    for ext in [''] + list(common.COMPRESSION_OPENERS.keys()):
+        if ext != '':
+            with open(fn, 'rb') as fdi, common.file_open(fn + ext, 'wb') as fdo:
+                shutil.copyfileobj(fdi, fdo)
+        timing = min(timeit.repeat(lambda: func(fn + ext), number=1, repeat=3))
+        print("{:6} {:6} {:10.2f} {:10.3f} {:10.1f}".format(
+            name, ext or 'plain', os.path.getsize(fn + ext) / 1024.0**2,
+            timing, mb / timing))
+shutil.rmtree(tmpdir)
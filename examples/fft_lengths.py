@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# Benchmark: FFT lengths and real FFTs in signal and pydos.
+#
+# pad_zeros(tonext='fast') and pdos(tonext='fast') pad to the next 5-smooth
+# length (signal.fast_len()) instead of the next power of two. All FFT call
+# sites use real FFTs (signal.power_spectrum()), which compute only the
+# n//2+1 non-negative frequencies, with an optional output buffer for loops
+# and `workers` threads (or signal.FFT_WORKERS). smooth() does 1d real FFTs
+# along `axis` for kernels like kern[:,None,None] instead of FFTs over all
+# axes.
+#
+# Example output (1 core, numbers depend on nstep):
+#
+#   nstep=100000 natoms=64
+#   pdos(npad=1, ...)          len(fft)     time/s
+#   complex, tonext=True         262144      2.293
+#   real, tonext=True            262144      1.979
+#   real, tonext='fast'          200000      1.307
+#   smooth: fftconvolve()                    1.092
+#   smooth: rfft along axis                  1.059
+#
+# 'fast' is never longer than the next power of two and is much shorter for
+# nstep just above a power of two. Recent scipy's fftconvolve() also skips
+# axes of length 1, so smooth() gains only the `workers` option.
+#
+# usage:
+#   ./fft_lengths.py [nstep [natoms]]
+
+import sys, timeit
+import numpy as np
+from scipy.fftpack import fft
+from scipy.signal import fftconvolve
+from scipy.signal.windows import gaussian
+from pwtools import pydos, signal
+
+nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+natoms = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+vel = np.random.rand(nstep, natoms, 3)
+
+
+def timing(func):
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+
+def pdos_complex(vel, tonext=True):
+    # pdos(method='direct') before: complex FFT, powers of two only
+    vv = signal.pad_zeros(vel, tonext=tonext, tonext_min=2*vel.shape[0]-1)
+    return (np.abs(fft(vv, axis=0))**2.0).sum(axis=(1,2))
+
+
+print("nstep={} natoms={}".format(nstep, natoms))
+print("{:24} {:>10} {:>10}".format('pdos(npad=1, ...)', 'len(fft)', 'time/s'))
+for name, tonext, func in [('complex, tonext=True', True, pdos_complex),
+                           ('real, tonext=True', True, pydos.pdos),
+                           ("real, tonext='fast'", 'fast', pydos.pdos)]:
+    nfft = pydos._pad_len(nstep, npad=1, tonext=tonext)
+    if func is pdos_complex:
+        tt = timing(lambda: func(vel))
+    else:
+        tt = timing(lambda: func(vel, npad=1, tonext=tonext))
+    print("{:24} {:10} {:10.3f}".format(name, nfft, tt))
+kern = gaussian(501, 50)[:,None,None]
+print("{:35} {:10.3f}".format('smooth: fftconvolve()',
+                              timing(lambda: fftconvolve(vel, kern, 'valid'))))
+print("{:35} {:10.3f}".format('smooth: rfft along axis',
+                              timing(lambda: signal.smooth(vel, kern))))
@@ -1,6 +1,8 @@
 """Array text file IO. Some tools to write and read MD-like 3D arrays."""
 
+import os, warnings
 from io import StringIO
+from itertools import islice
 from configparser import ConfigParser
 import numpy as np
 
@@ -12,6 +14,7 @@ from pwtools.verbose import verbose
 HEADER_MAXLINES = 20
 HEADER_COMMENT = '#'
 TXT_MAXDIM = 3
+NPY_SUFFIX = '.npy'
 
 
 @open_and_close
@@ -131,9 +134,70 @@ def writetxt(fn, arr, axis=-1, maxdim=TXT_MAXDIM, header=True):
     fh.close()
 
 
+def _get_shape_axis(fh, axis, shape):
+    """Shape and axis from args or from file header."""
+    if shape is None or axis is None:
+        c = _read_header_config(fh)
+        sec = 'array'
+        if shape is None:
+            shape = common.str2tup(c.get(sec, 'shape'))
+        if axis is None:
+            axis = int(c.get(sec, 'axis'))
+    ndim = len(shape)
+    common.assert_cond(ndim <= TXT_MAXDIM, 'no rank > %i arrays supported'
+                       %TXT_MAXDIM)
+    # axis = -1 means the last dim
+    if axis == -1:
+        axis = ndim - 1
+    return tuple(shape), axis
+
+
+def _strip_header(txt, header_comment=HEADER_COMMENT):
+    """Remove leading comment and empty lines from `txt`."""
+    pos = 0
+    while True:
+        end = txt.find('\n', pos)
+        line = txt[pos:] if end < 0 else txt[pos:end]
+        if line.strip() == '' or line.lstrip().startswith(header_comment):
+            if end < 0:
+                return ''
+            pos = end + 1
+        else:
+            return txt[pos:]
+
+
+def _fromtxt(txt, ncols):
+    """Fast path for text with only numbers: np.fromstring() instead of
+    np.loadtxt(). Return 2d array (nrows, ncols) or None if `txt` contains
+    anything else or the number of values is not a multiple of `ncols`."""
+    with warnings.catch_warnings():
+        # fromstring() stops at the first non-number, warns and returns what
+        # it has read so far
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            arr = np.fromstring(txt, sep=' ')
+        except (DeprecationWarning, ValueError):
+            return None
+    if ncols == 0 or arr.size % ncols != 0:
+        return None
+    return arr.reshape(-1, ncols)
+
+
+def _blocks_to_3d(arr, axis):
+    """Stack of 2d blocks `arr` (nblocks, n0, n1) -> 3d array with the blocks
+    placed along `axis`. C-contiguous like :func:`arr2d_to_3d`."""
+    return np.ascontiguousarray(np.moveaxis(arr, 0, axis))
+
+
+def _npy_uptodate(fn, npy_fn):
+    return os.path.exists(fn) and os.path.exists(npy_fn) and \
+        os.stat(npy_fn).st_mtime_ns >= os.stat(fn).st_mtime_ns
+
+
 @open_and_close
 def readtxt(fh, axis=None, shape=None, header_maxlines=HEADER_MAXLINES,
-            header_comment=HEADER_COMMENT, maxdim=TXT_MAXDIM, **kwargs):
+            header_comment=HEADER_COMMENT, maxdim=TXT_MAXDIM, use_npy=False,
+            **kwargs):
     """Read arrays from .txt file using np.loadtxt().
 
     If the file stores a 3d array as consecutive 2d arrays (e.g. output from
@@ -149,34 +213,46 @@ def readtxt(fh, axis=None, shape=None, header_maxlines=HEADER_MAXLINES,
     normal text files which have no special header. Use np.loadtxt() in this
     case.
 
+    Files which contain only the header and numbers (such as written by
+    writetxt()) are read with a fast np.fromstring() path if no `kwargs` are
+    given. Else np.loadtxt() is used.
+
     Parameters
     ----------
     fh : file_like
     axis : int
     shape : tuple
+    use_npy : bool
+        Convert the text file once to a binary sidecar file ``fh.name +
+        '.npy'`` and return a read-only memory map of that (``np.load(...,
+        mmap_mode='r')``) here and in all later calls. The sidecar is
+        re-created if the text file is newer. Slicing the memory map reads
+        only the requested data, e.g. ``readtxt(fn,
+        use_npy=True)[1000:2000,...]``. Only for files with a name.
     **kwargs : keyword args passed to numpy.loadtxt(), e.g. comments='@@' to
         ignore weird lines etc.
 
     Returns
     -------
     nd array
+
+    See Also
+    --------
+    iter_readtxt
     """
     fn = common.get_filename(fh)
     verbose("[readtxt] reading: %s" %fn)
     verbose("[readtxt]    axis: %s" %str(axis))
     verbose("[readtxt]    shape: %s" %str(shape))
-    if shape is None or axis is None:
-        c = _read_header_config(fh)
-        sec = 'array'
-        if shape is None:
-            shape = common.str2tup(c.get(sec, 'shape'))
-        if axis is None:
-            axis = int(c.get(sec, 'axis'))
+    npy_fn = fn + NPY_SUFFIX
+    if use_npy and _npy_uptodate(fn, npy_fn):
+        arr = np.load(npy_fn, mmap_mode='r')
+        if shape is None or arr.shape == tuple(shape):
+            verbose("[readtxt]    using: %s" %npy_fn)
+            return arr
+    shape, axis = _get_shape_axis(fh, axis, shape)
     ndim = len(shape)
     common.assert_cond(ndim <= maxdim, 'no rank > %i arrays supported' %maxdim)
-    # axis = -1 means the last dim
-    if axis == -1:
-        axis = ndim - 1
 
     # handle empty files (no data, only special header or nothing at all)
     header_lines = []
@@ -191,7 +267,19 @@ def readtxt(fh, axis=None, shape=None, header_maxlines=HEADER_MAXLINES,
     if header_lines == []:
         verbose("[readtxt] WARNING: empty file: %s" %fn)
         return np.array([])
-    else:
+    read_arr = None
+    if kwargs == {}:
+        txt = _strip_header(fh.read(), header_comment=header_comment)
+        if header_comment not in txt:
+            if ndim == 3:
+                ncols = (shape[:axis] + shape[(axis+1):])[1]
+            else:
+                ncols = len(header_lines[0].split())
+            read_arr = _fromtxt(txt, ncols)
+            # np.loadtxt() squeezes 1 row/column
+            if read_arr is not None and ndim <= 2:
+                read_arr = read_arr.squeeze()
+    if read_arr is None:
         fh.seek(0)
         read_arr = np.loadtxt(fh, **kwargs)
 
@@ -202,9 +290,64 @@ def readtxt(fh, axis=None, shape=None, header_maxlines=HEADER_MAXLINES,
     else:
         arr = arr2d_to_3d(read_arr, shape=shape, axis=axis)
     verbose("[readtxt]    returning shape: %s" %str(arr.shape))
+    if use_npy and os.path.exists(fn):
+        try:
+            np.save(npy_fn, arr)
+            arr = np.load(npy_fn, mmap_mode='r')
+        except OSError:
+            pass
     return arr
 
 
+def iter_readtxt(fn, nblocks=1, axis=None, shape=None,
+                 header_comment=HEADER_COMMENT):
+    """Iterate over a 3d array written by :func:`writetxt`, reading
+    `nblocks` 2d blocks along `axis` at a time. Memory usage is bounded by
+    the size of `nblocks` blocks, not the whole file.
+
+    Parameters
+    ----------
+    fn : str or file_like
+    nblocks : int
+        number of 2d blocks per chunk
+    axis, shape : see :func:`readtxt`
+
+    Returns
+    -------
+    generator of 3d arrays, with ``shape[axis] <= nblocks``
+
+    Examples
+    --------
+    >>> # shape (100000, 50, 3), axis=0
+    >>> for arr in iter_readtxt('coords.txt', nblocks=1000):
+    ...     print(arr.shape)
+    (1000, 50, 3)
+    (1000, 50, 3)
+    ...
+    """
+    fh = common.file_open(fn, 'r') if isinstance(fn, str) else fn
+    try:
+        shape, axis = _get_shape_axis(fh, axis, shape)
+        common.assert_cond(len(shape) == 3, "only 3d arrays supported")
+        shape_2d_chunk = shape[:axis] + shape[(axis+1):]
+        lines = (line for line in fh if line.strip() != '' and not
+                 line.lstrip().startswith(header_comment))
+        nread = 0
+        while nread < shape[axis]:
+            nn = min(nblocks, shape[axis] - nread)
+            txt = ''.join(islice(lines, nn*shape_2d_chunk[0]))
+            arr = _fromtxt(txt, shape_2d_chunk[1])
+            if arr is None:
+                arr = np.atleast_2d(np.loadtxt(StringIO(txt)))
+            common.assert_cond(arr.shape[0] == nn*shape_2d_chunk[0],
+                               "file has less data than shape %s" %str(shape))
+            yield _blocks_to_3d(arr.reshape((nn,) + shape_2d_chunk), axis)
+            nread += nn
+    finally:
+        if fh is not fn:
+            fh.close()
+
+
 def arr2d_to_3d(arr, shape, axis=-1):
     """Reshape 2d array `arr` to 3d array of `shape`, with 2d chunks aligned
     along `axis`.
@@ -238,10 +381,5 @@ def arr2d_to_3d(arr, shape, axis=-1):
                 "input 2d array has not the correct "
                 "shape, got %s, expect %s" %(str(arr.shape),
                                              str(expect_shape)))
-    arr3d = np.empty(shape, dtype=arr.dtype)
-    sl = [slice(None)]*3
-    for ind in range(shape[axis]):
-        sl[axis] = ind
-        arr3d[tuple(sl)] = arr[ind*shape_2d_chunk[0]:(ind+1)*shape_2d_chunk[0], :]
-    return arr3d
+    return _blocks_to_3d(arr.reshape((shape[axis],) + shape_2d_chunk), axis)
 
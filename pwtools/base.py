@@ -1,7 +1,12 @@
 import os.path
+import inspect
+import re
 from pwtools import common, num
 import pickle
 import warnings
+
+# {(class, attr): [attr names]}, cache for FlexibleGetters.get_attr_deps()
+_ATTR_DEPS_CACHE = {}
 ##warnings.simplefilter('always')
 
 # Most of this class can probably be replaced by decorators.lazyprop .
@@ -319,6 +324,62 @@ class FlexibleGetters(object):
         else:
             return None
 
+    def _getter_name(self, attr):
+        return ('_get' if attr.startswith('_') else 'get_') + attr
+
+    def get_attr_deps(self, attr):
+        """Attr names which the getter of `attr` may request, found by
+        scanning the getter's source code for names used in
+        ``check_set_attr('foo')``, ``check_set_attr_lst(['foo', 'bar'])``,
+        ``raw_return('foo')`` (-> ``'_foo_raw'``) and friends. Only names
+        which have a getter are returned. This is a static analysis, so the
+        result is a superset of the getters which actually get called.
+
+        Parameters
+        ----------
+        attr : str
+
+        Returns
+        -------
+        list of str
+        """
+        key = (self.__class__, attr)
+        if key not in _ATTR_DEPS_CACHE:
+            try:
+                src = inspect.getsource(getattr(self, self._getter_name(attr)))
+            except (AttributeError, TypeError, OSError):
+                src = ''
+            deps = []
+            for name in re.findall(r"""['"](_?[a-zA-Z]\w*)['"]""", src):
+                for dep in [name, '_%s_raw' %name]:
+                    if dep != attr and dep not in deps and \
+                       hasattr(self, self._getter_name(dep)):
+                        deps.append(dep)
+            _ATTR_DEPS_CACHE[key] = deps
+        return _ATTR_DEPS_CACHE[key]
+
+    def resolve_attr_deps(self, attr_lst):
+        """Return `attr_lst` plus all attr names which their getters depend
+        on, recursively (see :meth:`get_attr_deps`). Use to find the minimal
+        set of getters needed to calculate `attr_lst`.
+
+        Parameters
+        ----------
+        attr_lst : sequence of str
+
+        Returns
+        -------
+        list of str
+        """
+        ret = []
+        todo = list(attr_lst)
+        while todo:
+            attr = todo.pop(0)
+            if attr not in ret:
+                ret.append(attr)
+                todo += self.get_attr_deps(attr)
+        return ret
+
     def get_return_attr(self, attr_name):
         """Call try_set_attr() are return self.<attr_name> if set."""
         self.try_set_attr(attr_name)
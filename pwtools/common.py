@@ -8,6 +8,10 @@ import copy
 import numpy as np
 import warnings
 import io
+import gzip
+import bz2
+import lzma
+import threading
 ##warnings.simplefilter('always')
 
 from pwtools.verbose import verbose
@@ -342,9 +346,58 @@ def get_filename(fh):
     return name
 
 
+# File suffix -> function which opens the compressed file as a stream. All
+# readers which go through file_open() or backtick() accept these.
+COMPRESSION_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    }
+
+
+def is_compressed(fn):
+    """True if the suffix of `fn` is one of COMPRESSION_OPENERS."""
+    return os.path.splitext(fn)[1] in COMPRESSION_OPENERS
+
+
+def file_open(fn, mode='r'):
+    """Like open(), but decompress ``.gz``, ``.bz2`` and ``.xz`` files on the
+    fly. Data are read as a stream, the file is never decompressed as a whole.
+    Seeking is supported, but backward seeks restart decompression at the file
+    start.
+
+    Parameters
+    ----------
+    fn : str
+        filename
+    mode : str
+        'r', 'rb', 'w', ... as in open(), text mode is the default also for
+        compressed files
+    """
+    opener = COMPRESSION_OPENERS.get(os.path.splitext(fn)[1], None)
+    if opener is None:
+        return open(fn, mode)
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return opener(fn, mode)
+
+
+def find_file(fn):
+    """Return `fn` if it exists, else the first existing compressed version
+    ``fn + suffix`` for all suffixes in COMPRESSION_OPENERS. If nothing is
+    found, return `fn`. Use to locate auxiliary files (e.g. ``PROJECT-1.ener``
+    or ``PROJECT-1.ener.gz``)."""
+    if not os.path.exists(fn):
+        for suffix in COMPRESSION_OPENERS.keys():
+            if os.path.exists(fn + suffix):
+                return fn + suffix
+    return fn
+
+
 def file_read(fn):
-    """Open file with name `fn`, return open(fn).read()."""
-    fd = open(fn, 'r')
+    """Open file with name `fn`, return open(fn).read(). Compressed files are
+    decompressed, see :func:`file_open`."""
+    fd = file_open(fn, 'r')
     txt = fd.read()
     fd.close()
     return txt
@@ -360,8 +413,9 @@ def file_write(fn, txt):
 
 
 def file_readlines(fn):
-    """Open file with name `fn`, return open(fn).readlines()."""
-    fd = open(fn, 'r')
+    """Open file with name `fn`, return open(fn).readlines(). Compressed files
+    are decompressed, see :func:`file_open`."""
+    fd = file_open(fn, 'r')
     lst = fd.readlines()
     fd.close()
     return lst
@@ -702,18 +756,65 @@ def permit_sigpipe():
 # backtick('dhwjqdhwjwqdk 2>/dev/null'). This may have been a design decision
 # in order to deal with flaky shell commands. But we should never use that in
 # tests.
-def backtick(call):
+def _feed_stdin(src, dst, chunksize=2**20):
+    """Copy file object `src` to pipe `dst` and close both. Run in a thread by
+    backtick()."""
+    try:
+        shutil.copyfileobj(src, dst, chunksize)
+    # The command may stop reading early, e.g. "grep -m1 ... | head -n1".
+    except (BrokenPipeError, ValueError):
+        pass
+    finally:
+        src.close()
+        try:
+            dst.close()
+        except BrokenPipeError:
+            pass
+
+
+def backtick(call, decompress=False):
     """Convenient shell backtick replacement. Raise exception if stderr is not
     empty.
 
+    Parameters
+    ----------
+    call : str
+        shell command
+    decompress : bool
+        If True and `call` has an argument which is an existing compressed
+        file (see :func:`file_open`), then that argument is replaced by "-"
+        and the decompressed data are streamed to the command's stdin. This
+        makes pipelines like ``grep pattern file.gz | ...`` work, as long as
+        the file is read by the first command and mentioned only once.
+
     Examples
     --------
     >>> print(backtick('ls -l'))
+    >>> print(backtick('grep -c Step log.lammps.xz', decompress=True))
     """
-    pp = subprocess.Popen(call, shell=True,
+    zfiles = [x for x in call.split() if is_compressed(x) and
+              os.path.isfile(x)] if decompress else []
+    if len(zfiles) > 0:
+        assert len(set(zfiles)) == 1 and call.split().count(zfiles[0]) == 1, \
+            ("only one compressed file argument supported: '%s'" %call)
+        call = re.sub(r'(?<!\S)%s(?!\S)' %re.escape(zfiles[0]), '-', call)
+        stdin = subprocess.PIPE
+    else:
+        stdin = None
+    pp = subprocess.Popen(call, shell=True, stdin=stdin,
             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
             preexec_fn=permit_sigpipe)
-    out,err = pp.communicate()
+    if stdin is None:
+        out,err = pp.communicate()
+    else:
+        # Feed stdin from a thread while communicate() drains stdout and
+        # stderr. Detach the pipe, else communicate() would close it.
+        feeder = threading.Thread(target=_feed_stdin,
+                                  args=(file_open(zfiles[0], 'rb'), pp.stdin))
+        pp.stdin = None
+        feeder.start()
+        out,err = pp.communicate()
+        feeder.join()
     if err.strip() != b'':
         raise Exception("Error calling command: '%s'\nError message "
             "follows:\n%s" %(call, err))
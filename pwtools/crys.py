@@ -3,6 +3,7 @@ import textwrap, time, tempfile, copy, itertools
 
 import numpy as np
 from scipy.linalg import inv
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
 
 from pwtools import common, signal, num, atomic_data, constants, _flib
 from pwtools.common import assert_cond
@@ -2435,10 +2436,21 @@ class Structure(UnitsHandler):
         if self.set_all_auto:
             self.set_all()
 
-    def set_all(self):
-        """Extend arrays, apply units, call all getters."""
+    def set_all(self, attr_lst=None):
+        """Extend arrays, apply units, call all getters or only those for
+        `attr_lst`."""
         self._extend_arrays_apply_units()
-        super(Structure, self).set_all()
+        super(Structure, self).set_all(attr_lst)
+
+    def get_attr_deps(self, attr):
+        """See :meth:`~pwtools.base.FlexibleGetters.get_attr_deps`. In a
+        Trajectory, a single cell or cryst_const needs nstep for
+        :meth:`_extend`."""
+        deps = super(Structure, self).get_attr_deps(attr)
+        if self.is_traj and attr in ['cell', 'cryst_const'] and \
+           'nstep' not in deps:
+            deps = deps + ['nstep']
+        return deps
 
     def _extend_arrays_apply_units(self):
         self.apply_units()
@@ -3211,6 +3223,162 @@ def smooth(traj, kern, method=1):
     return out
 
 
+def _stress_acf_integral(pp, dt, fac, workers=None):
+    """Autocorrelation <p(0) p(t)> of all columns of `pp` (nstep, ...,
+    ncomp) along axis 0, averaged over the last axis, and its cumulative
+    integral times `fac`."""
+    nstep = pp.shape[0]
+    acf = signal.acorr_nd(pp, axis=0, norm=False, workers=workers)
+    # sum over nstep-t products -> average
+    acf /= (nstep - np.arange(nstep)).reshape((nstep,) + (1,)*(acf.ndim-1))
+    acf = acf.mean(axis=-1)
+    cum = np.zeros_like(acf)
+    cum[1:,...] = np.cumsum(0.5*(acf[1:,...] + acf[:-1,...]), axis=0)
+    cum *= dt * fac
+    return acf, cum
+
+
+def _plateau(arr, window, tol):
+    """First window of `window` points along axis 0 of `arr` where
+    ``(max-min)/mean < tol``, for all columns of `arr` at once. If there is
+    none, use the window with the smallest relative change.
+
+    Returns
+    -------
+    start, value, found : arrays of shape arr.shape[1:]
+    """
+    nwin = arr.shape[0] - window + 1
+    # running max, min and mean over [i, i+window), filter output at index j
+    # is for [j - window//2, ...]
+    sl = slice(window//2, window//2 + nwin)
+    amax = maximum_filter1d(arr, window, axis=0)[sl,...]
+    amin = minimum_filter1d(arr, window, axis=0)[sl,...]
+    csum = np.cumsum(arr, axis=0)
+    mean = np.concatenate((csum[window-1:window,...],
+                           csum[window:,...] - csum[:-window,...]),
+                          axis=0) / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.abs((amax - amin) / mean)
+    rel[~np.isfinite(rel)] = np.inf
+    ok = rel < tol
+    found = ok.any(axis=0)
+    start = np.where(found, ok.argmax(axis=0), rel.argmin(axis=0))
+    value = np.take_along_axis(mean, start[None,...], axis=0)[0,...]
+    return start, value, found
+
+
+def green_kubo_viscosity(traj, temperature=None, volume=None, diagonal=False,
+                         nblocks=5, window=None, tol=0.05, full_out=False,
+                         workers=None):
+    r"""Shear viscosity from the Green-Kubo integral of the stress
+    autocorrelation function.
+
+    .. math::
+        \eta(t) = \frac{V}{k_B T} \int_0^t \langle P_{xy}(0) P_{xy}(t')
+        \rangle\,dt'
+
+    The autocorrelations of the equivalent components (`xy`, `xz`, `yz` and
+    optionally ``(xx-yy)/2``, ``(yy-zz)/2``) are calculated by FFT
+    (:func:`~pwtools.signal.acorr_nd`) and averaged. The plateau of the
+    running integral :math:`\eta(t)` is the first window of `window` points
+    where ``(max-min)/mean < tol``. The error is estimated by block averaging:
+    the same (ACF, integral, plateau) is done for `nblocks` blocks of the
+    trajectory at once, ``err = std/sqrt(nblocks)`` of the block results.
+
+    Parameters
+    ----------
+    traj : Trajectory
+        with `stress` [GPa], `timestep` [fs] and `volume` [Ang**3] and
+        `temperature` [K] if not given as args
+    temperature : float, optional
+        [K], default ``traj.temperature.mean()``
+    volume : float, optional
+        [Ang**3], default ``traj.volume.mean()``
+    diagonal : bool
+        use also the two independent components of the traceless diagonal
+        stress, which is correct only for isotropic systems (liquids), less
+        noise
+    nblocks : int
+        number of blocks for error estimation, also the max. correlation time
+        is the block length ``nstep//nblocks``
+    window : int, optional
+        plateau window length in steps, default: 5 times the time where the
+        ACF has decayed to ``1/e``, at least 10 steps
+    tol : float
+        plateau detection threshold
+    full_out : bool
+        see Returns
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    eta, err
+    eta, err, time, acf, eta_t, plateau : if `full_out`
+    eta : float
+        viscosity [mPa s]
+    err : float
+        error of `eta` from block averaging [mPa s]
+    time : 1d array (nstep,)
+        correlation time axis [fs]
+    acf : 1d array (nstep,)
+        averaged stress autocorrelation function [GPa**2]
+    eta_t : 1d array (nstep,)
+        running integral [mPa s]
+    plateau : slice
+        ``eta = eta_t[plateau].mean()``
+
+    Notes
+    -----
+    The ACF at long times has large statistical errors. Use a trajectory
+    many times longer than the stress correlation time and check `eta_t` and
+    `acf` with ``full_out=True``.
+    """
+    assert traj.is_traj, "need Trajectory"
+    assert traj.stress is not None, "traj.stress is None"
+    assert traj.timestep is not None, "traj.timestep is None"
+    temperature = traj.temperature.mean() if temperature is None \
+        else temperature
+    volume = traj.volume.mean() if volume is None else volume
+    dt = traj.timestep
+    sym = 0.5*(traj.stress + traj.stress.transpose(0,2,1))
+    comps = [sym[:,0,1], sym[:,0,2], sym[:,1,2]]
+    if diagonal:
+        comps += [0.5*(sym[:,0,0] - sym[:,1,1]), 0.5*(sym[:,1,1] - sym[:,2,2])]
+    # (nstep, ncomp)
+    pp = np.array(comps).T
+    nstep = pp.shape[0]
+    nblock = nstep // nblocks
+    assert nblock > 1, "too many blocks"
+    # V/(kB T) * GPa**2 * fs -> mPa s
+    fac = volume*constants.Ang**3 * constants.GPa**2 * constants.fs / \
+        (constants.kb * temperature) * 1e3
+    acf, eta_t = _stress_acf_integral(pp - pp.mean(axis=0), dt, fac,
+                                      workers=workers)
+    if window is None:
+        decayed = acf < acf[0] / np.e
+        tcorr = decayed.argmax() if decayed.any() else nblock
+        window = min(max(5*tcorr, 10), nblock)
+    assert window <= nblock, "window longer than block"
+    # (nblock, nblocks, ncomp)
+    blocks = pp[:nblock*nblocks,:].reshape(nblocks, nblock, -1).swapaxes(0,1)
+    _, eta_blocks = _stress_acf_integral(blocks - blocks.mean(axis=0), dt, fac,
+                                         workers=workers)
+    # plateau search up to the block length, where the blocks have data
+    start, eta, found = _plateau(eta_t[:nblock], window, tol)
+    if not found:
+        warnings.warn("no plateau found with tol={}, using the window with "
+                      "the smallest change".format(tol))
+    plateau = slice(int(start), int(start) + window)
+    eta = float(eta)
+    _, eta_blocks, _ = _plateau(eta_blocks, window, tol)
+    err = eta_blocks.std(ddof=1) / np.sqrt(nblocks)
+    if full_out:
+        return eta, err, np.arange(nstep)*dt, acf, eta_t, plateau
+    else:
+        return eta, err
+
+
 def mix(st1, st2, alpha):
     """Linear interpolation between two Structures based on the numbers in
     `alpha`. Returns a :class:`Trajectory`.
@@ -17,10 +17,21 @@
     >>> # pure numpy wins!
     >>> %timeit cc,co=dcd.read_dcd_data('lmp.out.dcd')
     10000 loops, best of 3: 114 µs per loop
+
+For random access to frames of big files without reading them completely,
+use :class:`DcdFile`, which memory-maps the file.
+
+All Python readers also accept compressed files (``.gz``, ``.bz2``, ``.xz``,
+see :func:`~pwtools.common.file_open`), which are decompressed on the fly.
 """
 
+import time
 import numpy as np
 import os
+from pwtools import common
+
+# bytes per read when streaming compressed files
+CHUNKSIZE = 2**24
 
 
 # DCD file header. Define structured dtype with field specs
@@ -59,6 +70,48 @@ HEADER_TYPES = [
 
 HEADER_DTYPE = np.dtype(HEADER_TYPES)
 
+# cryst_const_dcd = [a, gamma, b, beta, alpha, c] ->
+# cryst_const = cryst_const_dcd[CRYST_CONST_IDX] = [a, b, c, alpha, beta, gamma]
+CRYST_CONST_IDX = [0, 2, 5, 4, 3, 1]
+
+
+def frame_dtype(natoms):
+    """Structured dtype of one timestep data block (frame) following the
+    header.
+
+    ::
+
+        4          - initial 48
+        6*8        - cryst_const_dcd
+        7*4        - markers between x,y,z and at the end of the block
+        3*4*natoms - float32 cartesian coords
+
+    Parameters
+    ----------
+    natoms : int
+
+    Returns
+    -------
+    np.dtype
+    """
+    return np.dtype([('blk0',            'i4'           ),  # 48
+                     ('cryst_const_dcd', 'f8',      (6,)),  # unit cell
+                     ('blk1',            'i4',      (2,)),  # 48, natoms*4
+                     ('x',               'f4', (natoms,)),  # x
+                     ('blk2',            'i4',      (2,)),  # natoms*4 (2x)
+                     ('y',               'f4', (natoms,)),  # y
+                     ('blk3',            'i4',      (2,)),  # natoms*4 (2x)
+                     ('z',               'f4', (natoms,)),  # z
+                     ('blk4',            'i4'           )]) # natoms*4
+
+
+def _fromfile(fd, dtype, count):
+    """np.fromfile() replacement which works with all file objects, also
+    compressed ones, which np.fromfile() can't handle."""
+    dtype = np.dtype(dtype)
+    buf = fd.read(dtype.itemsize*count)
+    return np.frombuffer(buf, dtype, len(buf) // dtype.itemsize)
+
 
 def read_dcd_header(fn):
     """Shortcut function for reading the header from `fn`, using HEADER_DTYPE.
@@ -72,8 +125,8 @@ def read_dcd_header(fn):
     -------
     ret : dict
     """
-    fd = open(fn, 'rb')
-    arr = np.fromfile(fd, HEADER_DTYPE, 1)
+    fd = common.file_open(fn, 'rb')
+    arr = _fromfile(fd, HEADER_DTYPE, 1)
     fd.close()
     return dict((key,arr[0][key]) for key in arr.dtype.names)
 
@@ -104,8 +157,8 @@ def read_dcd_data_ref(fn, convang=False):
     >>> cc,co = read_dcd_data_ref('cp2k.dcd', convang=False)
     >>> cc,co = read_dcd_data_ref('lammps.dcd', convang=True)
     """
-    fd = open(fn, 'rb')
-    natoms = np.fromfile(fd, HEADER_DTYPE, 1)[0]['natoms']
+    fd = common.file_open(fn, 'rb')
+    natoms = _fromfile(fd, HEADER_DTYPE, 1)[0]['natoms']
     # data per timestep
     data_dtype = np.dtype([
        ('blk0-0',          'i4'           ),   # 48 = 6*8 bytes = 6*float64
@@ -126,7 +179,7 @@ def read_dcd_data_ref(fn, convang=False):
     tmp_coords = np.empty((natoms,3), dtype=np.float32)
     tmp_cryst_const = np.empty((6,), dtype=np.float64)
     while True:
-        _data = np.fromfile(fd, data_dtype, 1)
+        _data = _fromfile(fd, data_dtype, 1)
         if len(_data) == 0:
             break
         else:
@@ -152,7 +205,8 @@ def read_dcd_data_ref(fn, convang=False):
 
 def read_dcd_data(fn, convang=False):
     """Read dcd file. Fastest version. Calculates nstep from bytes between
-    end-of-header and EOF.
+    end-of-header and EOF. Compressed files are streamed in blocks of
+    timesteps.
 
     Parameters
     ----------
@@ -176,52 +230,314 @@ def read_dcd_data(fn, convang=False):
     >>> cc,co = read_dcd_data('cp2k.dcd', convang=False)
     >>> cc,co = read_dcd_data('lammps.dcd', convang=True)
     """
-    fd = open(fn, 'rb')
-    natoms = np.fromfile(fd, HEADER_DTYPE, 1)[0]['natoms']
-    fd_pos = fd.tell()
-    # seek to end
-    fd.seek(0, os.SEEK_END)
-    # number of bytes between fd_pos and end
-    fd_rest = fd.tell() - fd_pos
-    # reset to pos after header
-    fd.seek(fd_pos)
-    # calculate nstep: fd_rest / bytes_per_timestep
-    # 4 - initial 48
-    # 6*8 - cryst_const_dcd
-    # 7*4 - markers between x,y,z and at the end of the block
-    # 3*4*natoms - float32 cartesian coords
-    nstep = fd_rest / (4 + 6*8 + 7*4 + 3*4*natoms*1.0)
-    assert nstep % 1.0 == 0.0, ("calculated nstep is not int, cannot "
-                                "read file '{}'".format(fn))
-    nstep = int(nstep)
-    # dtype for fromfile: nstep times dtype of a timestep data block
-    dtype = \
-        np.dtype(([('x0', 'i4'),
-                   ('x1', 'f8', (6,)),
-                   ('x2', 'i4', (2,)),
-                   ('x3', 'f4', (natoms,)),
-                   ('x4', 'i4', (2,)),
-                   ('x5', 'f4', (natoms,)),
-                   ('x6', 'i4', (2,)),
-                   ('x7', 'f4', (natoms,)),
-                   ('x8', 'i4')],
-                   (nstep,)))
-    arr = np.fromfile(fd, dtype, 1)
+    fd = common.file_open(fn, 'rb')
+    natoms = _fromfile(fd, HEADER_DTYPE, 1)[0]['natoms']
+    dtype = frame_dtype(natoms)
+    if common.is_compressed(fn):
+        arr, nbytes_left = _read_frames_stream(fd, dtype)
+        assert nbytes_left == 0, ("calculated nstep is not int, cannot read "
+                                  "file '{}'".format(fn))
+    else:
+        fd_pos = fd.tell()
+        # seek to end
+        fd.seek(0, os.SEEK_END)
+        # number of bytes between fd_pos and end
+        fd_rest = fd.tell() - fd_pos
+        # reset to pos after header
+        fd.seek(fd_pos)
+        # calculate nstep: fd_rest / bytes_per_timestep
+        nstep = fd_rest / (dtype.itemsize*1.0)
+        assert nstep % 1.0 == 0.0, ("calculated nstep is not int, cannot "
+                                    "read file '{}'".format(fn))
+        nstep = int(nstep)
+        arr = np.fromfile(fd, dtype, nstep)
     fd.close()
-    cryst_const = np.empty((nstep,6), dtype=np.float64)
-    cryst_const[:,0] = arr['x1'][0,:,0]
-    cryst_const[:,1] = arr['x1'][0,:,2]
-    cryst_const[:,2] = arr['x1'][0,:,5]
-    cryst_const[:,3] = arr['x1'][0,:,4]
-    cryst_const[:,4] = arr['x1'][0,:,3]
-    cryst_const[:,5] = arr['x1'][0,:,1]
-    coords = np.empty((nstep,natoms,3), dtype=np.float32)
-    coords[...,0] = arr['x3'][0,...]
-    coords[...,1] = arr['x5'][0,...]
-    coords[...,2] = arr['x7'][0,...]
+    return _frames2cc(arr, convang), _frames2coords(arr)
+
+
+def _read_frames_stream(fd, dtype):
+    """Read all frames of `dtype` from the current position of file object
+    `fd` to EOF. Used for compressed files, where the size of the data is
+    unknown. Read blocks of many frames at once.
+
+    Returns
+    -------
+    arr, nbytes_left
+        | arr : (nstep,) array of `dtype`
+        | nbytes_left : number of bytes after the last complete frame
+    """
+    nread = max(1, CHUNKSIZE // dtype.itemsize)
+    arrs = []
+    nbytes_left = 0
+    while True:
+        buf = fd.read(nread*dtype.itemsize)
+        nfull = len(buf) // dtype.itemsize
+        nbytes_left = len(buf) - nfull*dtype.itemsize
+        if nfull > 0:
+            arrs.append(np.frombuffer(buf, dtype, nfull))
+        if len(buf) < nread*dtype.itemsize:
+            break
+    arr = np.concatenate(arrs) if len(arrs) > 0 else np.empty(0, dtype)
+    return arr, nbytes_left
+
+
+def _frames2cc(arr, convang=False):
+    """(nstep,6) cryst_const from array of frame_dtype records."""
+    cryst_const = arr['cryst_const_dcd'][:,CRYST_CONST_IDX]
     if convang:
         cryst_const[:,3:] = np.arccos(cryst_const[:,3:])*180.0/np.pi
-    return cryst_const, coords
+    return cryst_const
+
+
+def _frames2coords(arr):
+    """(nstep,natoms,3) coords from array of frame_dtype records."""
+    coords = np.empty(arr.shape + arr.dtype['x'].shape + (3,),
+                      dtype=np.float32)
+    coords[...,0] = arr['x']
+    coords[...,1] = arr['y']
+    coords[...,2] = arr['z']
+    return coords
+
+
+class _LazyFrames(object):
+    """Array-like object of shape (nstep, ...). Data are created only for the
+    frames selected by indexing (first axis), using ``func(frames)``, where
+    `frames` is an int array of frame indices.
+
+    Use ``np.asarray(obj)`` or ``obj[:]`` to get all frames.
+    """
+    def __init__(self, func, shape, dtype):
+        self._func = func
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.ndim = len(shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, idx):
+        idx = idx if isinstance(idx, tuple) else (idx,)
+        if len(idx) > 0 and idx[0] is Ellipsis:
+            return self._func(np.arange(self.shape[0]))[idx]
+        fidx = np.arange(self.shape[0])[idx[0] if len(idx) > 0 else
+                                        slice(None)]
+        if fidx.ndim == 0:
+            return self._func(fidx[None])[0][idx[1:]]
+        else:
+            return self._func(fidx)[(slice(None),) + idx[1:]]
+
+    def __array__(self, dtype=None):
+        arr = self[:]
+        return arr if dtype is None else arr.astype(dtype)
+
+
+class DcdFile(object):
+    """Random access to dcd files via np.memmap.
+
+    The file is mapped as an array of per-frame records (see
+    :func:`frame_dtype`) after the header, which is instant also for huge
+    files. :attr:`coords` and :attr:`cryst_const` are lazy array-like objects,
+    data is read from disk only for the frames selected by indexing. A
+    truncated last frame (crashed run) is ignored.
+
+    Compressed files (see :func:`~pwtools.common.file_open`) can't be mapped,
+    they are read into memory once.
+
+    Attributes
+    ----------
+    nstep, natoms : int
+    timestep : float
+        from the header
+    header : dict
+        see :func:`read_dcd_header`
+    frames : (nstep,) array (np.memmap) of :func:`frame_dtype` records
+    coords : array-like (nstep,natoms,3)
+        float32, cartesian coords Angstrom
+    cryst_const : array-like (nstep,6)
+        float64, (a,b,c,alpha,beta,gamma), Angstrom, degrees
+
+    Examples
+    --------
+    >>> d = DcdFile('lmp.out.dcd', convang=True)
+    >>> d.nstep, d.natoms
+    (1000000, 1024)
+    >>> # only these frames are read from disk
+    >>> coords = d.coords[1000:2000:10]
+    >>> cc = d.cryst_const[-1]
+    >>> # the same as read_dcd_data(), reads all frames
+    >>> cc, coords = d.read()
+    """
+    def __init__(self, filename, convang=False):
+        """
+        Parameters
+        ----------
+        filename : str
+        convang : bool
+            see :func:`read_dcd_data`
+        """
+        self.filename = filename
+        self.convang = convang
+        self.header = read_dcd_header(filename)
+        self.natoms = int(self.header['natoms'])
+        self.timestep = float(self.header['timestep'])
+        dtype = frame_dtype(self.natoms)
+        if common.is_compressed(filename):
+            with common.file_open(filename, 'rb') as fd:
+                fd.seek(HEADER_DTYPE.itemsize)
+                self.frames, nbytes_left = _read_frames_stream(fd, dtype)
+        else:
+            nstep = (os.path.getsize(filename) - HEADER_DTYPE.itemsize) \
+                // dtype.itemsize
+            if nstep > 0:
+                self.frames = np.memmap(filename, dtype=dtype, mode='r',
+                                        offset=HEADER_DTYPE.itemsize,
+                                        shape=(nstep,))
+            else:
+                self.frames = np.empty(0, dtype)
+        self.nstep = self.frames.shape[0]
+        self.coords = _LazyFrames(self._get_coords,
+                                  (self.nstep, self.natoms, 3), np.float32)
+        self.cryst_const = _LazyFrames(self._get_cryst_const,
+                                       (self.nstep, 6), np.float64)
+
+    def __len__(self):
+        return self.nstep
+
+    def _get_coords(self, fidx):
+        return _frames2coords(self.frames[fidx])
+
+    def _get_cryst_const(self, fidx):
+        return _frames2cc(self.frames[fidx], self.convang)
+
+    def read(self, frames=None):
+        """Read selected `frames`.
+
+        Parameters
+        ----------
+        frames : int, slice, sequence of ints, optional
+            default all
+
+        Returns
+        -------
+        ret : (cryst_const, coords)
+            See :func:`read_dcd_data`.
+        """
+        fidx = np.arange(self.nstep)[slice(None) if frames is None else
+                                     frames]
+        fidx = np.atleast_1d(fidx)
+        return self._get_cryst_const(fidx), self._get_coords(fidx)
+
+
+def write_dcd_data(fn, cryst_const, coords, timestep=1.0, convang=False,
+                   append=False, remarks=None, chunksize=1000):
+    """Write dcd file (CHARMM format with unit cell records, as written by
+    CP2K and LAMMPS). Counterpart of :func:`read_dcd_data`.
+
+    Frames are converted and written in chunks of `chunksize`, so no full copy
+    of `coords` is made. With ``append=True``, frames are appended to an
+    existing file and the frame counters in the header are updated, which
+    allows writing a long trajectory piece by piece.
+
+    Parameters
+    ----------
+    fn : str
+        filename, compressed files (see :func:`~pwtools.common.file_open`)
+        can be written, but not appended to
+    cryst_const : (nstep,6) array
+        (a,b,c,alpha,beta,gamma), Angstrom, degrees, ValueError if None
+    coords : (nstep,natoms,3) array
+        cartesian coords Angstrom, written as float32
+    timestep : float
+        written to the header (not used by any of our readers)
+    convang : bool
+        write cosines of the angles instead of degrees (LAMMPS), read back with
+        ``read_dcd_data(..., convang=True)``
+    append : bool
+        append to `fn` if it exists
+    remarks : sequence of 2 str, optional
+        title lines (max. 80 chars), default: "Created by pwtools" + date
+    chunksize : int
+        number of frames converted at once
+
+    Examples
+    --------
+    >>> write_dcd_data('traj.dcd', traj.cryst_const, traj.coords)
+    >>> # append more
+    >>> write_dcd_data('traj.dcd', cc2, coords2, append=True)
+    >>> cc, coords = read_dcd_data('traj.dcd')
+    """
+    if cryst_const is None:
+        raise ValueError("cryst_const is None: we write and read only dcd "
+                         "files with unit cell records")
+    nstep, natoms = coords.shape[:2]
+    assert coords.shape == (nstep, natoms, 3), ("coords must have shape "
+        "(nstep,natoms,3), got {}".format(coords.shape))
+    assert cryst_const.shape == (nstep, 6), ("cryst_const must have shape "
+        "(nstep,6), got {}".format(cryst_const.shape))
+    dtype = frame_dtype(natoms)
+    if append and os.path.exists(fn):
+        assert not common.is_compressed(fn), ("can't append to compressed "
+                                              "file '{}'".format(fn))
+        fd = open(fn, 'r+b')
+        hdr = _fromfile(fd, HEADER_DTYPE, 1).copy()
+        assert hdr['natoms'][0] == natoms, ("natoms in file ({}) != natoms "
+            "in coords ({})".format(hdr['natoms'][0], natoms))
+        nstep_file = (os.path.getsize(fn) - HEADER_DTYPE.itemsize) \
+            // dtype.itemsize
+        # skip a truncated last frame
+        fd.seek(HEADER_DTYPE.itemsize + nstep_file*dtype.itemsize)
+        fd.truncate()
+    else:
+        fd = common.file_open(fn, 'wb')
+        hdr = np.zeros(1, dtype=HEADER_DTYPE)
+        remarks = ["Created by pwtools",
+                   time.asctime()] if remarks is None else remarks
+        hdr['blk0-0'] = 84
+        hdr['hdr'] = b'CORD'
+        # istart=0, nsavc=1
+        hdr['9int'][0,2] = 1
+        hdr['timestep'] = timestep
+        # unit cell flag, CHARMM version
+        hdr['10int'][0,0] = 1
+        hdr['10int'][0,9] = 24
+        hdr['blk0-1'] = 84
+        hdr['blk1-0'] = 164
+        hdr['ntitle'] = 2
+        hdr['remark1'] = remarks[0].encode()[:80].ljust(80)
+        hdr['remark2'] = remarks[1].encode()[:80].ljust(80)
+        hdr['blk1-1'] = 164
+        hdr['blk2-0'] = 4
+        hdr['natoms'] = natoms
+        hdr['blk2-1'] = 4
+        nstep_file = 0
+    # number of frames, last step
+    nstep_tot = nstep_file + nstep
+    hdr['9int'][0,0] = nstep_tot
+    hdr['9int'][0,3] = max(nstep_tot - 1, 0)*hdr['9int'][0,2]
+    # fd is at the end of the file (append) or at 0 (new file)
+    pos = fd.tell()
+    fd.seek(0)
+    fd.write(hdr.tobytes())
+    fd.seek(max(pos, HEADER_DTYPE.itemsize))
+    frames = np.empty(min(chunksize, nstep), dtype=dtype)
+    frames['blk0'] = 48
+    frames['blk1'] = [48, natoms*4]
+    frames['blk2'] = natoms*4
+    frames['blk3'] = natoms*4
+    frames['blk4'] = natoms*4
+    for start in range(0, nstep, chunksize):
+        sl = slice(start, min(start+chunksize, nstep))
+        arr = frames[:sl.stop-sl.start]
+        cc = np.asarray(cryst_const[sl], dtype=np.float64)
+        if convang:
+            cc = cc.copy()
+            cc[:,3:] = np.cos(cc[:,3:]*np.pi/180.0)
+        arr['cryst_const_dcd'][:,CRYST_CONST_IDX] = cc
+        arr['x'] = coords[sl,:,0]
+        arr['y'] = coords[sl,:,1]
+        arr['z'] = coords[sl,:,2]
+        fd.write(arr.tobytes())
+    fd.close()
 
 
 def read_dcd_data_f(fn, convang=False, nstephdr=False):
@@ -251,6 +567,8 @@ def read_dcd_data_f(fn, convang=False, nstephdr=False):
     >>> # more safe if you don't trust nstep from the header
     >>> cc,co = read_dcd_data_f('lammps.dcd', convang=True, nstephdr=False)
     """
+    assert not common.is_compressed(fn), ("compressed files not supported, "
+                                          "use read_dcd_data()")
     from pwtools import _dcd
     nstep, natoms, timestep = _dcd.get_dcd_file_info(fn, nstephdr)
     return _dcd.read_dcd_data(fn, nstep, natoms, convang)
@@ -1,8 +1,8 @@
 import types
-import gzip
 import textwrap
 import os
 from functools import wraps
+from pwtools import common
 
 def open_and_close(func):
     """Decorator for all parsing functions that originally got a file name and
@@ -43,14 +43,16 @@ def open_and_close(func):
         if isinstance(largs[0], str):
             # Filename case.
             fn = largs[0]
-            if fn.endswith('.gz'):
-                _open = gzip.open
-            else:
-                _open = open
-            fd = _open(fn, 'r')
-            # Files opened with gzip don't have a 'name' attr.
+            # Transparently decompress .gz, .bz2, .xz files.
+            fd = common.file_open(fn, 'r')
+            # Files opened with gzip and friends may not have a 'name' attr,
+            # which cannot be set in text mode. common.get_filename() deals
+            # with that.
             if not hasattr(fd, 'name'):
-                fd.name = os.path.abspath(os.path.expanduser(fn))
+                try:
+                    fd.name = os.path.abspath(os.path.expanduser(fn))
+                except AttributeError:
+                    pass
             largs[0] = fd
             ret = func(*tuple(largs), **kwargs)
             largs[0].close()
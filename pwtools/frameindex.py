@@ -0,0 +1,419 @@
+"""Byte-offset frame indices for text trajectory files.
+
+Text trajectories (XYZ files from CP2K or :func:`~pwtools.io.write_xyz`,
+animated XSF files from :func:`~pwtools.io.write_axsf`, LAMMPS dumps) store one
+frame after the other. To access frame ``i``, one has to know where it starts
+in the file, which normally means reading everything up to that point. Here we
+walk the file once in large binary chunks, record the byte offset of each frame
+and store that index in a sidecar file ``<filename>.idx`` (a numpy ``npz``
+file). The index is re-used as long as size and modification time of the data
+file don't change. Later reads seek directly to the requested frames, so
+``XyzFile(fn)[1000:2000:10]`` reads only those 100 frames.
+
+Compressed files (``.gz``, ``.bz2``, ``.xz``) work as well, but seeking in them
+means decompressing everything up to the seek position.
+
+Examples
+--------
+>>> xyz = XyzFile('PROJECT-pos-1.xyz')
+>>> xyz.nstep, xyz.natoms
+(100000, 57)
+>>> # (100,57,3)
+>>> coords = xyz[1000:2000:10]
+>>> ax = AxsfFile('traj.axsf')
+>>> dct = ax.read(frames=[0,-1])
+>>> dct['cell'].shape, dct['coords'].shape
+((2,3,3), (2,57,3))
+"""
+
+import os
+import numpy as np
+from pwtools import common
+
+INDEX_SUFFIX = '.idx'
+CHUNKSIZE = 2**24
+
+
+def find_marker_offsets(filename, marker, chunksize=CHUNKSIZE):
+    """Byte offsets of all lines in `filename` which start with `marker`.
+
+    Parameters
+    ----------
+    filename : str
+    marker : bytes
+        e.g. ``b'ITEM: TIMESTEP'``
+    chunksize : int
+        bytes read at once
+
+    Returns
+    -------
+    offsets, filesize : (N,) int64 array, int
+    """
+    offsets = []
+    pos = 0
+    tail = b''
+    with common.file_open(filename, 'rb') as fd:
+        while True:
+            chunk = fd.read(chunksize)
+            if not chunk:
+                break
+            # Keep the end of the last chunk to catch markers which straddle
+            # chunk boundaries. A marker at idx=0 in a later chunk lies
+            # completely in `tail` and was found before.
+            buf = tail + chunk
+            start = pos - len(tail)
+            idx = buf.find(marker)
+            while idx >= 0:
+                if (buf[idx-1:idx] == b'\n') if idx > 0 else (start == 0):
+                    offsets.append(start + idx)
+                idx = buf.find(marker, idx + 1)
+            tail = buf[-len(marker):]
+            pos += len(chunk)
+    return np.array(offsets, dtype=np.int64), pos
+
+
+def find_line_offsets(filename, period, nskip=0, chunksize=CHUNKSIZE):
+    """Byte offsets of lines ``nskip + k*period``, k=0,1,2,... in
+    `filename`. Use for formats with a fixed number of lines per frame.
+
+    If the file ends with a complete frame, the last offset is the file size,
+    i.e. the start of the next, non-existing frame. Thus, there are
+    ``len(offsets)-1`` complete frames and frame ``k`` is
+    ``offsets[k]:offsets[k+1]``. The end of the file terminates a last line
+    without newline, such that a last frame is treated as incomplete (crashed
+    run) only if lines are missing.
+
+    Parameters
+    ----------
+    filename : str
+    period : int
+        number of lines per frame
+    nskip : int
+        number of header lines before the first frame
+    chunksize : int
+        bytes read at once
+
+    Returns
+    -------
+    offsets, filesize : (N,) int64 array, int
+    """
+    offsets = [np.array([0] if nskip == 0 else [], dtype=np.int64)]
+    # number of newlines seen so far
+    nlines = 0
+    pos = 0
+    last = b''
+    with common.file_open(filename, 'rb') as fd:
+        while True:
+            chunk = fd.read(chunksize)
+            if not chunk:
+                break
+            nl = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+            # number of the line which starts after each newline
+            lineno = nlines + 1 + np.arange(len(nl))
+            msk = (lineno >= nskip) & ((lineno - nskip) % period == 0)
+            offsets.append(nl[msk].astype(np.int64) + pos + 1)
+            nlines += len(nl)
+            pos += len(chunk)
+            last = chunk[-1:]
+    if last not in [b'', b'\n']:
+        lineno = nlines + 1
+        if lineno >= nskip and (lineno - nskip) % period == 0:
+            offsets.append(np.array([pos], dtype=np.int64))
+    return np.concatenate(offsets), pos
+
+
+def _file_stamp(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+def read_index_file(filename, kind, index_filename=None):
+    """Load index of `filename` from its sidecar file. Return None if there is
+    no index file or if it is outdated (size or modification time of
+    `filename` changed) or was written for another `kind` of file.
+
+    Parameters
+    ----------
+    filename : str
+        data file
+    kind : str
+        file format identifier, e.g. the reader's class name
+    index_filename : str, optional
+        default ``filename + '.idx'``
+
+    Returns
+    -------
+    dict or None
+    """
+    index_filename = filename + INDEX_SUFFIX if index_filename is None \
+        else index_filename
+    if not os.path.exists(index_filename):
+        return None
+    try:
+        with np.load(index_filename, allow_pickle=False) as npz:
+            dct = dict((key, npz[key]) for key in npz.files)
+    except (OSError, ValueError):
+        return None
+    size, mtime = _file_stamp(filename)
+    if dct.pop('_size', None) != size or dct.pop('_mtime', None) != mtime \
+       or dct.pop('_kind', None) != kind:
+        return None
+    return dct
+
+
+def write_index_file(filename, dct, kind, index_filename=None):
+    """Write index `dct` (dict of arrays) of `filename` to its sidecar file,
+    together with size and modification time of `filename`. Silently do
+    nothing if the sidecar cannot be written (e.g. read-only directory).
+
+    Parameters
+    ----------
+    filename : str
+        data file
+    dct : dict
+    kind : str
+        see :func:`read_index_file`
+    index_filename : str, optional
+        default ``filename + '.idx'``
+    """
+    index_filename = filename + INDEX_SUFFIX if index_filename is None \
+        else index_filename
+    size, mtime = _file_stamp(filename)
+    try:
+        # file object instead of name: np.savez would append ".npz"
+        with open(index_filename, 'wb') as fd:
+            np.savez(fd, _size=size, _mtime=mtime, _kind=kind, **dct)
+    except OSError:
+        pass
+
+
+class IndexedTextFile(object):
+    """Base class for text trajectory files with a byte-offset frame index.
+
+    Derived classes implement :meth:`_build_index`, which must return a dict
+    of arrays and at least contain `offsets` and `nbytes` (start and length in
+    bytes of each frame), and :meth:`read`. All entries of the index dict
+    become instance attributes.
+    """
+    def __init__(self, filename, use_index_file=True, chunksize=CHUNKSIZE):
+        """
+        Parameters
+        ----------
+        filename : str
+        use_index_file : bool
+            Read the frame index from ``filename + '.idx'`` if present and up
+            to date, else build it and write it there.
+        chunksize : int
+            bytes read at once when building the frame index
+        """
+        self.filename = filename
+        self.chunksize = chunksize
+        self.index_filename = filename + INDEX_SUFFIX
+        kind = self.__class__.__name__
+        dct = read_index_file(filename, kind) if use_index_file else None
+        if dct is None:
+            dct = self._build_index()
+            if use_index_file:
+                write_index_file(filename, dct, kind)
+        self._set_index(dct)
+
+    def _build_index(self):
+        raise NotImplementedError
+
+    def _set_index(self, dct):
+        for key,val in dct.items():
+            setattr(self, key, val)
+        self.nstep = len(self.offsets)
+
+    def _frame_idx(self, frames):
+        if frames is None:
+            frames = slice(None)
+        return np.atleast_1d(np.arange(self.nstep)[frames])
+
+    def _read_frame(self, fd, idx):
+        fd.seek(self.offsets[idx])
+        return fd.read(self.nbytes[idx])
+
+    def read(self, frames=None):
+        raise NotImplementedError
+
+    def __len__(self):
+        return self.nstep
+
+    def __getitem__(self, frames):
+        return self.read(frames=frames)
+
+
+class XyzFile(IndexedTextFile):
+    """Multi-frame XYZ file with a constant number of atoms, as written by
+    CP2K (``PROJECT-{pos,vel,frc}-1.xyz``), VMD or
+    :func:`~pwtools.io.write_xyz`::
+
+        natoms
+        comment
+        sym x y z
+        ...
+
+    Attributes
+    ----------
+    nstep, natoms : int
+    symbols : list of str
+        atom symbols from the first frame
+    offsets, nbytes : (nstep,) int64 arrays
+        frame start (the `natoms` line) and length in bytes
+    """
+    def _build_index(self):
+        with common.file_open(self.filename, 'rb') as fd:
+            natoms = int(fd.readline())
+        offsets,filesize = find_line_offsets(self.filename, period=natoms+2,
+                                             chunksize=self.chunksize)
+        return {'offsets': offsets[:-1],
+                'nbytes': np.diff(offsets),
+                'natoms': np.array(natoms)}
+
+    def _set_index(self, dct):
+        super(XyzFile, self)._set_index(dct)
+        self.natoms = int(self.natoms)
+        self._symbols = None
+
+    def _parse_frame(self, txt):
+        # skip natoms and comment lines
+        txt = txt.split(b'\n', 2)[2]
+        arr = np.array(txt.split()).reshape(self.natoms, -1)
+        return arr
+
+    @property
+    def symbols(self):
+        if self._symbols is None:
+            if self.nstep > 0:
+                with common.file_open(self.filename, 'rb') as fd:
+                    arr = self._parse_frame(self._read_frame(fd, 0))
+                self._symbols = [x.decode() for x in arr[:,0]]
+        return self._symbols
+
+    def read(self, frames=None):
+        """Read frames.
+
+        Parameters
+        ----------
+        frames : int, slice, sequence of ints, optional
+            frame selection, default all
+
+        Returns
+        -------
+        arr : (nframes, natoms, ncols) float array
+            all columns after the atom symbol, usually ncols = 3
+        """
+        fidx = self._frame_idx(frames)
+        out = None
+        with common.file_open(self.filename, 'rb') as fd:
+            for ii,idx in enumerate(fidx):
+                arr = self._parse_frame(self._read_frame(fd, idx))[:,1:]
+                if out is None:
+                    out = np.empty((len(fidx),) + arr.shape, dtype=float)
+                out[ii,...] = arr
+        return np.empty((0, self.natoms, 3)) if out is None else out
+
+
+class AxsfFile(IndexedTextFile):
+    """Animated XSF file with variable cell as written by
+    :func:`~pwtools.io.write_axsf`::
+
+        ANIMSTEPS nstep
+        CRYSTAL
+        PRIMVEC 1
+        <3x3 cell>
+        PRIMCOORD 1
+        natoms 1
+        sym x y z [fx fy fz]
+        ...
+        PRIMVEC 2
+        ...
+
+    Units are those of the file: Angstrom and Ha / Angstrom.
+
+    Attributes
+    ----------
+    nstep, natoms : int
+    symbols : list of str
+    offsets, nbytes : (nstep,) int64 arrays
+        frame start (the ``PRIMVEC`` line) and length in bytes
+    """
+    def _build_index(self):
+        offsets,filesize = find_marker_offsets(self.filename, b'PRIMVEC',
+                                               chunksize=self.chunksize)
+        nbytes = np.diff(np.concatenate((offsets, [filesize])))
+        natoms = 0
+        if len(offsets) > 0:
+            with common.file_open(self.filename, 'rb') as fd:
+                fd.seek(offsets[0])
+                lines = [fd.readline() for ii in range(6)]
+            if not lines[4].startswith(b'PRIMCOORD'):
+                raise Exception("{}: only variable cell axsf files with "
+                                "PRIMVEC + PRIMCOORD in each step "
+                                "supported".format(self.filename))
+            natoms = int(lines[5].split()[0])
+            # drop truncated last frame, the end of the file terminates a last
+            # line w/o newline
+            with common.file_open(self.filename, 'rb') as fd:
+                fd.seek(offsets[-1])
+                txt = fd.read(nbytes[-1])
+            nlines = txt.count(b'\n') + int(txt[-1:] not in [b'', b'\n'])
+            if nlines < natoms + 6:
+                offsets = offsets[:-1]
+                nbytes = nbytes[:-1]
+        return {'offsets': offsets,
+                'nbytes': nbytes,
+                'natoms': np.array(natoms)}
+
+    def _set_index(self, dct):
+        super(AxsfFile, self)._set_index(dct)
+        self.natoms = int(self.natoms)
+        self._symbols = None
+
+    def _parse_frame(self, txt):
+        lines = txt.split(b'\n', 6 + self.natoms)
+        cell = np.array(b' '.join(lines[1:4]).split(), dtype=float).reshape(3,3)
+        atoms = np.array(b' '.join(lines[6:6+self.natoms]).split())
+        return cell, atoms.reshape(self.natoms, -1)
+
+    @property
+    def symbols(self):
+        if self._symbols is None:
+            if self.nstep > 0:
+                with common.file_open(self.filename, 'rb') as fd:
+                    cell,arr = self._parse_frame(self._read_frame(fd, 0))
+                self._symbols = [x.decode() for x in arr[:,0]]
+        return self._symbols
+
+    def read(self, frames=None):
+        """Read frames.
+
+        Parameters
+        ----------
+        frames : int, slice, sequence of ints, optional
+            frame selection, default all
+
+        Returns
+        -------
+        dct : dict
+            | cell : (nframes,3,3)
+            | coords : (nframes,natoms,3)
+            | forces : (nframes,natoms,3) or None if not in the file
+        """
+        fidx = self._frame_idx(frames)
+        cell = np.empty((len(fidx),3,3), dtype=float)
+        ccf = None
+        with common.file_open(self.filename, 'rb') as fd:
+            for ii,idx in enumerate(fidx):
+                _cell,arr = self._parse_frame(self._read_frame(fd, idx))
+                if ccf is None:
+                    ccf = np.empty((len(fidx), self.natoms, arr.shape[1]-1),
+                                   dtype=float)
+                cell[ii,...] = _cell
+                ccf[ii,...] = arr[:,1:]
+        if ccf is None:
+            ccf = np.empty((0, self.natoms, 3))
+        return {'cell': cell,
+                'coords': ccf[...,:3],
+                'forces': ccf[...,3:6] if ccf.shape[-1] >= 6 else None}
@@ -1,18 +1,18 @@
 """High level Structure and Trajectory I/O. HDF5 convenience IO functions."""
 
-import warnings, os
+import warnings, os, collections.abc, concurrent.futures, functools
 try:
     import h5py
 except ImportError:
     pass
 
-import pickle
+import pickle, json
 import numpy as np
 from pwtools.common import frepr, cpickle_load
 from pwtools.constants import Ha, eV
-from pwtools import parse, atomic_data, lammps
+from pwtools import parse, atomic_data, lammps, frameindex, dcd
 from pwtools import crys
-from pwtools import common
+from pwtools import common, num
 from pwtools import pwscf
 ##warnings.simplefilter('always')
 
@@ -151,6 +151,53 @@ def write_cif(filename, struct):
     common.file_write(filename, cf.WriteOut(wraplength=2048))
 
 
+# number of floats formatted per chunk in the bulk text writers
+WRITE_CHUNKSIZE = 2**18
+
+
+def _frames_str(head_fmt, head_vals, symbols, arr, delim='  '):
+    """Text for a chunk of frames: per frame a header and one line per atom
+    (symbol + row of `arr`).
+
+    Bulk version of :func:`~pwtools.pwscf.atpos_str_fast` for many frames.
+    All numbers are converted to strings in one go and the whole text is
+    created by a single string formatting operation.
+
+    Parameters
+    ----------
+    head_fmt : str
+        format string of the frame header
+    head_vals : array (nframes, nhead)
+        values for `head_fmt`, one row per frame
+    symbols : sequence (natoms,)
+    arr : array (nframes, natoms, ncols)
+    delim : str
+        delimiter between columns of atom lines
+
+    Returns
+    -------
+    str
+    """
+    nframes, natoms, ncols = arr.shape
+    nhead = head_vals.shape[1]
+    atoms = np.empty((nframes, natoms, ncols+1), dtype='U32')
+    atoms[...,0] = symbols
+    atoms[...,1:] = arr
+    vals = np.empty((nframes, nhead + natoms*(ncols+1)), dtype=object)
+    vals[:,:nhead] = head_vals
+    vals[:,nhead:] = atoms.reshape(nframes, -1)
+    frame_fmt = head_fmt + (delim.join(['%s']*(ncols+1)) + '\n')*natoms
+    return (frame_fmt*nframes) %tuple(vals.ravel())
+
+
+def _iter_chunks(nstep, nitems):
+    """Yield slices over `nstep` frames with about WRITE_CHUNKSIZE items
+    (`nitems` per frame) each."""
+    step = max(1, WRITE_CHUNKSIZE // max(nitems, 1))
+    for start in range(0, nstep, step):
+        yield slice(start, min(start + step, nstep))
+
+
 def write_xyz(filename, obj, name='pwtools_dummy_mol_name'):
     """Write VMD-style [VMD] XYZ file.
 
@@ -168,14 +215,15 @@ def write_xyz(filename, obj, name='pwtools_dummy_mol_name'):
     [VMD] http://www.ks.uiuc.edu/Research/vmd/plugins/molfile/xyzplugin.html
     """
     traj = crys.struct2traj(obj)
-    xyz_str = ""
-    for istep in range(traj.nstep):
-        xyz_str += "%i\n%s\n%s" %(traj.natoms,
-                                  name + '.%i' %(istep + 1),
-                                  pwscf.atpos_str_fast(traj.symbols,
-                                                       traj.coords[istep,...]),
-                                  )
-    common.file_write(filename, xyz_str)
+    head_fmt = "%i\n" + name.replace('%', '%%') + ".%i\n"
+    with open(filename, 'w') as fd:
+        for sl in _iter_chunks(traj.nstep, traj.natoms*3):
+            steps = np.arange(sl.start, sl.stop) + 1
+            head_vals = np.empty((len(steps), 2), dtype=object)
+            head_vals[:,0] = traj.natoms
+            head_vals[:,1] = steps
+            fd.write(_frames_str(head_fmt, head_vals, traj.symbols,
+                                 traj.coords[sl,...]))
 
 
 def write_axsf(filename, obj):
@@ -201,10 +249,9 @@ def write_axsf(filename, obj):
     #     is (fractional or cartesian Angstrom). Only the latter case results
     #     in a correctly displayed structure in xcrsyden. So we use that.
     #
-    # Speed: The only time-consuming step is calling atpos_str*() in the loop
-    #     b/c that transforms *every* single float to a string, which
-    #     effectively is a double loop over `ccf`. No way to get faster w/ pure
-    #     Python.
+    # Speed: The only time-consuming step is transforming *every* single
+    #     float to a string. We do that for chunks of frames at once, see
+    #     _frames_str().
     #
     traj = crys.struct2traj(obj)
     # ccf = cartesian coords + forces (6 columns)
@@ -212,15 +259,119 @@ def write_axsf(filename, obj):
         ccf = np.concatenate((traj.coords, traj.forces*eV/Ha), axis=-1)
     else:
         ccf = traj.coords
-    axsf_str = "ANIMSTEPS %i\nCRYSTAL" %traj.nstep
-    for istep in range(traj.nstep):
-        axsf_str += "\nPRIMVEC %i\n%s" %(istep+1,
-                                         common.str_arr(traj.cell[istep,...]))
-        axsf_str += "\nPRIMCOORD %i\n%i 1\n%s" %(istep+1,
-                                                 traj.natoms,
-                                                 pwscf.atpos_str_fast(traj.symbols,
-                                                                      ccf[istep,...]))
-    common.file_write(filename, axsf_str)
+    # PRIMVEC block like common.str_arr(cell), PRIMCOORD like
+    # pwscf.atpos_str_fast()
+    head_fmt = "\nPRIMVEC %i\n" + \
+               '\n'.join([(' '*4).join(['%.16e']*3)]*3) + \
+               "\nPRIMCOORD %i\n%i 1\n"
+    cell = common.fix_eps(np.asarray(traj.cell, dtype=float), eps=num.EPS)
+    with open(filename, 'w') as fd:
+        fd.write("ANIMSTEPS %i\nCRYSTAL" %traj.nstep)
+        for sl in _iter_chunks(traj.nstep, traj.natoms*ccf.shape[-1]):
+            steps = np.arange(sl.start, sl.stop) + 1
+            head_vals = np.empty((len(steps), 12), dtype=object)
+            head_vals[:,0] = steps
+            head_vals[:,1:10] = cell[sl,...].reshape(len(steps), 9)
+            head_vals[:,10] = steps
+            head_vals[:,11] = traj.natoms
+            fd.write(_frames_str(head_fmt, head_vals, traj.symbols,
+                                 ccf[sl,...]))
+
+
+def read_xyz(filename, frames=None, use_index_file=True):
+    """Read multi-frame XYZ file, e.g. written by :func:`write_xyz` or CP2K's
+    ``PROJECT-pos-1.xyz``.
+
+    Only the selected `frames` are read, using a byte-offset frame index which
+    is cached in ``filename + '.idx'``. See
+    :class:`~pwtools.frameindex.XyzFile`.
+
+    length: Angstrom
+
+    Parameters
+    ----------
+    filename : str
+    frames : int, slice, sequence of ints, optional
+        frame selection, default all
+    use_index_file : bool
+        read/write the index sidecar file
+
+    Returns
+    -------
+    Trajectory (no cell)
+
+    Examples
+    --------
+    >>> tr = read_xyz('PROJECT-pos-1.xyz', frames=slice(1000,2000,10))
+    """
+    xyz = frameindex.XyzFile(filename, use_index_file=use_index_file)
+    return crys.Trajectory(coords=xyz.read(frames=frames)[...,:3],
+                           symbols=xyz.symbols)
+
+
+def read_axsf(filename, frames=None, use_index_file=True):
+    """Read animated XSF file written by :func:`write_axsf`.
+
+    Only the selected `frames` are read, using a byte-offset frame index which
+    is cached in ``filename + '.idx'``. See
+    :class:`~pwtools.frameindex.AxsfFile`. Forces are converted back from Ha
+    / Ang to eV / Ang.
+
+    Parameters
+    ----------
+    filename : str
+    frames : int, slice, sequence of ints, optional
+        frame selection, default all
+    use_index_file : bool
+        read/write the index sidecar file
+
+    Returns
+    -------
+    Trajectory
+    """
+    axsf = frameindex.AxsfFile(filename, use_index_file=use_index_file)
+    dct = axsf.read(frames=frames)
+    kwds = dict(coords=dct['coords'], cell=dct['cell'], symbols=axsf.symbols)
+    if dct['forces'] is not None:
+        kwds['forces'] = dct['forces']*Ha/eV
+    return crys.Trajectory(**kwds)
+
+
+def write_dcd(filename, obj, convang=False, append=False, **kwds):
+    """Write binary DCD file (CHARMM format with unit cell, as written by CP2K
+    and LAMMPS, readable by VMD) for Structure (only 1 step) or Trajectory.
+    Much smaller and faster than :func:`write_xyz` or :func:`write_axsf`.
+    Atom symbols are not stored.
+
+    length: Angstrom
+
+    Parameters
+    ----------
+    filename : target file name
+    obj : Structure or Trajectory
+        must have a cell, ValueError otherwise
+    convang : bool
+        store cosines of angles (LAMMPS) instead of degrees (CP2K), read back
+        with :func:`~pwtools.dcd.read_dcd_data` using the same `convang`
+    append : bool
+        append frames to an existing file, write a long trajectory in pieces
+    **kwds : passed to :func:`~pwtools.dcd.write_dcd_data`
+
+    Examples
+    --------
+    >>> io.write_dcd('traj.dcd', traj)
+    >>> for ii, tr in enumerate(traj_chunks):
+    ...     io.write_dcd('traj.dcd', tr, append=(ii > 0))
+    >>> cryst_const, coords = dcd.read_dcd_data('traj.dcd')
+    """
+    traj = crys.struct2traj(obj)
+    if not traj.is_set_attr('cryst_const'):
+        raise ValueError("{} has no cell, DCD files need a unit "
+                         "cell".format(type(obj).__name__))
+    if 'timestep' not in kwds and traj.is_set_attr('timestep'):
+        kwds['timestep'] = traj.timestep
+    dcd.write_dcd_data(filename, traj.cryst_const, traj.coords,
+                       convang=convang, append=append, **kwds)
 
 
 def write_lammps(filename, struct, symbolsbasename='lmp.struct.symbols'):
@@ -315,6 +466,275 @@ def load_h5(*args, **kwds):
     return read_h5(*args, **kwds)
 
 
+class LazyH5(collections.abc.Mapping):
+    """Lazy read-only dict-like view of an h5 file, see :func:`open_h5`."""
+    def __init__(self, fn, cache=0):
+        """
+        Parameters
+        ----------
+        fn : str
+            filename
+        cache : int, optional
+            Keep the last `cache` fully read datasets in memory (LRU). 0 means
+            no caching.
+        """
+        self.fh = h5py.File(fn, mode='r')
+        self.cache = cache
+        self._cache = collections.OrderedDict()
+        self._keys = None
+
+    @staticmethod
+    def _norm_key(key):
+        return key if key.startswith('/') else '/'+key
+
+    def _get_keys(self):
+        # Only names are visited, no data is read.
+        if self._keys is None:
+            keys = []
+            def get(name, obj, keys=keys):
+                if isinstance(obj, h5py.Dataset):
+                    keys.append(self._norm_key(name))
+            self.fh.visititems(get)
+            self._keys = keys
+        return self._keys
+
+    def dataset(self, key):
+        """The ``h5py.Dataset`` for `key`."""
+        key = self._norm_key(key)
+        dset = self.fh.get(key)
+        if not isinstance(dset, h5py.Dataset):
+            raise KeyError(key)
+        return dset
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            key, idx = key[0], key[1:]
+            idx = idx[0] if len(idx) == 1 else idx
+            key = self._norm_key(key)
+            if key in self._cache:
+                return self._cache[key][idx]
+            return self.dataset(key)[idx]
+        key = self._norm_key(key)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        val = self.dataset(key)[()]
+        if self.cache > 0:
+            self._cache[key] = val
+            if len(self._cache) > self.cache:
+                self._cache.popitem(last=False)
+        return val
+
+    def __contains__(self, key):
+        return isinstance(self.fh.get(self._norm_key(key)), h5py.Dataset)
+
+    def __iter__(self):
+        return iter(self._get_keys())
+
+    def __len__(self):
+        return len(self._get_keys())
+
+    def close(self):
+        self._cache.clear()
+        self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_h5(fn, cache=0):
+    """Open h5 file as lazy dict-like object.
+
+    Same keys as returned by :func:`read_h5` ('/a/b/c/dset'), but a dataset is
+    read only when accessed. Opening the file doesn't read any data, so this
+    is much faster than :func:`read_h5` for big files if only a few keys are
+    needed.
+
+    Parameters
+    ----------
+    fn : str
+        filename
+    cache : int, optional
+        Keep the last `cache` read datasets in memory (LRU), see
+        :class:`LazyH5`.
+
+    Returns
+    -------
+    :class:`LazyH5`
+
+    Examples
+    --------
+    >>> with open_h5('foo.h5', cache=10) as dct:
+    ...     x = dct['/a/b/d1']
+    ...     # read only part of a dataset
+    ...     y = dct['/a/b/d2', 100:200, 0]
+    ...     z = dct.dataset('/x/y/z')
+    >>> d = dict(open_h5('foo.h5'))     # same as read_h5('foo.h5')
+    """
+    return LazyH5(fn, cache=cache)
+
+
+def _h5_chunk_nstep(shape, itemsize, nbytes=2**20):
+    """Number of time steps per chunk for an (nstep,...) array such that a
+    chunk has about `nbytes`."""
+    framebytes = itemsize * int(np.prod(shape[1:]))
+    return max(1, min(nbytes // framebytes, max(shape[0], 64)))
+
+
+def write_traj_h5(fn, traj, group='/', append=False, compression=None,
+                  compression_opts=None, chunk_nstep=None, **kwds):
+    """Write Trajectory (or Structure) to HDF5 file.
+
+    Each array in ``traj.attrs_nstep`` is stored as dataset ``<group>/<name>``
+    with shape (nstep,...), chunked along the time axis and resizable along it,
+    such that frames can be appended later. Non-time-dependent data
+    (symbols, timestep, units, natoms, nstep) are stored as HDF5 attributes of
+    `group`. Read with :func:`read_traj_h5`.
+
+    Parameters
+    ----------
+    fn : str
+        filename
+    traj : Trajectory or Structure
+    group : str, optional
+        HDF5 group to write to, several Trajectories can live in one file
+    append : bool, optional
+        Append frames of `traj` to existing datasets in `group`. The group is
+        created if nonexistent. `traj` must have the same natoms and at least
+        all attrs stored in the file. Use this for streaming parsers which
+        yield chunks of a long trajectory.
+    compression, compression_opts : optional
+        compression filter and options for ``h5py.Group.create_dataset``,
+        e.g. ``compression='gzip', compression_opts=4`` or
+        ``compression='lzf'``, default is no compression
+    chunk_nstep : int, optional
+        Number of time steps per chunk, default is about 1 MB per chunk. Small
+        values speed up reading short windows of frames, large values improve
+        compression.
+    **kwds :
+        keywords to ``h5py.File``, mode='a' is default (see :func:`write_h5`)
+
+    Examples
+    --------
+    >>> io.write_traj_h5('traj.h5', traj, compression='gzip')
+    >>> for chunk in some_parser():
+    ...     io.write_traj_h5('traj.h5', chunk, append=True)
+    """
+    traj = crys.struct2traj(traj)
+    mode = kwds.pop('mode') if 'mode' in kwds else 'a'
+    fh = h5py.File(fn, mode=mode, **kwds)
+    try:
+        grp = fh.require_group(group)
+        names = [name for name in traj.attrs_nstep if traj.is_set_attr(name)]
+        if append and 'nstep' in grp.attrs:
+            assert grp.attrs['natoms'] == traj.natoms, \
+                "natoms in file and traj differ: {} {}".format(
+                    grp.attrs['natoms'], traj.natoms)
+            # only our datasets, not sub-groups of other Trajectories
+            stored = [name for name, obj in grp.items() if
+                      isinstance(obj, h5py.Dataset) and
+                      name in traj.attrs_nstep]
+            for name in stored:
+                assert name in names, \
+                    "attr '{}' in file but not set in traj".format(name)
+                arr = getattr(traj, name)
+                dset = grp[name]
+                assert dset.shape[1:] == arr.shape[1:], \
+                    "shape mismatch for '{}': {} {}".format(name, dset.shape,
+                                                            arr.shape)
+                nstep_old = dset.shape[0]
+                dset.resize(nstep_old + arr.shape[0], axis=0)
+                dset[nstep_old:,...] = arr
+            grp.attrs['nstep'] = grp.attrs['nstep'] + traj.nstep
+        else:
+            for name in names:
+                arr = np.asarray(getattr(traj, name))
+                chunks = (_h5_chunk_nstep(arr.shape, arr.itemsize) \
+                          if chunk_nstep is None else chunk_nstep,) \
+                          + arr.shape[1:]
+                grp.create_dataset(name, data=arr, chunks=chunks,
+                                   maxshape=(None,) + arr.shape[1:],
+                                   compression=compression,
+                                   compression_opts=compression_opts)
+            grp.attrs['natoms'] = traj.natoms
+            grp.attrs['nstep'] = traj.nstep
+            grp.attrs['units'] = json.dumps(traj.units)
+            if traj.is_set_attr('symbols'):
+                grp.attrs['symbols'] = list(traj.symbols)
+            if traj.is_set_attr('timestep'):
+                grp.attrs['timestep'] = traj.timestep
+    finally:
+        fh.close()
+
+
+def read_traj_h5(fn, group='/', frames=None, lazy=True):
+    """Read Trajectory written by :func:`write_traj_h5`.
+
+    Parameters
+    ----------
+    fn : str
+        filename
+    group : str, optional
+        HDF5 group
+    frames : slice, optional
+        Read only these time steps into memory, e.g. ``slice(1000,2000)``.
+        Only the chunks covering that window are read.
+    lazy : bool, optional
+        If `frames` is None and lazy=True, don't read any array data. All
+        ``attrs_nstep`` arrays are ``h5py.Dataset`` objects which read data
+        only when sliced, e.g. ``traj.coords[1000:2000]``. The file stays open
+        as long as the datasets are referenced. Slicing the Trajectory
+        (``traj[1000:2000]``) returns a Trajectory with numpy arrays. Use
+        lazy=False to read all into memory.
+
+    Returns
+    -------
+    Trajectory
+
+    Notes
+    -----
+    Derived attrs which depend on time-dependent arrays and were not set when
+    writing (e.g. ``coords_frac`` if only ``coords`` was written) are None in
+    lazy mode. Use lazy=False or slice the Trajectory to calculate them.
+    """
+    fh = h5py.File(fn, mode='r')
+    grp = fh[group]
+    traj = crys.Trajectory(set_all_auto=False)
+    for name in grp.keys():
+        if name in traj.attrs_nstep:
+            dset = grp[name]
+            if frames is not None:
+                arr = dset[frames,...]
+            elif lazy:
+                arr = dset
+            else:
+                arr = dset[()]
+            setattr(traj, name, arr)
+    if 'symbols' in grp.attrs:
+        traj.symbols = [str(ss) for ss in grp.attrs['symbols']]
+    if 'timestep' in grp.attrs:
+        traj.timestep = float(grp.attrs['timestep'])
+        if frames is not None and frames.step is not None:
+            traj.timestep *= frames.step
+    traj.units.update(json.loads(grp.attrs['units']))
+    traj.units_applied = True
+    if frames is None and lazy:
+        traj.natoms = int(grp.attrs['natoms'])
+        traj.nstep = int(grp.attrs['nstep'])
+        # only cheap attrs which don't touch array data
+        for name in ['symbols_unique', 'order', 'typat', 'znucl',
+                     'znucl_unique', 'nspecies', 'ntypat', 'mass',
+                     'mass_unique']:
+            setattr(traj, name, getattr(traj, 'get_' + name)())
+    else:
+        fh.close()
+        traj.set_all()
+    return traj
+
+
 def read_pickle(filename):
     """Load object written by ``pickle.dump()``, e.g. files written by
     :meth:`~pwtools.base.FlexibleGetters.dump()`."""
@@ -349,6 +769,10 @@ class ReadFactory(object):
         ----------
         filename : str
             Name of the file to parse.
+        attrs : sequence of str, optional
+            Parse only these attributes, e.g. ``['etot', 'stress']``, skip
+            all others (they will be None). Much faster for big files.
+            Default: parse all.
         **kwds : keywords args
             passed to the parser class (e.g. units=...)
 
@@ -358,19 +782,21 @@ class ReadFactory(object):
               :class:`~pwtools.crys.Trajectory` (MD-like runs)
         """
 
-    def __call__(self, filename, **kwds):
+    def __call__(self, filename, attrs=None, **kwds):
         """
         Parameters
         ----------
         filename : str
             Name of the file to parse.
+        attrs : sequence of str, optional
+            Parse only these attributes.
         **kwds : keywords args
             passed to the parser class (e.g. units=...)
         """
         if self.struct_or_traj == 'struct':
-            return self.parser(filename, **kwds).get_struct()
+            return self.parser(filename, **kwds).get_struct(attr_lst=attrs)
         elif self.struct_or_traj == 'traj':
-            return self.parser(filename, **kwds).get_traj()
+            return self.parser(filename, **kwds).get_traj(attr_lst=attrs)
         else:
             raise Exception("unknown struct_or_traj: %s" %struct_or_traj)
 
@@ -428,3 +854,426 @@ read_lammps_md_dcd = ReadFactory(parser=parse.LammpsDcdMDOutputFile,
                                  doc="Read LAMMPS MD run ouput (coordinates in dcd format)."
                                  )
 
+
+
+#-----------------------------------------------------------------------------
+# Bulk CIF and PDB readers
+#-----------------------------------------------------------------------------
+
+def _cif_filenames(path):
+    if isinstance(path, str):
+        if os.path.isdir(path):
+            return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if _basename(name).endswith('.cif')]
+        else:
+            return [path]
+    else:
+        return list(path)
+
+
+def _cif_file_blocks(filename):
+    return [(filename, name, arrs) for name, arrs in
+            parse.iter_cif_blocks(filename)]
+
+
+def _iter_cif_arrays(path, nprocs=1):
+    filenames = _cif_filenames(path)
+    if nprocs > 1:
+        chunksize = max(1, min(64, len(filenames) // (4*nprocs)))
+        with concurrent.futures.ProcessPoolExecutor(nprocs) as ex:
+            for lst in ex.map(_cif_file_blocks, filenames, chunksize=chunksize):
+                for item in lst:
+                    yield item
+    else:
+        for filename in filenames:
+            for name, arrs in parse.iter_cif_blocks(filename):
+                yield filename, name, arrs
+
+
+def iter_cif(path, nprocs=1, names=False):
+    """Iterate over all structures in one or many (multi-block) CIF files.
+
+    Much faster than :data:`read_cif` (PyCifRW) since we use a small tokenizer
+    (:func:`~pwtools.parse.cif_parse_blocks`), which only extracts cell,
+    symbols and atom positions. Symmetry operations are ignored, i.e. the
+    files must contain all atoms in the cell (as for :data:`read_cif`). Data
+    blocks without cell or atoms are skipped.
+
+    Parameters
+    ----------
+    path : str or sequence of str
+        CIF file name, list of file names or directory (all ``*.cif`` files,
+        also compressed ones)
+    nprocs : int
+        Parse files with that many processes. Use for directories with many
+        files.
+    names : bool
+        Yield ``(filename, blockname, struct)`` instead of `struct`.
+
+    Returns
+    -------
+    generator of :class:`~pwtools.crys.Structure`
+        in file order, within a file in data block order
+
+    Examples
+    --------
+    >>> for fn, block, st in io.iter_cif('cifs/', nprocs=4, names=True):
+    ...     print(fn, block, st.volume)
+    """
+    for filename, name, arrs in _iter_cif_arrays(path, nprocs=nprocs):
+        struct = crys.Structure(**arrs)
+        yield (filename, name, struct) if names else struct
+
+
+def _arrays2traj(lst):
+    """List of dicts from parse.iter_cif_blocks() or parse.iter_pdb_models()
+    -> Trajectory."""
+    assert len(lst) > 0, "no structures found"
+    keys = set(key for key in lst[0].keys() if lst[0][key] is not None)
+    symbols = lst[0]['symbols']
+    for dct in lst[1:]:
+        assert dct['symbols'] == symbols, \
+            "all structures must have the same atoms"
+        assert set(key for key in dct.keys() if dct[key] is not None) \
+            == keys, "structures have different data (coords_frac, coords, cell)"
+    kwds = dict((key, np.array([dct[key] for dct in lst])) for key in keys
+                if key != 'symbols')
+    return crys.Trajectory(symbols=symbols, **kwds)
+
+
+def read_cif_traj(path, nprocs=1):
+    """Read all data blocks in one or many CIF files into one Trajectory, see
+    :func:`iter_cif` for parameters. All structures must have the same
+    atoms."""
+    return _arrays2traj([arrs for _, _, arrs in
+                         _iter_cif_arrays(path, nprocs=nprocs)])
+
+
+def iter_pdb(filename):
+    """Iterate over all MODELs in a PDB file, one pass, streamed, see
+    :func:`~pwtools.parse.iter_pdb_models`.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    generator of :class:`~pwtools.crys.Structure`
+    """
+    for dct in parse.iter_pdb_models(filename):
+        if dct['cryst_const'] is None:
+            dct.pop('cryst_const')
+        yield crys.Structure(**dct)
+
+
+def read_pdb_traj(filename):
+    """Read all MODELs in a PDB file into a Trajectory.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    :class:`~pwtools.crys.Trajectory`
+        ``cell`` is None if there is no CRYST1 record
+    """
+    return _arrays2traj(list(parse.iter_pdb_models(filename)))
+
+
+#-----------------------------------------------------------------------------
+# Format registry and io.read()
+#-----------------------------------------------------------------------------
+
+# bytes read from the top of a file for content sniffing
+SNIFF_NBYTES = 8192
+
+# name -> dict(reader=..., sniffer=..., priority=...), see register_reader()
+READERS = {}
+
+
+def register_reader(name, reader, sniffer, priority=0):
+    """Add a reader to the registry used by :func:`read` and :func:`sniff`.
+
+    Parameters
+    ----------
+    name : str
+        format name, used as ``read(..., fmt=name)``, an existing entry is
+        replaced
+    reader : callable
+        ``reader(filename, **kwds)``, usually a :class:`ReadFactory` instance
+    sniffer : callable
+        ``sniffer(filename, head) -> bool``, `head` is the first
+        `SNIFF_NBYTES` bytes of the (decompressed) file as str. Must be cheap,
+        e.g. look only at `head` or at the file name or for aux files.
+    priority : int
+        If several readers match, the one with the highest priority wins. Use
+        that to prefer fast readers (e.g. DCD over text) and specific over
+        generic formats.
+
+    Examples
+    --------
+    >>> def sniff_foo(filename, head):
+    ...     return head.startswith('FOO-MD')
+    >>> io.register_reader('foo_md', io.ReadFactory(parser=FooParser,
+    ...                                             struct_or_traj='traj'),
+    ...                    sniff_foo, priority=10)
+    >>> io.read('foo.out')
+    """
+    READERS[name] = dict(reader=reader, sniffer=sniffer, priority=priority)
+
+
+def _read_head(filename, nbytes=SNIFF_NBYTES):
+    try:
+        with common.file_open(filename, 'rb') as fd:
+            return fd.read(nbytes).decode('latin-1')
+    except (OSError, EOFError):
+        return ''
+
+
+# markers which pw.x prints only after the first SCF cycle, searched for in the
+# whole file by all pw.x sniffers in a single pass
+SNIFF_SCAN_MARKERS = ('Ekin = ', 'Molecular Dynamics Calculation',
+                      'Geometry Optimization')
+
+
+@functools.lru_cache(maxsize=16)
+def _scan_markers(filename, stamp, markers, chunksize):
+    """Read `filename` once in chunks and return ``{marker: bool}`` for all
+    str `markers`. Stops when all markers are found. `stamp` (size, mtime)
+    only invalidates the cache."""
+    todo = dict((marker.encode(), marker) for marker in markers)
+    found = dict((marker, False) for marker in markers)
+    ntail = max(len(mm) for mm in todo) - 1
+    tail = b''
+    try:
+        with common.file_open(filename, 'rb') as fd:
+            while todo:
+                chunk = fd.read(chunksize)
+                if not chunk:
+                    break
+                # markers may span two chunks
+                buf = tail + chunk
+                for mm in [mm for mm in todo if mm in buf]:
+                    found[todo.pop(mm)] = True
+                tail = buf[-ntail:] if ntail > 0 else b''
+    except (OSError, EOFError):
+        pass
+    return found
+
+
+def _file_contains(filename, marker, chunksize=2**24):
+    """Whether `filename` contains the str `marker`. All markers in
+    `SNIFF_SCAN_MARKERS` are searched for in one cached read of the file."""
+    try:
+        st = os.stat(filename)
+        stamp = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        stamp = None
+    markers = SNIFF_SCAN_MARKERS if marker in SNIFF_SCAN_MARKERS else \
+        (marker,)
+    return _scan_markers(filename, stamp, markers, chunksize)[marker]
+
+
+def _basename(filename):
+    """Lower case file basename without compression suffix."""
+    base, ext = os.path.splitext(filename)
+    if ext in common.COMPRESSION_OPENERS:
+        filename = base
+    return os.path.basename(filename).lower()
+
+
+def _aux_file_exists(filename, name):
+    fn = common.find_file(os.path.join(os.path.dirname(filename), name))
+    return os.path.exists(fn)
+
+
+def _cp2k_run_type(head):
+    for line in head.splitlines():
+        if line.strip().startswith('GLOBAL| Run type'):
+            return line.split()[-1]
+    return None
+
+
+def _sniff_pw(filename, head):
+    return 'Program PWSCF' in head
+
+
+def _sniff_pw_vcmd(filename, head):
+    return _sniff_pw(filename, head) and _file_contains(filename, 'Ekin = ')
+
+
+def _sniff_pw_md(filename, head):
+    return _sniff_pw(filename, head) and \
+        (_file_contains(filename, 'Molecular Dynamics Calculation') or
+         _file_contains(filename, 'Geometry Optimization'))
+
+
+def _sniff_cpmd_md(filename, head):
+    return 'PROGRAM CPMD' in head and 'MOLECULAR DYNAMICS' in head
+
+
+def _sniff_cpmd_scf(filename, head):
+    return 'PROGRAM CPMD' in head and 'MOLECULAR DYNAMICS' not in head
+
+
+def _sniff_cp2k_md(filename, head):
+    return _cp2k_run_type(head) == 'MD'
+
+
+def _sniff_cp2k_md_dcd(filename, head):
+    return _sniff_cp2k_md(filename, head) and \
+        _aux_file_exists(filename, 'PROJECT-pos-1.dcd')
+
+
+def _sniff_cp2k_relax(filename, head):
+    return _cp2k_run_type(head) in ['CELL_OPT', 'GEO_OPT']
+
+
+def _sniff_cp2k_scf(filename, head):
+    return _cp2k_run_type(head) in ['ENERGY', 'ENERGY_FORCE']
+
+
+def _sniff_lammps_md_txt(filename, head):
+    return head.startswith('LAMMPS (') and \
+        _aux_file_exists(filename, 'lmp.out.dump')
+
+
+def _sniff_lammps_md_dcd(filename, head):
+    return head.startswith('LAMMPS (') and \
+        _aux_file_exists(filename, 'lmp.out.dcd')
+
+
+def _sniff_cif(filename, head):
+    return _basename(filename).endswith('.cif') or \
+        ('data_' in head and '_cell_length_a' in head)
+
+
+def _sniff_pdb(filename, head):
+    return _basename(filename).endswith('.pdb') or \
+        any(line.startswith('CRYST1') for line in head.splitlines())
+
+
+def _sniff_axsf(filename, head):
+    return head.startswith('ANIMSTEPS')
+
+
+def _sniff_xyz(filename, head):
+    return _basename(filename).endswith('.xyz')
+
+
+def _sniff_traj_h5(filename, head):
+    """HDF5 file with the root group attrs written by :func:`write_traj_h5`,
+    not any h5 file (e.g. from :func:`write_h5`)."""
+    if not head.startswith('\x89HDF\r\n\x1a\n'):
+        return False
+    try:
+        with h5py.File(filename, mode='r') as fh:
+            return all(name in fh.attrs for name in ['natoms', 'nstep',
+                                                     'units'])
+    except (NameError, OSError):
+        return False
+
+
+for _args in [
+        # fastest first: DCD over text
+        ('cp2k_md_dcd',     read_cp2k_md_dcd,   _sniff_cp2k_md_dcd,     30),
+        ('lammps_md_dcd',   read_lammps_md_dcd, _sniff_lammps_md_dcd,   30),
+        ('cp2k_md',         read_cp2k_md,       _sniff_cp2k_md,         20),
+        ('lammps_md_txt',   read_lammps_md_txt, _sniff_lammps_md_txt,   20),
+        ('cp2k_relax',      read_cp2k_relax,    _sniff_cp2k_relax,      20),
+        ('cp2k_scf',        read_cp2k_scf,      _sniff_cp2k_scf,        20),
+        ('cpmd_md',         read_cpmd_md,       _sniff_cpmd_md,         20),
+        ('cpmd_scf',        read_cpmd_scf,      _sniff_cpmd_scf,        20),
+        # vc-md is a special case of md, md/relax a special case of scf
+        ('pw_vcmd',         read_pw_vcmd,       _sniff_pw_vcmd,         22),
+        ('pw_md',           read_pw_md,         _sniff_pw_md,           21),
+        ('pw_scf',          read_pw_scf,        _sniff_pw,              20),
+        ('traj_h5',         read_traj_h5,       _sniff_traj_h5,         10),
+        ('axsf',            read_axsf,          _sniff_axsf,            10),
+        ('cif',             read_cif,           _sniff_cif,             10),
+        ('pdb',             read_pdb,           _sniff_pdb,             10),
+        ('xyz',             read_xyz,           _sniff_xyz,             0),
+        ]:
+    register_reader(*_args)
+del _args
+
+
+def sniff(path):
+    """Determine the format of a file or of the main output file in a
+    directory, using the sniffers in :data:`READERS`.
+
+    Parameters
+    ----------
+    path : str
+        file or directory name
+
+    Returns
+    -------
+    (name, filename)
+        `name` is a key in :data:`READERS`, `filename` the matching file
+        (`path` itself if that is a file)
+
+    Raises
+    ------
+    Exception if no reader matches.
+    """
+    if os.path.isdir(path):
+        filenames = [os.path.join(path, name) for name in
+                     sorted(os.listdir(path))]
+        filenames = [fn for fn in filenames if os.path.isfile(fn) and
+                     not fn.endswith(frameindex.INDEX_SUFFIX)]
+    else:
+        filenames = [path]
+    best = None
+    entries = sorted(READERS.items(), key=lambda x: -x[1]['priority'])
+    for fn in filenames:
+        head = _read_head(fn)
+        for name, entry in entries:
+            if best is not None and entry['priority'] <= best[0]:
+                break
+            if entry['sniffer'](fn, head):
+                best = (entry['priority'], name, fn)
+                break
+    if best is None:
+        raise Exception("cannot determine file format of: %s" %path)
+    return best[1:]
+
+
+def read(path, fmt=None, **kwds):
+    """Read a Structure or Trajectory from any supported file format.
+
+    The format is determined by :func:`sniff`, which looks only at the file
+    name, the first few KB of the file and the presence of aux files (e.g.
+    ``lmp.out.dcd``). If `path` is a directory, the file with the best
+    matching (fastest) reader is used, e.g. for a LAMMPS run with
+    ``log.lammps``, ``lmp.out.dump`` and ``lmp.out.dcd``, the DCD reader
+    :data:`read_lammps_md_dcd` is used. Add more formats with
+    :func:`register_reader`.
+
+    Parameters
+    ----------
+    path : str
+        file or directory name
+    fmt : str, optional
+        format name (key in :data:`READERS`), skip sniffing
+    **kwds : passed to the reader, e.g. ``attrs=['etot']`` or ``units=...``
+
+    Returns
+    -------
+    Structure or Trajectory
+
+    Examples
+    --------
+    >>> traj = io.read('lammps_run/')
+    >>> io.sniff('lammps_run/')
+    ('lammps_md_dcd', 'lammps_run/log.lammps')
+    >>> traj = io.read('pw.out', attrs=['etot'])
+    >>> st = io.read('pw.scf.out', fmt='pw_scf')
+    """
+    if fmt is None:
+        fmt, filename = sniff(path)
+    else:
+        filename = path
+    return READERS[fmt]['reader'](filename, **kwds)
@@ -1,6 +1,8 @@
+import io
 import time
+import warnings
 import numpy as np
-from pwtools import atomic_data, common
+from pwtools import atomic_data, common, frameindex
 
 
 def struct_str(struct):
@@ -39,14 +41,378 @@ def struct_str(struct):
                                                               st.cell[2,1]]),
                                                     eps=1e-13, fmt='%.14g',
                                                     delim=' '))
-    atoms_str = "Atoms\n\n"
-    for iatom in range(st.natoms):
-        atoms_str += "{iatom} {ispec} {xyz}".format(
-            iatom=iatom+1,
-            ispec=st.order[st.symbols[iatom]],
-            xyz=common.str_arr(st.coords[iatom,:], eps=1e-13, fmt='%23.16e') + '\n')
+    # one line per atom: "{iatom} {ispec} {xyz}", xyz as in common.str_arr()
+    atoms_vals = np.empty((st.natoms, 5), dtype=object)
+    atoms_vals[:,0] = np.arange(st.natoms) + 1
+    atoms_vals[:,1] = [st.order[sy] for sy in st.symbols]
+    atoms_vals[:,2:] = common.fix_eps(st.coords, eps=1e-13)
+    atoms_str = "Atoms\n\n" + \
+        ("%i %i " + (' '*4).join(['%23.16e']*3) + '\n')*st.natoms \
+        %tuple(atoms_vals.ravel())
     mass_str = "Masses\n\n"
     for idx,sy in enumerate(st.symbols_unique):
         mass_str += "%i %g\n" %(idx+1, atomic_data.pt[sy]['mass'])
     return head_str + '\n\n' + info_str + '\n\n' + cell_str + \
            '\n' + atoms_str + '\n' + mass_str
+
+
+def _find_thermo_markers(buf):
+    """Find thermo block delimiters in `buf`: header lines ``Step ...`` (newer
+    lammps versions indent them: ``   Step          Temp ...``) and ``Loop
+    time of ...`` lines. Much faster than a multiline regex since
+    bytes.find() skips over the data.
+
+    Returns
+    -------
+    list of (start, end, line)
+        byte range of the line in `buf` (w/o newline), sorted by start
+    """
+    ret = []
+    for marker in [b'Step', b'Loop time']:
+        idx = buf.find(marker)
+        while idx >= 0:
+            start = buf.rfind(b'\n', 0, idx) + 1
+            end = buf.find(b'\n', idx)
+            end = len(buf) if end < 0 else end
+            line = buf[idx:end]
+            if buf[start:idx].strip() == b'' and \
+                    (marker != b'Step' or line[4:5] in b' \t\r'):
+                ret.append((start, end, line))
+            idx = buf.find(marker, end)
+    return sorted(ret)
+
+
+def _parse_thermo_block(txt, ncols):
+    """Parse data lines of one thermo block into a 2d array (nrows,ncols)."""
+    # fast path: only numbers, ncols in each line. np.loadtxt()'s C reader
+    # (numpy >= 1.23) converts numbers faster than np.fromstring() and
+    # raises ValueError on anything else.
+    try:
+        with warnings.catch_warnings():
+            # empty block
+            warnings.simplefilter('ignore', UserWarning)
+            arr = np.loadtxt(io.BytesIO(txt), comments=None,
+                             encoding='latin1', ndmin=2)
+        if arr.shape[1] == ncols:
+            return arr
+    except ValueError:
+        pass
+    # slow path: skip blank lines, warnings and whatever else lammps prints
+    # between thermo output lines, as well as a truncated last line
+    rows = []
+    for line in txt.splitlines():
+        tokens = line.split()
+        if len(tokens) == ncols:
+            try:
+                rows.append([float(x) for x in tokens])
+            except ValueError:
+                pass
+    return np.array(rows, dtype=float).reshape(-1, ncols)
+
+
+def iter_log_thermo_blocks(filename, chunksize=frameindex.CHUNKSIZE):
+    """Iterate over the thermo output blocks in `filename`.
+
+    A block is everything between a header line ``Step ...`` and the line
+    ``Loop time of ...`` which ends each ``run`` or ``minimize`` command. The
+    file is read in chunks of `chunksize` bytes in a single pass. A last
+    block without ``Loop time`` (crashed or running simulation) is returned
+    as well, a truncated last line is skipped.
+
+    Parameters
+    ----------
+    filename : str
+        log file (``log.lammps`` or the lammps stdout)
+    chunksize : int
+        bytes read at once
+
+    Returns
+    -------
+    generator of (header, arr)
+        | header : list of str, column names, e.g. ``['Step', 'Temp', ...]``
+        | arr : 2d float array (nrows, len(header))
+    """
+    header = None
+    segs = []
+    rest = b''
+    with common.file_open(filename, 'rb') as fd:
+        while True:
+            chunk = fd.read(chunksize)
+            # complete lines only, keep the rest for the next round
+            buf = rest + chunk
+            if chunk:
+                idx = buf.rfind(b'\n') + 1
+                buf, rest = buf[:idx], buf[idx:]
+            pos = 0
+            for start, end, line in _find_thermo_markers(buf):
+                if header is not None:
+                    segs.append(buf[pos:start])
+                    yield header, _parse_thermo_block(b''.join(segs),
+                                                      len(header))
+                    header = None
+                if line.startswith(b'Step'):
+                    header = line.decode().split()
+                    segs = []
+                pos = end + 1
+            if header is not None:
+                segs.append(buf[pos:])
+            if not chunk:
+                break
+    if header is not None:
+        # A truncated last line has no newline and is skipped.
+        yield header, _parse_thermo_block(b''.join(segs), len(header))
+
+
+def read_log_thermo(filename, chunksize=frameindex.CHUNKSIZE):
+    """Read thermo output (``thermo_style``) from a lammps log file.
+
+    All blocks (one for each ``run`` or ``minimize`` command, see
+    :func:`iter_log_thermo_blocks`) are concatenated. Each block has its own
+    header, so ``thermo_style`` may change between runs. Only columns present
+    in all blocks are returned. If a block starts with the step on which the
+    previous one ended (lammps prints it twice), that first row is skipped.
+
+    Parameters
+    ----------
+    filename : str
+    chunksize : int
+        bytes read at once
+
+    Returns
+    -------
+    dict or None
+        ``{'Step': 1d array, 'Temp': 1d array, ...}``, None if there is no
+        thermo output
+
+    Examples
+    --------
+    >>> # thermo_style custom step temp vol
+    >>> d = read_log_thermo('log.lammps')
+    >>> d['Step'], d['Temp'], d['Volume']
+    """
+    blocks = []
+    for header, arr in iter_log_thermo_blocks(filename, chunksize=chunksize):
+        if arr.shape[0] == 0:
+            continue
+        if len(blocks) > 0 and arr[0,0] == blocks[-1][1][-1,0]:
+            arr = arr[1:,:]
+        blocks.append((header, arr))
+    if len(blocks) == 0:
+        return None
+    columns = [cc for cc in blocks[0][0] if all(cc in hdr for hdr,_ in
+                                                blocks)]
+    return dict((cc, np.concatenate([arr[:,hdr.index(cc)] for hdr,arr in
+                                     blocks])) for cc in columns)
+
+
+class DumpFile(frameindex.IndexedTextFile):
+    """Random access reader for LAMMPS text dump files (``dump custom``).
+
+    On init, we walk the file once in large binary chunks and record the byte
+    offset of each frame's ``ITEM: ATOMS`` data block along with the per-frame
+    header info (time step, number of atoms, box bounds). The index is stored
+    in ``filename + '.idx'``, see :mod:`~pwtools.frameindex`. Later reads seek
+    directly to the requested frames and only keep the requested columns, so
+    memory is bounded by the size of the selected data, not by the file size.
+
+    Attributes
+    ----------
+    nstep : int
+        number of complete frames
+    columns : list of str
+        column names from the ``ITEM: ATOMS ...`` header, e.g. ``['id',
+        'type', 'xu', 'yu', 'zu']``
+    offsets : (nstep,) int64 array
+        byte offset of the first atom line of each frame
+    nbytes : (nstep,) int64 array
+        length in bytes of each frame's atom data block
+    natoms : (nstep,) int array
+        number of atoms in each frame
+    timestep : (nstep,) int array
+        ``ITEM: TIMESTEP`` value of each frame
+    box : (nstep,3,3) float array
+        ``ITEM: BOX BOUNDS`` of each frame as written by lammps, the 3rd column
+        (tilt factors xy,xz,yz) is zero for orthogonal boxes
+
+    Examples
+    --------
+    >>> d = DumpFile('lmp.out.dump')
+    >>> d.columns
+    ['id', 'type', 'xu', 'yu', 'zu', 'fx', 'fy', 'fz']
+    >>> # all frames, coords only -> (nstep,natoms,3)
+    >>> coords = d.read(cols=['xu','yu','zu'])
+    >>> # every 10th frame from 1000 to 2000, forces -> (100,natoms,3)
+    >>> forces = d.read(cols=['fx','fy','fz'], frames=slice(1000,2000,10))
+    >>> # loop over frames w/o loading everything
+    >>> for arr in d.iterframes(cols=['xu','yu','zu']):
+    ...     do_stuff(arr)
+
+    Notes
+    -----
+    If ``id`` is one of the dump columns, atoms are sorted by id in each frame
+    (``sort=True``), which makes the result independent of ``dump_modify
+    sort``. If the number of atoms changes between frames, :meth:`read` returns
+    an array of shape (nstep, max_id, ncols) where row ``id-1`` holds the atom
+    with that id and missing atoms are filled with `fill`.
+
+    A truncated last frame (crashed or still running simulation) is ignored.
+    """
+    def _build_index(self):
+        frame_offsets, filesize = frameindex.find_marker_offsets(
+            self.filename, b'ITEM: TIMESTEP', chunksize=self.chunksize)
+        offsets = []
+        nbytes = []
+        natoms = []
+        timestep = []
+        box = []
+        columns = None
+        with common.file_open(self.filename, 'rb') as fd:
+            for ii, frame_start in enumerate(frame_offsets):
+                frame_end = frame_offsets[ii+1] if ii+1 < len(frame_offsets) \
+                    else filesize
+                fd.seek(frame_start)
+                dct = {}
+                _box = np.zeros((3,3))
+                while True:
+                    line = fd.readline()
+                    if not line.startswith(b'ITEM:'):
+                        # truncated header
+                        break
+                    item = line[5:].strip()
+                    if item.startswith(b'TIMESTEP'):
+                        dct['timestep'] = int(fd.readline())
+                    elif item.startswith(b'NUMBER OF ATOMS'):
+                        dct['natoms'] = int(fd.readline())
+                    elif item.startswith(b'BOX BOUNDS'):
+                        for jj in range(3):
+                            vals = fd.readline().split()
+                            _box[jj,:len(vals)] = [float(x) for x in vals]
+                    elif item.startswith(b'ATOMS'):
+                        cols = item.decode().split()[1:]
+                        if columns is None:
+                            columns = cols
+                        elif cols != columns:
+                            raise Exception("dump columns change in frame {}: "
+                                            "{} -> {}".format(ii, columns,
+                                                              cols))
+                        dct['offset'] = fd.tell()
+                        break
+                    if fd.tell() >= frame_end:
+                        break
+                if 'offset' not in dct or 'natoms' not in dct:
+                    continue
+                _nbytes = frame_end - dct['offset']
+                # Only the last frame can be incomplete. Count lines only there.
+                # The end of the file terminates a last line w/o newline if
+                # that has all columns, else it was cut (crashed run).
+                if ii == len(frame_offsets) - 1:
+                    fd.seek(dct['offset'])
+                    txt = fd.read(_nbytes)
+                    nlines = txt.count(b'\n')
+                    if len(txt[txt.rfind(b'\n')+1:].split()) == len(columns):
+                        nlines += 1
+                    if nlines < dct['natoms']:
+                        continue
+                offsets.append(dct['offset'])
+                nbytes.append(_nbytes)
+                natoms.append(dct['natoms'])
+                timestep.append(dct.get('timestep', -1))
+                box.append(_box)
+        return {'columns': np.array(columns if columns is not None else [],
+                                    dtype=str),
+                'offsets': np.array(offsets, dtype=np.int64),
+                'nbytes': np.array(nbytes, dtype=np.int64),
+                'natoms': np.array(natoms, dtype=int),
+                'timestep': np.array(timestep, dtype=int),
+                'box': np.array(box, dtype=float).reshape((len(offsets),3,3)),
+                }
+
+    def _set_index(self, dct):
+        super(DumpFile, self)._set_index(dct)
+        self.columns = [str(x) for x in self.columns]
+
+    def _col_idx(self, cols):
+        if cols is None:
+            return np.arange(len(self.columns))
+        for cc in cols:
+            if cc not in self.columns:
+                raise ValueError("column '{}' not in dump columns {}".format(
+                                 cc, self.columns))
+        return np.array([self.columns.index(cc) for cc in cols])
+
+    def _parse_block(self, txt, natoms, col_idx):
+        ncols = len(self.columns)
+        # fast path: all numbers
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            arr = np.fromstring(txt, sep=' ')
+        if arr.shape[0] == natoms*ncols:
+            return arr.reshape(natoms, ncols)[:,col_idx]
+        # string columns such as "element", or truncated data
+        arr = np.array(txt.split())
+        if arr.shape[0] != natoms*ncols:
+            raise Exception("{}: expect {} values in frame, got {}".format(
+                            self.filename, natoms*ncols, arr.shape[0]))
+        return arr.reshape(natoms, ncols)[:,col_idx].astype(float)
+
+    def iterframes(self, cols=None, frames=None, sort=True):
+        """Iterate over frames, yield 2d arrays (natoms, len(cols)).
+
+        Parameters
+        ----------
+        cols : sequence of str, optional
+            column names to return, default all in :attr:`columns`
+        frames : int, slice, sequence of ints, optional
+            frame selection, default all
+        sort : bool
+            sort atoms by ``id`` if that column is present
+        """
+        col_idx = self._col_idx(cols)
+        id_idx = self.columns.index('id') if (sort and 'id' in
+                                              self.columns) else None
+        with common.file_open(self.filename, 'rb') as fd:
+            for idx in self._frame_idx(frames):
+                txt = self._read_frame(fd, idx)
+                if id_idx is None:
+                    yield self._parse_block(txt, self.natoms[idx], col_idx)
+                else:
+                    arr = self._parse_block(txt, self.natoms[idx],
+                                            np.concatenate(([id_idx],
+                                                            col_idx)))
+                    yield arr[np.argsort(arr[:,0], kind='stable'),1:]
+
+    def read(self, cols=None, frames=None, sort=True, fill=np.nan):
+        """Read frames into a 3d array (nstep, natoms, len(cols)).
+
+        Parameters
+        ----------
+        cols, frames, sort : see :meth:`iterframes`
+        fill : float
+            If the number of atoms changes between the selected frames, fill
+            missing atoms with this value, see class doc string.
+
+        Returns
+        -------
+        arr : 3d array
+        """
+        fidx = self._frame_idx(frames)
+        col_idx = self._col_idx(cols)
+        if len(np.unique(self.natoms[fidx])) <= 1:
+            nat = self.natoms[fidx[0]] if len(fidx) > 0 else 0
+            out = np.empty((len(fidx), nat, len(col_idx)), dtype=float)
+            for ii,arr in enumerate(self.iterframes(cols=cols, frames=fidx,
+                                                    sort=sort)):
+                out[ii,...] = arr
+            return out
+        else:
+            if 'id' not in self.columns:
+                raise Exception("number of atoms changes between frames, "
+                                "need 'id' column")
+            _cols = ['id'] + [self.columns[ii] for ii in col_idx]
+            lst = list(self.iterframes(cols=_cols, frames=fidx, sort=False))
+            maxid = int(max(arr[:,0].max() for arr in lst))
+            out = np.empty((len(fidx), maxid, len(col_idx)), dtype=float)
+            out.fill(fill)
+            for ii,arr in enumerate(lst):
+                out[ii,arr[:,0].astype(int)-1,:] = arr[:,1:]
+            return out
@@ -103,6 +103,18 @@ Con:
 * self.<attr> will NOT be set, since get_<attr>() only returns <attr> but
   doesn't set self.<attr> = self.get_<attr>(), so dump() would save an
   "empty" file.
+
+Compressed files
+----------------
+
+All parsers read ``.gz``, ``.bz2`` and ``.xz`` files, e.g.
+``PwMDOutputFile('pw.out.xz')``. Shell pipelines get the decompressed data
+streamed to stdin (see :func:`backtick`), all other readers use
+:func:`~pwtools.common.file_open`. Nothing is decompressed to disk. Auxiliary
+files (``PROJECT-1.ener``, ``lmp.out.dump``, ...) are found also when
+compressed (``PROJECT-1.ener.gz``, see :func:`~pwtools.common.find_file`). Each
+getter decompresses the file again, so parsing is slower than with plain
+files, see ``examples/compressed_input.py``.
 """
 
 import re, sys, os
@@ -121,7 +133,7 @@ except ImportError:
     pass
 
 from pwtools import (common, constants, regex, crys, atomic_data, num,
-    arrayio, dcd)
+    arrayio, dcd, lammps, frameindex)
 from pwtools.verbose import verbose
 from pwtools.base import FlexibleGetters
 from pwtools.constants import Ry, Ha, eV, Bohr, Angstrom, thart, Ang, fs, ps
@@ -152,6 +164,13 @@ else:
 # General helpers
 #-----------------------------------------------------------------------------
 
+def backtick(call):
+    """:func:`~pwtools.common.backtick` which streams compressed input files to
+    the command's stdin. Use for all shell pipelines which read the parsed
+    files."""
+    return com.backtick(call, decompress=True)
+
+
 def int_from_txt(txt):
     if txt.strip() == '':
         return None
@@ -242,6 +261,245 @@ def axis_lens(seq, axis=0):
     return ret
 
 
+#-----------------------------------------------------------------------------
+# Lightweight CIF and PDB readers (all data blocks / MODELs in one pass)
+#-----------------------------------------------------------------------------
+
+# CIF tokens: ;text field; (";" at line start), 'quoted', "quoted", comment,
+# bare word. A quote ends a string only if followed by whitespace.
+_CIF_TOKEN_RE = re.compile(r"""
+    ^;([^\n]*(?:\n(?!;)[^\n]*)*)\n;
+  | '((?:[^'\n]|'(?=\S))*)'(?=\s|$)
+  | "((?:[^"\n]|"(?=\S))*)"(?=\s|$)
+  | \#[^\n]*
+  | (\S+)
+  """, re.M | re.X)
+
+# reserved words which end a loop_ value list
+_CIF_RESERVED = ('data_', 'loop_', 'save_', 'global_', 'stop_')
+
+
+def _iter_file_split(filename, sep, blocksize=2**22):
+    """Stream the text in `filename` and yield parts which start with `sep`
+    (except the first part). Only one part + `blocksize` is held in memory."""
+    chunks = []
+    last = ''
+    with common.file_open(filename) as fd:
+        for block in iter(lambda: fd.read(blocksize), ''):
+            chunks.append(block)
+            # sep may span two blocks
+            if sep not in last[-len(sep):] + block:
+                last = block
+                continue
+            buf = ''.join(chunks)
+            start = 0
+            idx = buf.find(sep, len(sep) if buf.startswith(sep) else 1)
+            while idx >= 0:
+                yield buf[start:idx]
+                start = idx
+                idx = buf.find(sep, start + len(sep))
+            last = buf[start:]
+            chunks = [last]
+    yield ''.join(chunks)
+
+
+def cif_iter_tokens(txt):
+    """Yield CIF tokens ``(value, bare)``, `bare` is False for quoted values
+    and text fields (these are never reserved words or tags). Comments are
+    skipped."""
+    for match in _CIF_TOKEN_RE.finditer(txt):
+        bare = match.group(4)
+        if bare is not None:
+            yield bare, True
+        else:
+            text, sq, dq = match.group(1, 2, 3)
+            if text is not None:
+                yield text, False
+            elif sq is not None:
+                yield sq, False
+            elif dq is not None:
+                yield dq, False
+
+
+def cif_parse_blocks(txt):
+    """Parse CIF text with any number of data blocks.
+
+    Tags are lower-cased (CIF is case-insensitive). Save frames are not
+    supported, their items end up in the enclosing block.
+
+    Parameters
+    ----------
+    txt : str
+
+    Returns
+    -------
+    generator of (name, dct)
+        `name` is the block name (``data_foo`` -> ``'foo'``), `dct` maps tags to
+        str values, loop tags map to lists of str
+    """
+    name = None
+    dct = {}
+    tokens = cif_iter_tokens(txt)
+    tok = next(tokens, None)
+    while tok is not None:
+        val, bare = tok
+        low = val.lower()
+        if bare and low.startswith('data_'):
+            if name is not None:
+                yield name, dct
+            name = val[5:]
+            dct = {}
+            tok = next(tokens, None)
+        elif bare and low == 'loop_':
+            tags = []
+            tok = next(tokens, None)
+            while tok is not None and tok[1] and tok[0].startswith('_'):
+                tags.append(tok[0].lower())
+                tok = next(tokens, None)
+            vals = []
+            while tok is not None and not (tok[1] and \
+                    (tok[0].startswith('_') or \
+                     tok[0].lower().startswith(_CIF_RESERVED))):
+                vals.append(tok[0])
+                tok = next(tokens, None)
+            ntags = len(tags)
+            if ntags > 0:
+                for ii, tag in enumerate(tags):
+                    dct[tag] = vals[ii::ntags]
+        elif bare and val.startswith('_'):
+            tok = next(tokens, None)
+            if tok is not None:
+                dct[low] = tok[0]
+                tok = next(tokens, None)
+        else:
+            # global_, save_, stray values
+            tok = next(tokens, None)
+    if name is not None:
+        yield name, dct
+
+
+def _cif_floats(vals):
+    """['7.3782(7)', '1.0'] -> array([7.3782, 1.0])"""
+    return np.array([vv.partition('(')[0] for vv in vals], dtype=float)
+
+
+def cif_block_arrays(dct, _rex=re.compile(r'([a-zA-Z]+)')):
+    """Extract structure data from one CIF data block (as returned by
+    :func:`cif_parse_blocks`).
+
+    Parameters
+    ----------
+    dct : dict
+
+    Returns
+    -------
+    dict or None
+        keys ``symbols``, ``cryst_const`` and ``coords_frac`` or ``coords``
+        (Angstrom), None if the block has no cell or no atoms
+    """
+    cc_keys = ['_cell_length_a', '_cell_length_b', '_cell_length_c',
+               '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma']
+    if not all(key in dct for key in cc_keys):
+        return None
+    ret = {'cryst_const': _cif_floats([dct[key] for key in cc_keys])}
+    for name, prefix in [('coords_frac', '_atom_site_fract_'),
+                         ('coords', '_atom_site_cartn_')]:
+        if prefix + 'x' in dct:
+            ret[name] = np.array([_cif_floats(dct[prefix + xx]) for xx in
+                                  'xyz']).T
+            break
+    else:
+        return None
+    for key in ['_atom_site_type_symbol', '_atom_site_label']:
+        if key in dct:
+            ret['symbols'] = [_rex.match(x).group(1) for x in dct[key]]
+            break
+    else:
+        return None
+    return ret
+
+
+def iter_cif_blocks(filename):
+    """Stream a (multi-block) CIF file and yield each data block with
+    structure data.
+
+    Blocks are split at lines starting with ``data_`` before tokenizing, so
+    only one block is held in memory.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    generator of (name, dct)
+        block name and :func:`cif_block_arrays` output, blocks without
+        structure data are skipped
+    """
+    for part in _iter_file_split(filename, '\ndata_'):
+        for name, dct in cif_parse_blocks(part):
+            arrs = cif_block_arrays(dct)
+            if arrs is not None:
+                yield name, arrs
+
+
+# ATOM/HETATM record up to the z coordinate (columns 1-54), see PDBFile for
+# the column layout
+_PDB_ATOM_RE = re.compile(r'^(?:ATOM  |HETATM).{24}(.{24})', re.M)
+
+
+def _pdb_symbol(line):
+    # Element symbol (columns 77-78) if present, else letters in the "Atom
+    # name" (columns 13-16) like in PDBFile, "AL" -> "Al"
+    sym = line[76:78].strip()
+    if sym == '':
+        sym = re.match(r'[\s0-9]*([A-Za-z]+)', line[12:16]).group(1)
+    if len(sym) == 2:
+        sym = sym[0] + sym[1].lower()
+    return sym
+
+
+def iter_pdb_models(filename):
+    """Stream a PDB file and yield each MODEL (only ATOM/HETATM and CRYST1
+    records). A file without MODEL records is one model.
+
+    In contrast to :class:`PDBFile`, we use the fixed columns from the PDB spec
+    for coordinates, so fields without whitespace in between (e.g.
+    ``-100.000-200.000``) are read correctly.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    generator of dicts
+        keys ``symbols`` (same list object for all models), ``coords`` (natoms,3)
+        and ``cryst_const`` (6,) or None, a CRYST1 record is valid for all
+        following models until the next one
+    """
+    symbols = None
+    cryst_const = None
+    for part in _iter_file_split(filename, '\nENDMDL'):
+        match = re.search(r'^CRYST1([^\n]*)', part, re.M)
+        if match is not None:
+            cryst_const = np.array(match.group(1)[:48].split()[:6],
+                                   dtype=float)
+        xyz = _PDB_ATOM_RE.findall(part)
+        if len(xyz) == 0:
+            continue
+        coords = np.array(xyz, dtype='S24').view('S8').astype(float)
+        if symbols is None:
+            symbols = [_pdb_symbol(line) for line in part.splitlines() if \
+                       line.startswith(('ATOM  ', 'HETATM'))]
+        else:
+            assert len(xyz) == len(symbols), \
+                "models have different numbers of atoms"
+        yield {'symbols': symbols,
+               'coords': coords.reshape(len(xyz), 3),
+               'cryst_const': cryst_const}
+
+
 #-----------------------------------------------------------------------------
 # Parsers
 #-----------------------------------------------------------------------------
@@ -272,11 +530,14 @@ class StructureFileParser(UnitsHandler):
         self.cont = self.Container(set_all_auto=False, units=self.units)
         self.init_attr_lst(self.cont.attr_lst)
 
-    def parse(self):
-        self.set_all()
-        self.parse_called = True
+    def parse(self, attr_lst=None):
+        """Call all getters or only those for `attr_lst` (plus those which
+        they call themselves)."""
+        self.set_all(attr_lst)
+        if attr_lst is None:
+            self.parse_called = True
 
-    def get_cont(self, auto_calc=True):
+    def get_cont(self, auto_calc=True, attr_lst=None):
         """Populate and return a Container object.
 
         Parameters
@@ -289,13 +550,24 @@ class StructureFileParser(UnitsHandler):
             |           ``Container._extend_arrays_apply_units()`` +
             |           ``FlexibleGetters.set_all()``
             | False: call only ``Container._extend_arrays_apply_units()``
+        attr_lst : sequence of str, optional
+            Parse only these attrs, e.g. ``['etot', 'stress']``. We call
+            only the parser getters for `attr_lst` and those attrs which the
+            Container needs to calculate them (see
+            :meth:`~pwtools.base.FlexibleGetters.resolve_attr_deps`), e.g.
+            ``'volume'`` needs ``'cell'``. All other getters are skipped,
+            their attrs are None. Default: parse all.
         """
-        if not self.parse_called:
-            self.parse()
+        if attr_lst is None:
+            if not self.parse_called:
+                self.parse()
+        else:
+            cont_attr_lst = self.cont.resolve_attr_deps(attr_lst)
+            self.parse([x for x in cont_attr_lst if x in self.attr_lst])
         for attr_name in self.cont.attr_lst:
             setattr(self.cont, attr_name, getattr(self, attr_name))
         if auto_calc:
-            self.cont.set_all()
+            self.cont.set_all(None if attr_lst is None else cont_attr_lst)
         else:
             self.cont._extend_arrays_apply_units()
         assert self.cont.units_applied, "Container units not applied"
@@ -381,7 +653,12 @@ class CifFile(StructureFileParser):
         return cif_dct
 
     def _get_cif_block(self):
-        cf = pycifrw_CifFile.ReadCif(self.filename)
+        if com.is_compressed(self.filename):
+            # ReadCif() accepts any object with a read() method
+            with com.file_open(self.filename) as fd:
+                cf = pycifrw_CifFile.ReadCif(fd)
+        else:
+            cf = pycifrw_CifFile.ReadCif(self.filename)
         if self.block is None:
             cif_block = cf.first_block()
         else:
@@ -672,12 +949,12 @@ class PwSCFOutputFile(StructureFileParser):
         verbose("getting _stress_raw")
         key = 'P='
         cmd = "grep -c %s %s" %(key, self.filename)
-        nstep = nstep_from_txt(com.backtick(cmd))
+        nstep = nstep_from_txt(backtick(cmd))
         if nstep > 0:
             cmd = "grep -A3 '%s' %s | grep -v -e %s -e '--'| \
                   %s '{print $4\"  \"$5\"  \"$6}'" \
                   %(key, self.filename, key, AWK)
-            return traj_from_txt(com.backtick(cmd),
+            return traj_from_txt(backtick(cmd),
                                  shape=(nstep,3,3),
                                  axis=self.timeaxis)
         else:
@@ -686,7 +963,7 @@ class PwSCFOutputFile(StructureFileParser):
     def _get_etot_raw(self):
         verbose("getting _etot_raw")
         cmd =  r"grep '^!' %s | %s '{print $5}'" %(self.filename, AWK)
-        return arr1d_from_txt(com.backtick(cmd))
+        return arr1d_from_txt(backtick(cmd))
 
     def _get_forces_raw(self):
         verbose("getting _forces_raw")
@@ -695,14 +972,14 @@ class PwSCFOutputFile(StructureFileParser):
             # wrong if the output file is a concatenation of multiple smaller files
             key = r'Forces\s+acting\s+on\s+atoms.*$'
             cmd = r"egrep -c '%s' %s" %(key.replace(r'\s', r'[ ]'), self.filename)
-            nstep = nstep_from_txt(com.backtick(cmd))
+            nstep = nstep_from_txt(backtick(cmd))
             if nstep > 0:
                 # Need to split traj_from_txt() up into loadtxt() + arr2d_to_3d() b/c
                 # we need to get `nlines` first without an additional "grep -c
                 # ..."
                 cmd = "grep 'atom.*type.*force' %s \
                     | %s '{print $7\" \"$8\" \"$9}'" %(self.filename, AWK)
-                arr2d = arr2d_from_txt(com.backtick(cmd))
+                arr2d = arr2d_from_txt(backtick(cmd))
                 nlines = arr2d.shape[0]
                 # nlines_block = number of force lines per step = N*natoms
                 nlines_block = nlines // nstep
@@ -720,7 +997,7 @@ class PwSCFOutputFile(StructureFileParser):
         verbose("getting _nstep_scf_raw")
         cmd = r"grep 'convergence has been achieved in' %s | %s '{print $6}'" \
             %(self.filename, AWK)
-        return arr1d_from_txt(com.backtick(cmd), dtype=int)
+        return arr1d_from_txt(backtick(cmd), dtype=int)
 
     def _get_coords_symbols(self):
         """Grep start coords and symbols from pw.out header. This is always in
@@ -734,11 +1011,11 @@ class PwSCFOutputFile(StructureFileParser):
         cmd = r"egrep -m1 -A%i 'site.*atom.*positions.*units.*\)' %s | tail -n%i | \
               sed -re 's/.*\((.*)\)/\1/g'" \
               %(natoms, self.filename, natoms)
-        coords = arr2d_from_txt(com.backtick(cmd))
+        coords = arr2d_from_txt(backtick(cmd))
         cmd = r"egrep -m1 -A%i 'site.*atom.*positions.*units.*\)' %s | tail -n%i | \
               %s '{print $2}'" \
               %(natoms, self.filename, natoms, AWK)
-        symbols = com.backtick(cmd).strip().split()
+        symbols = backtick(cmd).strip().split()
         return {'coords': coords, 'symbols': symbols}
 
     def _get_cell_2d(self):
@@ -753,7 +1030,7 @@ class PwSCFOutputFile(StructureFileParser):
         value."""
         cmd = "egrep -m1 -A3 'crystal.*axes.*units.*(a_0|alat)' %s | tail -n3 | \
                %s '{print $4\" \"$5\" \"$6}'" %(self.filename, AWK)
-        return arr2d_from_txt(com.backtick(cmd))
+        return arr2d_from_txt(backtick(cmd))
 
     def get_alat(self, use_alat=None):
         """Lattice parameter "alat" [Bohr]. If use_alat or self.use_alat is
@@ -768,7 +1045,7 @@ class PwSCFOutputFile(StructureFileParser):
         if use_alat:
             cmd = r"grep -m1 'lattice parameter' %s | \
                 sed -re 's/.*=(.*)\s+a\.u\./\1/'" %self.filename
-            return float_from_txt(com.backtick(cmd))
+            return float_from_txt(backtick(cmd))
         else:
             return 1.0
 
@@ -823,18 +1100,18 @@ class PwSCFOutputFile(StructureFileParser):
         verbose("getting natoms")
         cmd = r"grep -m 1 'number.*atoms/cell' %s | \
               sed -re 's/.*=\s+([0-9]+).*/\1/'" %self.filename
-        return int_from_txt(com.backtick(cmd))
+        return int_from_txt(backtick(cmd))
 
     def get_nkpoints(self):
         verbose("getting nkpoints")
         cmd = r"grep -m 1 'number of k points=' %s | \
             sed -re 's/.*points=\s*([0-9]+)\s*.*/\1/'" %self.filename
-        return int_from_txt(com.backtick(cmd))
+        return int_from_txt(backtick(cmd))
 
     def get_scf_converged(self):
         verbose("getting scf_converged")
         cmd = "grep 'convergence has been achieved in.*iterations' %s" %self.filename
-        if com.backtick(cmd).strip() != "":
+        if backtick(cmd).strip() != "":
             return True
         else:
             return False
@@ -916,7 +1193,7 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
         """
         assert key not in ['', None], "got illegal string"
         cmd = 'grep -m1 %s %s' %(key, self.filename)
-        tmp = com.backtick(cmd).strip()
+        tmp = backtick(cmd).strip()
         for sym in ['(', ')', '{', '}']:
             tmp = tmp.replace(sym, '')
         tmp = tmp.split()
@@ -935,12 +1212,12 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
             # wrong if the output file is a concatenation of multiple smaller files
             key = 'ATOMIC_POSITIONS'
             cmd = 'grep -c %s %s' %(key, self.filename)
-            nstep = nstep_from_txt(com.backtick(cmd))
+            nstep = nstep_from_txt(backtick(cmd))
             # coords
             cmd = "grep -A%i '%s' %s | grep -v -e %s -e '--' | \
                   %s '{print $2\"  \"$3\"  \"$4}'" \
                   %(natoms, key, self.filename, key, AWK)
-            return traj_from_txt(com.backtick(cmd),
+            return traj_from_txt(backtick(cmd),
                                  shape=(nstep,natoms,3),
                                  axis=self.timeaxis)
         else:
@@ -957,10 +1234,10 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
         # nstep
         key = 'CELL_PARAMETERS'
         cmd = 'grep -c %s %s' %(key, self.filename)
-        nstep = nstep_from_txt(com.backtick(cmd))
+        nstep = nstep_from_txt(backtick(cmd))
         # cell
         cmd = "grep -A3 %s %s | grep -v -e %s -e '--'" %(key, self.filename, key)
-        return traj_from_txt(com.backtick(cmd),
+        return traj_from_txt(backtick(cmd),
                              shape=(nstep,3,3),
                              axis=self.timeaxis)
 
@@ -986,13 +1263,13 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
         cell of the old run.
         """
         cmd = 'grep -m1 CELL_PARAMETERS.*alat.*= %s' %self.filename
-        if com.backtick(cmd).strip() == '':
+        if backtick(cmd).strip() == '':
             return None
         else:
             if self.use_alat:
                 cmd = r"grep CELL_PARAMETERS %s | sed -re 's/.*alat.*=\s*(" \
                     %self.filename + regex.float_re + r")\)*.*/\1/g'"
-                return arr1d_from_txt(com.backtick(cmd))
+                return arr1d_from_txt(backtick(cmd))
             else:
                 return None
 
@@ -1096,7 +1373,7 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
         verbose("getting ekin")
         cmd = r"grep 'kinetic energy' %s | %s '{print $5}'" %(self.filename,
                                                               AWK)
-        return arr1d_from_txt(com.backtick(cmd))
+        return arr1d_from_txt(backtick(cmd))
 
     def get_temperature(self):
         """Temperature [K]"""
@@ -1104,13 +1381,13 @@ class PwMDOutputFile(TrajectoryFileParser, PwSCFOutputFile):
         cmd = r"egrep 'temperature[ ]*=' %s " %self.filename + \
               r"| sed -re 's/.*temp.*=\s*(" + regex.float_re + \
               r")\s*K/\1/'"
-        return arr1d_from_txt(com.backtick(cmd))
+        return arr1d_from_txt(backtick(cmd))
 
     def get_timestep(self):
         """Time step [tryd]."""
         cmd = r"grep -m1 'Time.*step' %s | sed -re \
               's/.*step\s+=\s+(.*)a.u..*/\1/'" %self.filename
-        return float_from_txt(com.backtick(cmd))
+        return float_from_txt(backtick(cmd))
 
     def get_stress(self):
         """Stress tensor [kbar]."""
@@ -1142,7 +1419,7 @@ class PwVCMDOutputFile(PwMDOutputFile):
         verbose("getting _datadct")
         cmd = "grep 'Ekin.*T.*Etot' %s \
               | %s '{print $3\" \"$7\" \"$11}'" %(self.filename, AWK)
-        ret_str = com.backtick(cmd)
+        ret_str = backtick(cmd)
         if ret_str.strip() == '':
             return None
         else:
@@ -1241,20 +1518,20 @@ class CpmdSCFOutputFile(StructureFileParser):
                   | tail -n%i \
                   | %s '{print $3\" \"$4\" \"$5\" \"$6\" \"$7\" \"$8}'" \
                   %(self.natoms, self.filename, self.natoms, AWK)
-            return arr2d_from_txt(com.backtick(cmd))
+            return arr2d_from_txt(backtick(cmd))
         else:
             return None
 
     def _get_scale_file(self):
         """Read GEOMETRY.scale file with fractional coords."""
-        fn = os.path.join(self.basedir, 'GEOMETRY.scale')
+        fn = com.find_file(os.path.join(self.basedir, 'GEOMETRY.scale'))
         if os.path.exists(fn):
             cmd = "grep -A3 'CELL MATRIX (BOHR)' %s | tail -n3" %fn
-            cell = arr2d_from_txt(com.backtick(cmd))
+            cell = arr2d_from_txt(backtick(cmd))
             self.assert_set_attr('natoms')
             cmd = "grep -A%i 'SCALED ATOMIC COORDINATES' %s | tail -n%i" \
                   %(self.natoms, fn, self.natoms)
-            arr = arr2d_from_txt(com.backtick(cmd), dtype=str)
+            arr = arr2d_from_txt(backtick(cmd), dtype=str)
             coords_frac = arr[:,:3].astype(np.float)
             symbols = arr[:,3].tolist()
             return {'coords_frac': coords_frac,
@@ -1281,14 +1558,14 @@ class CpmdSCFOutputFile(StructureFileParser):
         """[kbar]"""
         verbose("getting stress")
         cmd = "grep -A3 'TOTAL STRESS TENSOR' %s | tail -n3" %self.filename
-        return arr2d_from_txt(com.backtick(cmd))
+        return arr2d_from_txt(backtick(cmd))
 
     def get_etot(self):
         """[Ha]"""
         verbose("getting etot")
         cmd =  r"grep 'TOTAL ENERGY =' %s | tail -n1 | %s '{print $5}'" \
         %(self.filename, AWK)
-        return float_from_txt(com.backtick(cmd))
+        return float_from_txt(backtick(cmd))
 
     def get_coords_frac(self):
         verbose("getting coords_frac")
@@ -1319,10 +1596,10 @@ class CpmdSCFOutputFile(StructureFileParser):
         variable cell calcs) there are some additional lines w/ 3 columns,
         which we skip."""
         verbose("getting natoms")
-        fn = os.path.join(self.basedir, 'GEOMETRY')
+        fn = com.find_file(os.path.join(self.basedir, 'GEOMETRY'))
         if os.path.exists(fn):
             cmd = "egrep -c '([0-9][ ]+.*){5,}' %s" %fn
-            return int_from_txt(com.backtick(cmd))
+            return int_from_txt(backtick(cmd))
         else:
             return None
 
@@ -1330,18 +1607,18 @@ class CpmdSCFOutputFile(StructureFileParser):
         verbose("getting nkpoints")
         cmd = r"grep 'NUMBER OF SPECIAL K POINTS' %s | \
             sed -re 's/.*COORDINATES\):\s*([0-9]+)\s*.*/\1/'" %self.filename
-        return int_from_txt(com.backtick(cmd))
+        return int_from_txt(backtick(cmd))
 
     def get_nstep_scf(self):
         verbose("getting nstep_scf")
         cmd = r"grep -B2 'RESTART INFORMATION WRITTEN' %s | head -n1 \
               | %s '{print $1}'" %(self.filename, AWK)
-        return int_from_txt(com.backtick(cmd))
+        return int_from_txt(backtick(cmd))
 
     def get_scf_converged(self):
         verbose("getting scf_converged")
         cmd = "grep 'BUT NO CONVERGENCE' %s" %self.filename
-        if com.backtick(cmd).strip() == "":
+        if backtick(cmd).strip() == "":
             return True
         else:
             return False
@@ -1522,7 +1799,7 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
 
     def _get_energies_file(self):
         verbose("getting _energies_file")
-        fn = os.path.join(self.basedir, 'ENERGIES')
+        fn = com.find_file(os.path.join(self.basedir, 'ENERGIES'))
         if os.path.exists(fn):
             arr = np.loadtxt(fn)
             ncols = arr.shape[-1]
@@ -1554,8 +1831,8 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
         self.assert_set_attr('natoms')
         have_file = False
         have_forces = False
-        fn_tr = os.path.join(self.basedir, 'TRAJECTORY')
-        fn_ftr = os.path.join(self.basedir, 'FTRAJECTORY')
+        fn_tr = com.find_file(os.path.join(self.basedir, 'TRAJECTORY'))
+        fn_ftr = com.find_file(os.path.join(self.basedir, 'FTRAJECTORY'))
         if os.path.exists(fn_ftr):
             have_forces = True
             have_file = True
@@ -1568,7 +1845,7 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
             fn = fn_tr
         if have_file:
             cmd = "grep -c -v '<<<<' %s" %fn
-            nlines = int_from_txt(com.backtick(cmd))
+            nlines = int_from_txt(backtick(cmd))
             nstep = float(nlines) / float(self.natoms)
             assert nstep % 1.0 == 0.0, (str(self.__class__) + \
                 "nlines is not a multiple of nstep in %s" %fn)
@@ -1601,14 +1878,14 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
         # So far tested CELL files have 6 cols:
         # 1-3: x,y,z cell vectors
         # 4-6: cell forces? ditch them for now ...
-        fn = os.path.join(self.basedir, 'CELL')
+        fn = com.find_file(os.path.join(self.basedir, 'CELL'))
         if os.path.exists(fn):
             cmd = "head -n2 %s | tail -n1 | wc | %s '{print $2}'" %(fn, AWK)
-            ncols = int_from_txt(com.backtick(cmd))
+            ncols = int_from_txt(backtick(cmd))
             cmd = "grep -c 'CELL PARAMETERS' %s" %fn
-            nstep = int_from_txt(com.backtick(cmd))
+            nstep = int_from_txt(backtick(cmd))
             cmd = "grep -A3 'CELL PARAMETERS' %s | grep -v 'CELL'" %fn
-            arr = traj_from_txt(com.backtick(cmd),
+            arr = traj_from_txt(backtick(cmd),
                                 shape=(nstep,3,ncols),
                                 axis=self.timeaxis)
             return arr[...,:3]
@@ -1703,12 +1980,12 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
     def get_stress(self):
         """Stress tensor from STRESS file if available [kbar]"""
         verbose("getting stress")
-        fn = os.path.join(self.basedir, 'STRESS')
+        fn = com.find_file(os.path.join(self.basedir, 'STRESS'))
         if os.path.exists(fn):
             cmd = "grep -c 'TOTAL STRESS' %s" %fn
-            nstep = int_from_txt(com.backtick(cmd))
+            nstep = int_from_txt(backtick(cmd))
             cmd = "grep -A3 'TOTAL STRESS TENSOR' %s | grep -v TOTAL" %fn
-            return traj_from_txt(com.backtick(cmd),
+            return traj_from_txt(backtick(cmd),
                                  shape=(nstep,3,3),
                                  axis=self.timeaxis)
         else:
@@ -1734,7 +2011,7 @@ class CpmdMDOutputFile(TrajectoryFileParser, CpmdSCFOutputFile):
         """Timestep [thart]."""
         cmd = r"grep 'TIME STEP FOR IONS' %s | \
             sed -re 's/.*IONS:\s+(.*)$/\1/'" %self.filename
-        return float_from_txt(com.backtick(cmd))
+        return float_from_txt(backtick(cmd))
 
 
 class Cp2kSCFOutputFile(StructureFileParser):
@@ -1768,13 +2045,13 @@ class Cp2kSCFOutputFile(StructureFileParser):
     def _get_run_type(self):
         cmd = r"grep -m1 'GLOBAL.*Run type' {0} | sed \
             -re 's/.*type\s+(.*)\s*/\1/'".format(self.filename)
-        return com.backtick(cmd).strip()
+        return backtick(cmd).strip()
 
     def _get_natoms_symbols_forces(self):
         cmd = r"sed -nre '1,/ATOMIC FORCES/d; " + \
               r"1,/Atom\s+Kind\s+Element/d; " + \
               r"/SUM OF ATOMIC FORCES/q;p' %s" %self.filename
-        ret = com.backtick(cmd).strip()
+        ret = backtick(cmd).strip()
         if ret != '':
             arr = np.array([x.split() for x in ret.splitlines()])
             return {'natoms': arr.shape[0],
@@ -1805,14 +2082,14 @@ class Cp2kSCFOutputFile(StructureFileParser):
     def get_etot(self):
         """[Ha]"""
         cmd = r"sed -nre 's/.*ENERGY.*Total.*energy.*:(.*)/\1/p' %s" %self.filename
-        return float_from_txt(com.backtick(cmd))
+        return float_from_txt(backtick(cmd))
 
 
     def get_stress(self):
         """[GPa]"""
         cmd = r"grep -A5 'STRESS TENSOR.*GPa' %s | egrep -v 'X[ ]+Y[ ]+Z' | \
             egrep '^[ ]+(X|Y|Z)'" %self.filename
-        ret = com.backtick(cmd).strip()
+        ret = backtick(cmd).strip()
         arr = np.array([x.split() for x in ret.splitlines()])
         return arr[:,1:].astype(float)
 
@@ -1840,12 +2117,12 @@ class Cp2kMDOutputFile(TrajectoryFileParser, Cp2kSCFOutputFile):
             'velocity',
         ]
         self.init_attr_lst()
-        self._cell_file = common.pj(self.basedir, 'PROJECT-1.cell')
-        self._ener_file = common.pj(self.basedir, 'PROJECT-1.ener')
-        self._stress_file = common.pj(self.basedir, 'PROJECT-1.stress')
-        self._pos_file = common.pj(self.basedir, 'PROJECT-pos-1.xyz')
-        self._frc_file = common.pj(self.basedir, 'PROJECT-frc-1.xyz')
-        self._vel_file = common.pj(self.basedir, 'PROJECT-vel-1.xyz')
+        self._cell_file = com.find_file(pj(self.basedir, 'PROJECT-1.cell'))
+        self._ener_file = com.find_file(pj(self.basedir, 'PROJECT-1.ener'))
+        self._stress_file = com.find_file(pj(self.basedir, 'PROJECT-1.stress'))
+        self._pos_file = com.find_file(pj(self.basedir, 'PROJECT-pos-1.xyz'))
+        self._frc_file = com.find_file(pj(self.basedir, 'PROJECT-frc-1.xyz'))
+        self._vel_file = com.find_file(pj(self.basedir, 'PROJECT-vel-1.xyz'))
 
     @staticmethod
     def _cp2k_repack_arr(arr):
@@ -1863,14 +2140,11 @@ class Cp2kMDOutputFile(TrajectoryFileParser, Cp2kSCFOutputFile):
         return out
 
     def _cp2k_xyz2arr(self, fn):
-        """Parse cp2k style XYZ files and return the 3d array."""
-        cmd = "grep -c 'i = .*E =' %s" %fn
-        nstep = nstep_from_txt(com.backtick(cmd))
-        natoms = int_from_txt(com.backtick("head -n1 %s" %fn))
-        cmd = "%s '!/i =.*E =|^[ ]+[0-9]+/ \
-            {print $2\" \"$3\" \"$4}' %s" %(AWK, fn)
+        """Parse cp2k style XYZ files and return the 3d array. The frame index
+        is cached in ``fn + '.idx'``, see :class:`~pwtools.frameindex.XyzFile`.
+        """
         assert self.timeaxis == 0
-        return np.fromstring(common.backtick(cmd), sep=' ').reshape(nstep,natoms,3)
+        return frameindex.XyzFile(fn).read()
 
     def _get_cell_file_arr(self):
         if os.path.exists(self._cell_file):
@@ -1893,13 +2167,13 @@ class Cp2kMDOutputFile(TrajectoryFileParser, Cp2kSCFOutputFile):
     def get_natoms(self):
         cmd = r"grep -m1 'Number of atoms:' %s | \
             sed -re 's/.*:(.*)/\1/'" %self.filename
-        return int_from_txt(com.backtick(cmd))
+        return int_from_txt(backtick(cmd))
 
     def get_timestep(self):
         """[fs]"""
         cmd = r"egrep -m1 'MD\| Time Step \[fs\]' %s | \
             sed -re 's/.*\](.*)/\1/'" %self.filename
-        return float_from_txt(com.backtick(cmd))
+        return float_from_txt(backtick(cmd))
 
     def get_symbols(self):
         for fn in [self._pos_file, self._frc_file, self._vel_file]:
@@ -1907,18 +2181,18 @@ class Cp2kMDOutputFile(TrajectoryFileParser, Cp2kSCFOutputFile):
                 cmd = r"grep -m1 -A%i 'i =' %s | \
                     grep -v 'i ='| %s '{print $1}'" \
                     %(self.natoms, fn, AWK)
-                return com.backtick(cmd).strip().split()
+                return backtick(cmd).strip().split()
         return None
 
     def _get_forces_from_outfile(self):
         if self.check_set_attr('natoms'):
             cmd = r"grep -c 'ATOMIC FORCES in' %s" %self.filename
-            nstep = nstep_from_txt(com.backtick(cmd))
+            nstep = nstep_from_txt(backtick(cmd))
             cmd = r"sed -re '/^\s*$/d' {fn} | grep -A{nlines} 'ATOMIC FORCES in' \
                  | egrep -v -e 'ATOM|--|Kind' \
                  | tr -s ' ' | cut -d ' ' -f5-".format(fn=self.filename,
                                                        nlines=self.natoms+1)
-            return traj_from_txt(com.backtick(cmd),
+            return traj_from_txt(backtick(cmd),
                                  shape=(nstep,self.natoms,3),
                                  axis=self.timeaxis)
         else:
@@ -2001,14 +2275,14 @@ class Cp2kRelaxOutputFile(Cp2kMDOutputFile):
     def get_natoms(self):
         if os.path.exists(self._pos_file):
             cmd = r"head -n1 {0}".format(self._pos_file)
-            return int_from_txt(com.backtick(cmd))
+            return int_from_txt(backtick(cmd))
         else:
             return None
 
     def get_etot(self):
         if os.path.exists(self._pos_file):
             cmd = r"%s '/i =.*E/ {print $6}' %s" %(AWK, self._pos_file)
-            return arr1d_from_txt(com.backtick(cmd))
+            return arr1d_from_txt(backtick(cmd))
         else:
             return None
 
@@ -2045,41 +2319,40 @@ class Cp2kRelaxOutputFile(Cp2kMDOutputFile):
 
 class DcdOutputFile(object):
     """Base class which implements dcd file reading. Used only for
-    inheritance."""
+    inheritance.
+
+    The dcd file is opened as :class:`~pwtools.dcd.DcdFile` (memory mapped),
+    so natoms and nstep are known instantly and coords / cryst_const are read
+    only if requested."""
     _dcd_convang = False
 
-    def _get_dcd_data(self):
+    def _get_dcd_file(self):
         if os.path.exists(self.dcdfilename):
-            cryst_const, coords = dcd.read_dcd_data(self.dcdfilename, convang=self._dcd_convang)
-            return {'cryst_const': cryst_const,
-                    'coords': coords,
-                    'nstep': cryst_const.shape[0],
-                    'natoms': coords.shape[1],
-                    'timestep': dcd.read_dcd_header(self.dcdfilename)['timestep']}
+            return dcd.DcdFile(self.dcdfilename, convang=self._dcd_convang)
         else:
             return None
 
     def get_coords(self):
-        if self.check_set_attr('_dcd_data'):
-            return self._dcd_data['coords']
+        if self.check_set_attr('_dcd_file'):
+            return self._dcd_file.coords[:]
         else:
             return None
 
     def get_cryst_const(self):
-        if self.check_set_attr('_dcd_data'):
-            return self._dcd_data['cryst_const']
+        if self.check_set_attr('_dcd_file'):
+            return self._dcd_file.cryst_const[:]
         else:
             return None
 
     def get_natoms(self):
-        if self.check_set_attr('_dcd_data'):
-            return self._dcd_data['natoms']
+        if self.check_set_attr('_dcd_file'):
+            return self._dcd_file.natoms
         else:
             return None
 
     def get_nstep(self):
-        if self.check_set_attr('_dcd_data'):
-            return self._dcd_data['nstep']
+        if self.check_set_attr('_dcd_file'):
+            return self._dcd_file.nstep
         else:
             return None
 
@@ -2100,7 +2373,7 @@ class Cp2kDcdMDOutputFile(DcdOutputFile, Cp2kMDOutputFile):
     ``PROJECT-pos-1.dcd``."""
     def __init__(self, *args, **kwds):
         super(Cp2kDcdMDOutputFile, self).__init__(*args, **kwds)
-        self.dcdfilename = common.pj(self.basedir, 'PROJECT-pos-1.dcd')
+        self.dcdfilename = com.find_file(pj(self.basedir, 'PROJECT-pos-1.dcd'))
         self._dcd_convang = False
         self.attr_lst = [\
             'cryst_const',
@@ -2177,7 +2450,7 @@ class LammpsTextMDOutputFile(TrajectoryFileParser):
       the "header" (e.g. "Step Temp Volume Cella ..." in `filename` or
       "ITEM: ATOMS id type xsu ysu zsu fx fy fz vx vy vz" in
       `dumpfilename`) and map data to these symbols. See `_thermo_dct` and
-      `_dump_dct`. Currently, "xsu ysu zsu" is parsed to get
+      `_dump_file`. Currently, "xsu ysu zsu" is parsed to get
       coords_frac. "xu yu zu" is parsed to get coords. Wrapped coordinates
       (e.g. "xs ys zs" and "x y z") are ignored.
     * multiple runs from one input script (i.e. 2 or more ``run``
@@ -2233,9 +2506,9 @@ class LammpsTextMDOutputFile(TrajectoryFileParser):
         self.init_attr_lst()
         self.order = order
         # Text output file from ``dump <ID> all custom 1 ...``.
-        self.dumpfilename = pj(self.basedir, 'lmp.out.dump')
+        self.dumpfilename = com.find_file(pj(self.basedir, 'lmp.out.dump'))
         # written by io.write_lammps()
-        self.symbolsfilename = pj(self.basedir, 'lmp.struct.symbols')
+        self.symbolsfilename = com.find_file(pj(self.basedir, 'lmp.struct.symbols'))
 
     @staticmethod
     def _get_from_dct(dct, key):
@@ -2244,14 +2517,6 @@ class LammpsTextMDOutputFile(TrajectoryFileParser):
         else:
             return None
 
-    @staticmethod
-    def _assert_shape_mod(name, a, b):
-        mod = a % b
-        msg = ("{name}: shape mismatch: a: {a}, b: {b}, "
-               "{a} % {b} = {mod}, "
-               "should be 0".format(a=a,b=b,mod=mod,name=name))
-        assert mod == 0, msg
-
     def _get_thermo_dct(self):
         """Parse all text between "Step ..." and "Loop ..." in self.filename::
 
@@ -2271,53 +2536,36 @@ class LammpsTextMDOutputFile(TrajectoryFileParser):
 
         in the input file. I think if no ``thermo_style`` command is used, it
         still prints a line starting with "Step ...".
+
+        Multiple ``run`` or ``minimize`` commands in one input file, which
+        cause wildly mixed text, are handled, also if ``thermo_style`` changes
+        between them, see :func:`~pwtools.lammps.read_log_thermo`.
         """
         if os.path.exists(self.filename):
-            header = com.backtick("grep -m1 Step %s" %self.filename).split()
-            # Strip all text except for the data columns. Also works for
-            # multiple ``run`` or ``minimize`` commands in one input file,
-            # which cause wildly mixed text.
-            cmd = r"sed -nre '/^Step/,/^Loop/p' %s | \
-                    egrep -v 'Step|Loop'" %self.filename
-            arr = arr2d_from_txt(com.backtick(cmd))
-            return dict((x, arr[:,ii]) for ii,x in enumerate(header))
-        else:
-            return None
-
-    def _get_dump_dct(self):
-        if self.check_set_attr('natoms') and \
-           os.path.exists(self.dumpfilename):
-            cmd = r"grep -c 'ITEM: TIMESTEP' %s" %self.dumpfilename
-            nstep = nstep_from_txt(com.backtick(cmd))
-            header = com.backtick("grep -m1 'ITEM: ATOMS' %s \
-                | sed -re 's/.*TOMS //'" %self.dumpfilename).split()
-            cmd = r"grep -A%i 'ITEM: ATOMS' %s | \
-                    egrep -ve '--|ITEM'" %(self.natoms, self.dumpfilename)
-            arr = np.fromstring(com.backtick(cmd),
-                                sep=' ').reshape(nstep*self.natoms,len(header))
-            self._assert_shape_mod('dump', arr.shape[0], self.natoms)
-            return dict((x, arr[:,ii]) for ii,x in enumerate(header))
-        else:
-            return None
-
-    def _lmp_dump2arr3d(self, dct, keys):
-        if self.check_set_attr('natoms'):
+            return lammps.read_log_thermo(self.filename)
+        else:
+            return None
+
+    def _get_dump_file(self):
+        """:class:`~pwtools.lammps.DumpFile` instance with the frame index of
+        `dumpfilename`. Getters read only the dump columns they need."""
+        if os.path.exists(self.dumpfilename):
+            return lammps.DumpFile(self.dumpfilename)
+        else:
+            return None
+
+    def _lmp_dump2arr3d(self, keys):
+        if self.check_set_attr('_dump_file'):
             for k in keys:
-                if k not in dct:
+                if k not in self._dump_file.columns:
                     return None
-            nstep = dct[keys[0]].shape[0] // self.natoms
-            arr = np.array([dct[keys[0]],
-                            dct[keys[1]],
-                            dct[keys[2]]]).T.reshape((nstep,
-                                                      self.natoms,3))
-            return arr
+            return self._dump_file.read(cols=keys)
         else:
             return None
 
     def get_natoms(self):
-        if os.path.exists(self.dumpfilename):
-            cmd = r"grep -A1 -m1 'ITEM: NUMBER OF ATOMS' %s | tail -n1" %self.dumpfilename
-            return nstep_from_txt(com.backtick(cmd))
+        if self.check_set_attr('_dump_file') and self._dump_file.nstep > 0:
+            return int(self._dump_file.natoms[0])
         else:
             return None
 
@@ -2376,67 +2624,49 @@ class LammpsTextMDOutputFile(TrajectoryFileParser):
             return None
 
     def get_coords_frac(self):
-        if self.check_set_attr('_dump_dct'):
-            keys = 'xsu ysu zsu'.split()
-            return self._lmp_dump2arr3d(self._dump_dct, keys)
-        else:
-            return None
+        return self._lmp_dump2arr3d('xsu ysu zsu'.split())
 
     def get_coords(self):
-        if self.check_set_attr('_dump_dct'):
-            keys = 'xu yu zu'.split()
-            return self._lmp_dump2arr3d(self._dump_dct, keys)
-        else:
-            return None
+        return self._lmp_dump2arr3d('xu yu zu'.split())
 
     def get_forces(self):
-        if self.check_set_attr('_dump_dct'):
-            keys = 'fx fy fz'.split()
-            return self._lmp_dump2arr3d(self._dump_dct, keys)
-        else:
-            return None
+        return self._lmp_dump2arr3d('fx fy fz'.split())
 
     def get_velocity(self):
-        if self.check_set_attr('_dump_dct'):
-            keys = 'vx vy vz'.split()
-            return self._lmp_dump2arr3d(self._dump_dct, keys)
-        else:
-            return None
+        return self._lmp_dump2arr3d('vx vy vz'.split())
 
     def get_timestep(self):
         if os.path.exists(self.filename):
             cmd = r"grep -m1 timestep %s | \
                     sed -re 's/.*step (.*)/\1/'" %self.filename
-            return float_from_txt(com.backtick(cmd))
+            return float_from_txt(backtick(cmd))
         else:
             return None
 
     def get_symbols(self):
         if os.path.exists(self.symbolsfilename):
             return com.file_read(self.symbolsfilename).split()
-        elif self.check_set_attr_lst(['_dump_dct','natoms']):
-            if 'type' in self._dump_dct:
+        elif self.check_set_attr('_dump_file'):
+            if 'type' in self._dump_file.columns:
                 if self.order is None:
                    cmd = r"grep -m1 'dump_modify.*element' %s | sed -re \
                            's/.*ment (.*)/\1/'" %self.filename
                    revorder = dict((ii+1,sy) for ii,sy in \
-                              enumerate(com.backtick(cmd).split()))
+                              enumerate(backtick(cmd).split()))
                 else:
                     # {'a':1,'b':2} -> {1:'a',2:'b'}
                     revorder = dict((v,k) for k,v in self.order.items())
-                return [revorder[int(ii)] for ii in self._dump_dct['type'][:self.natoms]]
+                types = self._dump_file.read(cols=['type'], frames=0)[0,:,0]
+                return [revorder[int(ii)] for ii in types]
             else:
                 return None
         else:
             return None
 
     def get_cell(self):
-        if os.path.exists(self.dumpfilename):
-            cmd = r"grep -c 'ITEM: BOX BOUNDS' %s" %self.dumpfilename
-            nstep = nstep_from_txt(com.backtick(cmd))
-            cmd = r"grep -A3 'ITEM: BOX BOUNDS' %s | \
-                    egrep -ve '--|ITEM'" %self.dumpfilename
-            arr = np.fromstring(com.backtick(cmd), sep=' ').reshape((nstep,3,3))
+        if self.check_set_attr('_dump_file'):
+            arr = self._dump_file.box
+            nstep = arr.shape[0]
             cell = np.zeros_like(arr)
             for ii in range(nstep):
                 xlo_bound = arr[ii,0,0]
@@ -2498,4 +2728,4 @@ class LammpsDcdMDOutputFile(DcdOutputFile, LammpsTextMDOutputFile):
         ]
         self.init_attr_lst()
         self._dcd_convang = True
-        self.dcdfilename = pj(self.basedir, 'lmp.out.dcd')
+        self.dcdfilename = com.find_file(pj(self.basedir, 'lmp.out.dcd'))
@@ -1,7 +1,7 @@
 """Some handy tools to construct strings for building pwscf input files.
 Readers for QE postprocessing tool output (matdyn.x, dynmat.x)."""
 
-import re, os, warnings
+import re, os, warnings, mmap, concurrent.futures
 import numpy as np
 from pwtools.common import fix_eps, str_arr, file_readlines, pj
 from pwtools import parse, crys, common
@@ -158,15 +158,84 @@ def bool2str(x):
     return '.true.' if x else '.false.'
 
 
-def read_matdyn_modes(filename, natoms=None):
+# "q = 0.0 0.0 0.5" (matdyn.modes) or "q = ( 0.0 0.0 0.5 )" (ph.dyn*). A
+# pattern starting with a literal is much faster than one anchored at "^\s*".
+_RE_QPOINT = re.compile(rb'q[ \t]*=[ \t]*\(?([^)\n]*)')
+
+
+def _find_qpoints(buf):
+    """Matches of all "q = ..." lines in `buf`."""
+    matches = []
+    for m in _RE_QPOINT.finditer(buf):
+        # only "q" at the start of a line
+        pos = buf.rfind(b'\n', 0, m.start()) + 1
+        if buf[pos:m.start()].strip() == b'':
+            matches.append(m)
+    return matches
+
+
+def _parse_modes_block(buf, natoms=None):
+    """Frequencies and eigenvectors of one q-point block of matdyn.modes or
+    the diagonalization part of a ph.dyn file.
+
+    Parameters
+    ----------
+    buf : bytes
+    natoms : int, optional
+        determined from the number of vector lines if None
+
+    Returns
+    -------
+    freqs, vecs
+    freqs : (nmodes,)
+    vecs : complex (nmodes, natoms, 3)
+    """
+    # Mode header lines "omega( 1) = ... [THz] = ... [cm-1]" (newer QE:
+    # "freq (    1) = ..."), each followed by natoms vector lines
+    # "( x_re x_im y_re y_im z_re z_im )". The block ends with "*****".
+    marker = b'omega' if buf.find(b'omega') >= 0 else b'freq'
+    heads = []
+    pos = buf.find(marker)
+    while pos >= 0:
+        heads.append(pos)
+        pos = buf.find(marker, pos + len(marker))
+    freqs = np.empty((len(heads),), dtype=float)
+    segments = []
+    for ii, pos in enumerate(heads):
+        eol = buf.find(b'\n', pos)
+        freqs[ii] = float(buf[pos:eol].rsplit(b'=', 1)[1].split()[0])
+        if ii + 1 < len(heads):
+            end = heads[ii+1]
+        else:
+            end = buf.find(b'*', eol)
+            end = len(buf) if end < 0 else end
+        segments.append(buf[eol:end])
+    vals = np.fromstring(b''.join(segments).translate(None, b'()'), sep=' ')
+    if natoms is None:
+        # 3*natoms modes, natoms lines with 6 numbers per mode
+        natoms = int(round(np.sqrt(vals.size / 18.0)))
+    nmodes = 3*natoms
+    assert vals.size == nmodes*natoms*6, ("expect %i vector numbers for "
+        "natoms=%i, got %i" %(nmodes*natoms*6, natoms, vals.size))
+    assert freqs.shape == (nmodes,), ("expect %i frequencies, got %i"
+        %(nmodes, freqs.shape[0]))
+    # (re,im) pairs -> complex
+    return freqs, vals.view(complex).reshape(nmodes, natoms, 3)
+
+
+def read_matdyn_modes(filename, natoms=None, qpoints_idx=None):
     """Parse modes file produced by QE's matdyn.x.
 
     Parameters
     ----------
     filename : str
         File to parse (usually "matdyn.modes")
-    natoms : int
-        Number of atoms.
+    natoms : int, optional
+        Number of atoms, determined from the file if None.
+    qpoints_idx : int, slice, sequence of ints, optional
+        Read only these q-points (index in file order), e.g. ``slice(None,
+        None, 10)`` for every 10th. Other q-points are skipped without
+        parsing. Default: all.
 
     Returns
     -------
@@ -221,24 +290,46 @@ def read_matdyn_modes(filename, natoms=None):
        ( -0.085499   0.000180     0.107383  -0.000238    -0.086854   0.000096   )
       [...]
        **************************************************************************
+
+    The file is memory-mapped and each q-point block is parsed with
+    ``bytes.find`` and ``np.fromstring``, no external tools are used. Compressed
+    files (.gz, ...) are read into memory instead.
     """
-    assert natoms is not None
-    cmd = r"grep 'q.*=' %s | sed -re 's/.*q\s*=(.*)/\1/'" %filename
-    qpoints = parse.arr2d_from_txt(common.backtick(cmd))
-    nqpoints = qpoints.shape[0]
-    nmodes = 3*natoms
-    cmd = r"grep '^[ ]*(' %s | sed -re 's/^\s*\((.*)\)/\1/g'" %filename
-    # vecs_file_flat: (nqpoints * nmodes * natoms, 6)
-    # this line is the bottleneck
-    vecs_file_flat = parse.arr2d_from_txt(common.backtick(cmd))
-    vecs_flat = np.empty((vecs_file_flat.shape[0], 3), dtype=complex)
-    vecs_flat[:,0] = vecs_file_flat[:,0] + 1j*vecs_file_flat[:,1]
-    vecs_flat[:,1] = vecs_file_flat[:,2] + 1j*vecs_file_flat[:,3]
-    vecs_flat[:,2] = vecs_file_flat[:,4] + 1j*vecs_file_flat[:,5]
-    vecs = vecs_flat.flatten().reshape(nqpoints, nmodes, natoms, 3)
-    cmd = r"grep omega %s | sed -re \
-            's/.*omega.*=.*\[.*=(.*)\s*\[.*/\1/g'" %filename
-    freqs = np.fromstring(common.backtick(cmd), sep=' ').reshape((nqpoints, nmodes))
+    with common.file_open(filename, 'rb') as fd:
+        if common.is_compressed(filename):
+            buf = fd.read()
+        else:
+            # can't mmap an empty file
+            buf = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(fd.fileno()).st_size > 0 else b''
+        try:
+            # one block per q-point: from "q = ..." to the next one
+            qmatches = _find_qpoints(buf)
+            if len(qmatches) == 0:
+                raise ValueError("no q-points ('q = ...') found in "
+                                 "'{}'".format(filename))
+            starts = [m.start() for m in qmatches] + [len(buf)]
+            qpoints = np.array([np.fromstring(m.group(1), sep=' ') for m in
+                                qmatches])
+            qidx = np.arange(len(qmatches))
+            if qpoints_idx is not None:
+                qidx = np.atleast_1d(qidx[qpoints_idx])
+                if len(qidx) == 0:
+                    raise ValueError("qpoints_idx={} selects no q-points "
+                                     "in '{}'".format(qpoints_idx, filename))
+            qpoints = qpoints[qidx,:]
+            freqs = None
+            for ii, iq in enumerate(qidx):
+                ff, vv = _parse_modes_block(buf[starts[iq]:starts[iq+1]],
+                                            natoms=natoms)
+                if freqs is None:
+                    freqs = np.empty((len(qidx),) + ff.shape, dtype=float)
+                    vecs = np.empty((len(qidx),) + vv.shape, dtype=complex)
+                freqs[ii,...] = ff
+                vecs[ii,...] = vv
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
     return qpoints, freqs, vecs
 
 
@@ -252,8 +343,9 @@ def read_dyn(filename, natoms=None):
     ----------
     filename : str
         Name of dyn file. Example: "ph.dyn3" for qpoint 3.
-    natoms : int
-        number of atoms in the cell (used for nmodes=3*natoms only)
+    natoms : int, optional
+        number of atoms in the cell (used for nmodes=3*natoms only),
+        determined from the file if None
 
     Returns
     -------
@@ -265,27 +357,34 @@ def read_dyn(filename, natoms=None):
     vecs : 3d complex array (nmodes, natoms, 3)
         Complex eigenvectors of the dynamical matrix for the q-point.
     """
-    assert natoms is not None
-    cmd = r"egrep 'q.*=.*\(' %s | tail -n1 | sed -re 's/.*q\s*=.*\((.*)\)/\1/'" %filename
-    qpoints = np.fromstring(common.backtick(cmd), sep=' ')
+    with common.file_open(filename, 'rb') as fd:
+        return _parse_dyn(fd.read(), natoms=natoms)
+
+
+def _parse_dyn(buf, natoms=None):
+    """Parse content `buf` (bytes) of one ph.dyn file, see
+    :func:`read_dyn`."""
+    # The last "q = ( ... )" line starts the diagonalization part, the ones
+    # before belong to the dynamical matrix of each star member.
+    qmatch = _find_qpoints(buf)[-1]
+    qpoints = np.fromstring(qmatch.group(1), sep=' ')
     assert qpoints.shape == (3,)
-    nmodes = 3*natoms
-    cmd = r"grep -v 'q.*=' %s | grep '^[ ]*(' | sed -re 's/^\s*\((.*)\)/\1/g'" %filename
-    # vecs_file_flat: (nmodes * natoms, 6)
-    # this line is the bottleneck
-    vecs_file_flat = parse.arr2d_from_txt(common.backtick(cmd))
-    vecs_flat = np.empty((vecs_file_flat.shape[0], 3), dtype=complex)
-    vecs_flat[:,0] = vecs_file_flat[:,0] + 1j*vecs_file_flat[:,1]
-    vecs_flat[:,1] = vecs_file_flat[:,2] + 1j*vecs_file_flat[:,3]
-    vecs_flat[:,2] = vecs_file_flat[:,4] + 1j*vecs_file_flat[:,5]
-    vecs = vecs_flat.flatten().reshape(nmodes, natoms, 3)
-    cmd = r"grep omega %s | sed -re \
-            's/.*omega.*=.*\[.*=(.*)\s*\[.*/\1/g'" %filename
-    freqs = np.fromstring(common.backtick(cmd), sep=' ')
+    freqs, vecs = _parse_modes_block(buf[qmatch.end():], natoms=natoms)
     return qpoints, freqs, vecs
 
 
-def read_all_dyn(path, nqpoints=None, natoms=None, base='ph.dyn'):
+def _file_read_bytes(filename):
+    with common.file_open(filename, 'rb') as fd:
+        return fd.read()
+
+
+def _dyn_stamps(filenames):
+    return np.array([(st.st_size, st.st_mtime_ns) for st in
+                     map(os.stat, filenames)], dtype=np.int64)
+
+
+def read_all_dyn(path, nqpoints=None, natoms=None, base='ph.dyn', nthreads=1,
+                 nprocs=1, cache=False):
     """Same as :func:`read_matdyn_modes()`, but instead of the file
     ``matdyn.modes`` which contains freqs,vecs for all qpoints, we read all
     dynamical matrix files in `path`, one per qpoint.
@@ -294,28 +393,73 @@ def read_all_dyn(path, nqpoints=None, natoms=None, base='ph.dyn'):
     ----------
     path : str
         Path where dyn files live.
-    nqpoints : int
+    nqpoints : int, optional
         number of dyn files (e.g. 5 for "ph.dyn1", ..., "ph.dyn5" if
-        ``base='ph.dyn'``)
-    natoms : int
+        ``base='ph.dyn'``), default: all files ``<base>1``, ``<base>2``, ...
+    natoms : int, optional
+        determined from the files if None
     base : str
         Basename of the dyn files.
+    nthreads : int
+        Number of threads which read files concurrently. Use that for many
+        files on slow (network) file systems.
+    nprocs : int
+        Number of processes which parse the files concurrently. Only worth it
+        for big files (many atoms).
+    cache : bool
+        Store all results in ``<path>/<base>.npz`` and use that on later calls
+        as long as no dyn file has changed (size, modification time). Saves all
+        text parsing.
 
     Returns
     -------
     (qpoint,freqs,vecs)
         Same as :func:`read_matdyn_modes`
+
+    Raises
+    ------
+    ValueError if `nqpoints` is None and there is no file ``<path>/<base>1``
     """
-    nmodes = 3*natoms
-    qpoints = np.empty((nqpoints,3), dtype=float)
-    freqs = np.empty((nqpoints, nmodes), dtype=float)
-    vecs = np.empty((nqpoints, nmodes, natoms, 3), dtype=complex)
-    for iq in range(nqpoints):
-        filename = os.path.join(path, '%s%i' %(base, iq+1))
-        qq, ff, vv = read_dyn(filename, natoms=natoms)
-        qpoints[iq,...] = qq
-        freqs[iq,...] = ff
-        vecs[iq,...] = vv
+    if nqpoints is None:
+        nqpoints = 0
+        while os.path.exists(common.find_file(os.path.join(path, '%s%i'
+                                                           %(base, nqpoints+1)))):
+            nqpoints += 1
+        if nqpoints == 0:
+            raise ValueError("no files '{}' found, check `path` and "
+                             "`base`".format(os.path.join(path, base + '1')))
+    filenames = [common.find_file(os.path.join(path, '%s%i' %(base, iq+1)))
+                 for iq in range(nqpoints)]
+    cache_fn = os.path.join(path, base + '.npz')
+    if cache:
+        stamps = _dyn_stamps(filenames)
+        if os.path.exists(cache_fn):
+            with np.load(cache_fn) as npz:
+                if npz['stamps'].shape == stamps.shape and \
+                   (npz['stamps'] == stamps).all() and \
+                   (natoms is None or npz['vecs'].shape[2] == natoms):
+                    return npz['qpoints'], npz['freqs'], npz['vecs']
+    if nthreads > 1:
+        with concurrent.futures.ThreadPoolExecutor(nthreads) as ex:
+            bufs = list(ex.map(_file_read_bytes, filenames))
+    else:
+        bufs = map(_file_read_bytes, filenames)
+    if nprocs > 1:
+        with concurrent.futures.ProcessPoolExecutor(nprocs) as ex:
+            results = list(ex.map(_parse_dyn, bufs, [natoms]*nqpoints))
+    else:
+        results = [_parse_dyn(buf, natoms=natoms) for buf in bufs]
+    qpoints = np.array([rr[0] for rr in results])
+    freqs = np.array([rr[1] for rr in results])
+    vecs = np.array([rr[2] for rr in results])
+    if cache:
+        try:
+            # file object: np.savez would append ".npz"
+            with open(cache_fn, 'wb') as fd:
+                np.savez(fd, stamps=stamps, qpoints=qpoints, freqs=freqs,
+                         vecs=vecs)
+        except OSError:
+            pass
     return qpoints, freqs, vecs
 
 
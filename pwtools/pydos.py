@@ -15,10 +15,25 @@ Other codes which do that are [2]_ and [3]_.
 import os, warnings
 import numpy as np
 from scipy.fftpack import fft
-from scipy.signal import convolve, gaussian
+from scipy import fft as sfft
+from scipy.signal import convolve, gaussian, windows
+from scipy import stats
+from numpy.lib.stride_tricks import sliding_window_view
 from pwtools import constants, _flib, num
 from pwtools.verbose import verbose
-from pwtools.signal import pad_zeros, welch, mirror
+from pwtools.signal import pad_zeros, welch, mirror, fast_len, \
+    power_spectrum, _full_spectrum, _workers
+
+# Max. size in bytes of the complex FFT array in fftvacf(). Sets the number of
+# atoms which are transformed at once.
+VACF_CHUNK_NBYTES = 2**28
+
+
+def _reuse(buf, shape):
+    """Return `buf` if it has `shape`, else None (-> new array in
+    :func:`~pwtools.signal.power_spectrum`). For the last, smaller chunk in
+    loops over atoms."""
+    return buf if (buf is not None and buf.shape == shape) else None
 
 def pyvacf(vel, m=None, method=3):
     """Reference implementation for calculating the VACF of velocities in 3d
@@ -73,9 +88,68 @@ def pyvacf(vel, m=None, method=3):
     return c
 
 
-def fvacf(vel, m=None, method=2, nthreads=None):
-    """Interface to Fortran function _flib.vacf(). Otherwise same
-    functionallity as pyvacf(). Use this for production calculations.
+def fftvacf(vel, m=None, norm=True, chunksize=None, workers=None):
+    """VACF by FFT (Wiener-Khinchin theorem, as in
+    :func:`~pwtools.signal.acorr` method 7). Same result as :func:`pyvacf`
+    and the loop methods of :func:`fvacf` up to numerical noise, but
+    O(nstep*log(nstep)) instead of O(nstep**2).
+
+    All atoms and components in a chunk of `chunksize` atoms are zero-padded
+    and transformed at once by a real FFT along the time axis. The mass
+    weighted power spectra are summed before the one inverse FFT per chunk.
+
+    Parameters
+    ----------
+    vel : 3d array, (nstep, natoms, 3)
+        Atomic velocities.
+    m : 1d array (natoms,)
+        Atomic masses.
+    norm : bool
+        normalize to ``c[0] = 1``
+    chunksize : int, optional
+        Number of atoms per FFT, default: as many as fit in
+        :data:`VACF_CHUNK_NBYTES`.
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    c : 1d array (nstep,)
+        VACF
+    """
+    nstep, natoms = vel.shape[:2]
+    assert vel.shape[-1] == 3, ("last dim of vel must be 3: (nstep,natoms,3)")
+    if m is not None:
+        assert len(m) == natoms, "len(m) != vel.shape[1]"
+    # padding to >= 2*nstep-1 avoids wrap-around (circular correlation)
+    nfft = fast_len(2*nstep-1)
+    workers = _workers(workers)
+    if chunksize is None:
+        chunksize = max(1, VACF_CHUNK_NBYTES // ((nfft//2+1)*3*16))
+    pw = np.zeros((nfft//2+1,), dtype=float)
+    buf = None
+    for start in range(0, natoms, chunksize):
+        sl = slice(start, start+chunksize)
+        vv = vel[:,sl,:]
+        buf = power_spectrum(vv, n=nfft, axis=0, workers=workers,
+                             out=_reuse(buf, (nfft//2+1,) + vv.shape[1:]))
+        # |fft|^2, summed over components: (nfft//2+1, chunksize)
+        fv = buf.sum(axis=2)
+        if m is None:
+            pw += fv.sum(axis=1)
+        else:
+            pw += np.dot(fv, m[sl])
+    c = sfft.irfft(pw, n=nfft, workers=workers)[:nstep]
+    if norm:
+        return c / c[0]
+    else:
+        return c
+
+
+def fvacf(vel, m=None, method=3, nthreads=None):
+    """Interface to Fortran function _flib.vacf() and :func:`fftvacf`.
+    Otherwise same functionallity as pyvacf(). Use this for production
+    calculations.
 
     Parameters
     ----------
@@ -84,13 +158,15 @@ def fvacf(vel, m=None, method=2, nthreads=None):
     m : 1d array (natoms,)
         Atomic masses.
     method : int
-        | 1 : loops
-        | 2 : vectorized loops
+        | 1 : loops (Fortran)
+        | 2 : vectorized loops (Fortran)
+        | 3 : FFT, :func:`fftvacf`, by far the fastest for all but very
+        |     short trajectories
 
     nthreads : int ot None
         If int, then use this many OpenMP threads in the Fortran extension.
         Only useful if the extension was compiled with OpenMP support, of
-        course.
+        course. For method 3, the number of threads in ``scipy.fft``.
 
     Returns
     -------
@@ -140,6 +216,8 @@ def fvacf(vel, m=None, method=2, nthreads=None):
     # of a 1d-array which is fast, even if the length is not a power of two.
     # Padding is not needed.
     #
+    if method == 3:
+        return fftvacf(vel, m=m, workers=nthreads)
     natoms = vel.shape[1]
     nstep = vel.shape[0]
     assert vel.shape[-1] == 3, ("last dim of vel must be 3: (nstep,natoms,3)")
@@ -171,8 +249,71 @@ def fvacf(vel, m=None, method=2, nthreads=None):
     return c
 
 
+def _pad_len(nstep, npad=None, tonext=False):
+    """Array length after padding as in :func:`pdos`."""
+    nfft = nstep if npad is None else nstep + (nstep-1)*npad
+    if tonext == 'fast':
+        nfft = fast_len(nfft)
+    elif tonext:
+        nfft = 2**int(np.ceil(np.log2(nfft)))
+    return nfft
+
+
+def multitaper_power(vel, m=None, nw=4, ntapers=None, nfft=None,
+                     chunksize=None, workers=None):
+    """Mass-weighted power spectra of the velocities, one per DPSS taper,
+    summed over atoms and directions.
+
+    One batched FFT over tapers x atoms x directions per chunk of atoms.
+
+    Parameters
+    ----------
+    vel : 3d array (nstep, natoms, 3)
+    m : 1d array (natoms,), optional
+    nw : float
+        time-halfbandwidth product, the frequency resolution is ``2*nw/nstep``
+        in units of the sampling frequency
+    ntapers : int, optional
+        number of tapers, default ``2*nw-1``
+    nfft : int, optional
+        FFT length (zero padding), default `nstep`
+    chunksize : int, optional
+        number of atoms per FFT, default: as many as fit in
+        :data:`VACF_CHUNK_NBYTES`
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    2d array (ntapers, nfft//2)
+    """
+    nstep, natoms = vel.shape[:2]
+    nfft = nstep if nfft is None else nfft
+    ntapers = int(2*nw-1) if ntapers is None else ntapers
+    tapers = windows.dpss(nstep, nw, ntapers)
+    split_idx = nfft//2
+    if chunksize is None:
+        chunksize = max(1, VACF_CHUNK_NBYTES // ((nfft//2+1)*3*16*ntapers))
+    power = np.zeros((ntapers, split_idx), dtype=float)
+    buf = None
+    for start in range(0, natoms, chunksize):
+        sl = slice(start, start+chunksize)
+        # (nstep, ntapers, chunksize, 3)
+        vv = vel[:,None,sl,:] * tapers.T[:,:,None,None]
+        buf = power_spectrum(vv, n=nfft, axis=0, workers=workers,
+                             out=_reuse(buf, (nfft//2+1,) + vv.shape[1:]))
+        del vv
+        pw = buf[:split_idx,...].sum(axis=3)
+        if m is None:
+            power += pw.sum(axis=2).T
+        else:
+            power += np.dot(pw, np.asarray(m)[sl]).T
+    return power
+
+
 def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
-         npad=None, tonext=False, mirr=False, method='direct'):
+         npad=None, tonext=False, mirr=False, method='direct', nw=4,
+         ntapers=None, ci=0.95):
     """Phonon DOS by FFT of the VACF or direct FFT of atomic velocities.
 
     Integral area is normalized to `area`. It is possible (and recommended) to
@@ -192,15 +333,32 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
         use Welch windowing on data before FFT (reduces leaking effect,
         recommended)
     npad : {None, int}
-        method='direct' only: Length of zero padding along `axis`. `npad=None`
-        = no padding, `npad > 0` = pad by a length of ``(nstep-1)*npad``. `npad
-        > 5` usually results in sufficient interpolation.
-    tonext : bool
-        method='direct' only: Pad `vel` with zeros along `axis` up to the next
-        power of two after the array length determined by `npad`. This gives
-        you speed, but variable (better) frequency resolution.
+        method='direct','multitaper' only: Length of zero padding along
+        `axis`. `npad=None` = no padding, `npad > 0` = pad by a length of
+        ``(nstep-1)*npad``. `npad > 5` usually results in sufficient
+        interpolation.
+    tonext : bool or 'fast'
+        method='direct','multitaper' only: Pad `vel` with zeros along `axis`
+        up to the next power of two after the array length determined by
+        `npad`. This gives you speed, but variable (better) frequency
+        resolution. 'fast': pad only up to the next fast FFT length
+        (:func:`~pwtools.signal.fast_len`), which is as fast but much
+        shorter.
     mirr : bool
         method='vacf' only: mirror one-sided VACF at t=0 before fft
+    method : str
+        | 'direct' : FFT of the velocities
+        | 'vacf' : FFT of the VACF
+        | 'multitaper' : average of direct spectra with DPSS tapers instead
+        |     of the Welch window (`window` is ignored), see
+        |     :func:`multitaper_power`, much less noise from short trajectories
+    nw, ntapers :
+        method='multitaper' only: time-halfbandwidth product (frequency
+        resolution ``2*nw/(nstep*dt)``) and number of tapers (default
+        ``2*nw-1``)
+    ci : float
+        method='multitaper' only: level of the confidence interval (jackknife
+        over tapers)
 
     Returns
     -------
@@ -215,6 +373,10 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
         |     ``(faxis, pdos, (full_faxis, full_pdos, split_idx, vacf, fft_vacf))``
         |     fft_vacf : 1d complex array, result of fft(vacf) or fft(mirror(vacf))
         |     vacf : 1d array, the VACF
+        | if method == 'multitaper':
+        |     ``(faxis, pdos, lower, upper)``
+        |     lower, upper : 1d arrays, confidence interval of `pdos` at
+        |     level `ci`
 
     Examples
     --------
@@ -257,6 +419,25 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
     # assume vel.shape = (nstep,natoms,3)
     axis = 0
     assert vel.shape[-1] == 3
+    if method == 'multitaper':
+        if mass is not None:
+            assert len(mass) == vel.shape[1], "len(mass) != vel.shape[1]"
+        nfft = _pad_len(vel.shape[axis], npad=npad, tonext=tonext)
+        power = multitaper_power(vel, m=mass, nw=nw, ntapers=ntapers,
+                                 nfft=nfft)
+        ntap = power.shape[0]
+        faxis = np.fft.fftfreq(nfft, dt)[:nfft//2]
+        pw = power.mean(axis=0)
+        pdos = num.norm_int(pw, faxis, area=area)
+        if not full_out:
+            return faxis, pdos
+        # Jackknife over tapers of log(power), Student-t interval
+        assert ntap > 1, "need ntapers > 1 for confidence intervals"
+        logpw = np.log((ntap*pw[None,:] - power) / (ntap - 1))
+        std = np.sqrt((ntap - 1.0) / ntap *
+                      ((logpw - logpw.mean(axis=0))**2.0).sum(axis=0))
+        fac = stats.t.ppf(0.5 + 0.5*ci, ntap - 1) * std
+        return faxis, pdos, pdos * np.exp(-fac), pdos * np.exp(fac)
     if mass is not None:
         assert len(mass) == vel.shape[1], "len(mass) != vel.shape[1]"
         # define here b/c may be used twice below
@@ -274,19 +455,21 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
     if npad is not None:
         nadd = (vel2.shape[axis]-1)*npad
         if tonext:
-            vel2 = pad_zeros(vel2, tonext=True,
+            vel2 = pad_zeros(vel2, tonext=tonext,
                              tonext_min=vel2.shape[axis] + nadd,
                              axis=axis)
         else:
             vel2 = pad_zeros(vel2, tonext=False, nadd=nadd, axis=axis)
     if method == 'direct':
-        full_fft_vel = np.abs(fft(vel2, axis=axis))**2.0
-        full_faxis = np.fft.fftfreq(vel2.shape[axis], dt)
+        # real input: only the one-sided spectrum (nfft//2+1 points)
+        nfft = vel2.shape[axis]
+        half_fft_vel = power_spectrum(vel2, axis=axis)
+        full_faxis = np.fft.fftfreq(nfft, dt)
         split_idx = len(full_faxis)//2
         faxis = full_faxis[:split_idx]
         # First split the array, then multiply by `mass` and average. If
-        # full_out, then we need full_fft_vel below, so copy before slicing.
-        arr = full_fft_vel.copy() if full_out else full_fft_vel
+        # full_out, then we need half_fft_vel below, so copy before slicing.
+        arr = half_fft_vel.copy() if full_out else half_fft_vel
         fft_vel = num.slicetake(arr, slice(0, split_idx), axis=axis, copy=False)
         if mass is not None:
             fft_vel *= mass_bc
@@ -298,8 +481,10 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
             # have to re-calculate this here b/c we never calculate the full_pdos
             # normally
             if mass is not None:
-                full_fft_vel *= mass_bc
-            full_pdos = num.sum(full_fft_vel, axis=axis, keepdims=True)
+                half_fft_vel *= mass_bc
+            full_pdos = _full_spectrum(num.sum(half_fft_vel, axis=axis,
+                                               keepdims=True),
+                                       nfft, axis=axis)
             extra_out = (full_faxis, full_pdos, split_idx)
             return default_out + extra_out
         else:
@@ -323,6 +508,384 @@ def pdos(vel, dt=1.0, m=None, full_out=False, area=1.0, window=True,
             return default_out
 
 
+def pdos_projected(vel, symbols=None, dt=1.0, m=None, groups=None,
+                   directions=False, area=1.0, window=True, npad=1,
+                   tonext=False, chunksize=None, workers=None):
+    """Total and projected phonon DOS (by species, atom groups and cartesian
+    direction) from one FFT of the velocities.
+
+    Same as ``pdos(..., method='direct')``, but instead of summing the power
+    spectra of all atoms and directions, they are also summed over each
+    projection. All projections cost the same as the total DOS. The atoms
+    are processed in chunks, see :func:`fftvacf`.
+
+    Parameters
+    ----------
+    vel : 3d array (nstep, natoms, 3)
+        atomic velocities
+    symbols : sequence of str (natoms,), optional
+        atom symbols, add one column per species
+    dt : time step
+    m : 1d array (natoms,),
+        atomic mass array, if None then mass=1.0 for all atoms is used
+    groups : sequence, optional
+        atom groups, each an index array or a bool mask (natoms,), add one
+        column per group
+    directions : bool
+        add columns for x, y, z
+    area : float
+        normalize area under the total DOS to this value
+    window : bool
+        use Welch windowing on data before FFT
+    npad, tonext :
+        padding, see :func:`pdos`
+    chunksize : int, optional
+        number of atoms per FFT, default: as many as fit in
+        :data:`VACF_CHUNK_NBYTES`
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    array (nfreq, ncols), the columns are
+    faxis : 1d array [1/unit(dt)]
+    total : 1d array
+        the total phonon DOS, normalized to `area`, same as :func:`pdos`
+    species :
+        one column per species in ``numpy.unique(symbols)`` (same order as
+        :attr:`~pwtools.crys.Structure.symbols_unique`)
+    groups :
+        one column per group
+    x,y,z :
+        if `directions`
+
+    All projections are scaled with the normalization factor of the total
+    DOS, so species and directions add up to the total DOS.
+
+    Examples
+    --------
+    >>> arr = pdos_projected(tr.velocity, tr.symbols, dt=tr.timestep*fs,
+    ...                      m=tr.mass, directions=True)
+    >>> # tr.symbols_unique = ['Al', 'N']
+    >>> freq, total, dos_al, dos_n, dos_x, dos_y, dos_z = arr.T
+    """
+    nstep, natoms = vel.shape[:2]
+    assert vel.shape[-1] == 3
+    if m is not None:
+        assert len(m) == natoms, "len(m) != vel.shape[1]"
+    nfft = _pad_len(nstep, npad=npad, tonext=tonext)
+    split_idx = nfft//2
+    faxis = np.fft.fftfreq(nfft, dt)[:split_idx]
+    # weight matrix for species and groups (natoms, nproj)
+    proj = []
+    if symbols is not None:
+        assert len(symbols) == natoms, "len(symbols) != vel.shape[1]"
+        symbols = np.asarray(symbols)
+        proj += [symbols == sym for sym in np.unique(symbols)]
+    if groups is not None:
+        for grp in groups:
+            mask = np.zeros((natoms,), dtype=bool)
+            mask[grp] = True
+            proj.append(mask)
+    weights = np.array(proj, dtype=float).reshape(len(proj), natoms).T
+    win = welch(nstep)[:,None,None] if window else None
+    if chunksize is None:
+        chunksize = max(1, VACF_CHUNK_NBYTES // ((nfft//2+1)*3*16))
+    dos_proj = np.zeros((split_idx, len(proj)), dtype=float)
+    dos_xyz = np.zeros((split_idx, 3), dtype=float)
+    buf = None
+    for start in range(0, natoms, chunksize):
+        sl = slice(start, start+chunksize)
+        vv = vel[:,sl,:] if win is None else vel[:,sl,:] * win
+        buf = power_spectrum(vv, n=nfft, axis=0, workers=workers,
+                             out=_reuse(buf, (nfft//2+1,) + vv.shape[1:]))
+        # (split_idx, chunksize, 3)
+        pw = buf[:split_idx,...]
+        if m is not None:
+            pw *= np.asarray(m)[None,sl,None]
+        dos_xyz += pw.sum(axis=1)
+        dos_proj += np.dot(pw.sum(axis=2), weights[sl,:])
+    total = dos_xyz.sum(axis=1)
+    total_norm = num.norm_int(total, faxis, area=area)
+    fac = total_norm.sum() / total.sum()
+    cols = [faxis, total_norm, dos_proj.T * fac]
+    if directions:
+        cols.append(dos_xyz.T * fac)
+    return np.vstack(cols).T
+
+
+def _segment_power(vel, nperseg, step, window=None, nfft=None, m=None,
+                   workers=None):
+    """Mass-weighted power spectra of all complete segments
+    ``vel[i*step:i*step+nperseg]``, summed over atoms and directions. All
+    segments are strided views, transformed in batches which fit in
+    :data:`VACF_CHUNK_NBYTES`.
+
+    Returns
+    -------
+    2d array (nseg, nfft//2)
+    """
+    nstep, natoms = vel.shape[:2]
+    nfft = nperseg if nfft is None else nfft
+    split_idx = nfft//2
+    nseg = (nstep - nperseg)//step + 1 if nstep >= nperseg else 0
+    power = np.empty((nseg, split_idx), dtype=float)
+    if nseg == 0:
+        return power
+    # time axis last and contiguous, then segments are cheap strided views
+    # (natoms, 3, nseg, nperseg)
+    velt = np.ascontiguousarray(np.moveaxis(vel[:(nseg-1)*step+nperseg,...],
+                                            0, -1))
+    segs = sliding_window_view(velt, nperseg, axis=-1)[...,::step,:]
+    batch = max(1, VACF_CHUNK_NBYTES // ((nfft//2+1)*natoms*3*16))
+    buf = None
+    for start in range(0, nseg, batch):
+        sl = slice(start, start+batch)
+        ss = segs[...,sl,:] if window is None else segs[...,sl,:] * window
+        buf = power_spectrum(ss, n=nfft, axis=-1, workers=workers,
+                             out=_reuse(buf, ss.shape[:-1] + (nfft//2+1,)))
+        del ss
+        # (natoms, batch, split_idx)
+        pw = buf[...,:split_idx].sum(axis=1)
+        if m is None:
+            power[sl,:] = pw.sum(axis=0)
+        else:
+            power[sl,:] = np.tensordot(m, pw, axes=(0,0))
+    return power
+
+
+def _iter_vel_chunks(vel, chunksize):
+    """Arrays (also memmap, h5py datasets): chunks of `chunksize` steps,
+    else `vel` is an iterable of chunks."""
+    if hasattr(vel, 'shape'):
+        return (vel[start:start+chunksize,...] for start in
+                range(0, vel.shape[0], chunksize))
+    else:
+        return vel
+
+
+class WelchPDOS(object):
+    """Streaming phonon DOS estimator: average of the power spectra of
+    windowed, overlapping segments of the velocities (Welch's method).
+
+    Velocities are passed in chunks of any length with :meth:`update`, only
+    ``nperseg + len(chunk)`` steps are held in memory. Longer segments give
+    better frequency resolution, more segments less noise.
+
+    Examples
+    --------
+    >>> wp = WelchPDOS(nperseg=4096, dt=dt, m=mass)
+    >>> for vel in velocity_chunks:
+    ...     wp.update(vel)
+    >>> freq, dos = wp.get()
+    >>> # shortcut
+    >>> freq, dos = pdos_welch(vel, nperseg=4096, dt=dt, m=mass)
+
+    See Also
+    --------
+    :func:`pdos_welch`
+    """
+    def __init__(self, nperseg, dt=1.0, m=None, noverlap=None, window=True,
+                 nfft=None, area=1.0, workers=None):
+        """
+        Parameters
+        ----------
+        nperseg : int
+            segment length (number of steps)
+        dt : time step
+        m : 1d array (natoms,),
+            atomic mass array, if None then mass=1.0 for all atoms is used
+        noverlap : int, optional
+            overlap of segments, default ``nperseg//2``
+        window : bool or 1d array (nperseg,)
+            True: Welch window as in :func:`pdos`, False: no window
+        nfft : int, optional
+            FFT length (zero-padded segments), default `nperseg`
+        area : float
+            normalize area under frequency-PDOS curve to this value
+        workers : int, optional
+            number of threads for ``scipy.fft``
+        """
+        self.nperseg = nperseg
+        self.dt = dt
+        self.m = None if m is None else np.asarray(m, dtype=float)
+        self.noverlap = nperseg//2 if noverlap is None else noverlap
+        assert 0 <= self.noverlap < nperseg, "need 0 <= noverlap < nperseg"
+        self.nfft = nperseg if nfft is None else nfft
+        assert self.nfft >= nperseg, "need nfft >= nperseg"
+        self.area = area
+        self.workers = workers
+        if window is True:
+            self.window = welch(nperseg)
+        elif window is False:
+            self.window = None
+        else:
+            self.window = np.asarray(window)
+            assert self.window.shape == (nperseg,)
+        self.split_idx = self.nfft//2
+        self.power = np.zeros((self.split_idx,), dtype=float)
+        self.nsegments = 0
+        self._buf = None
+
+    def update(self, vel):
+        """Add velocities.
+
+        Parameters
+        ----------
+        vel : 3d array (nstep, natoms, 3)
+            the next `nstep` steps, any `nstep`
+        """
+        vel = np.asarray(vel)
+        assert vel.ndim == 3 and vel.shape[-1] == 3
+        if self.m is not None:
+            assert len(self.m) == vel.shape[1], "len(m) != vel.shape[1]"
+        if self._buf is None or len(self._buf) == 0:
+            buf = vel
+        else:
+            buf = np.concatenate((self._buf, vel), axis=0)
+        step = self.nperseg - self.noverlap
+        power = _segment_power(buf, self.nperseg, step, window=self.window,
+                               nfft=self.nfft, m=self.m,
+                               workers=self.workers)
+        self.power += power.sum(axis=0)
+        self.nsegments += power.shape[0]
+        # copy: don't keep a reference to the caller's (big) array
+        self._buf = buf[power.shape[0]*step:,...].copy()
+
+    def get(self):
+        """Return the current estimate.
+
+        Steps after the last complete segment are not used.
+
+        Returns
+        -------
+        ``(faxis, pdos)``
+        faxis : 1d array [1/unit(dt)]
+        pdos : 1d array, the phonon DOS, normalized to `area`
+        """
+        assert self.nsegments > 0, "no complete segment yet"
+        faxis = np.fft.fftfreq(self.nfft, self.dt)[:self.split_idx]
+        return faxis, num.norm_int(self.power / self.nsegments, faxis,
+                                   area=self.area)
+
+
+def pdos_welch(vel, nperseg, dt=1.0, m=None, chunksize=None, **kwds):
+    """Phonon DOS averaged over overlapping segments, see
+    :class:`WelchPDOS`.
+
+    Parameters
+    ----------
+    vel : 3d array (nstep, natoms, 3) or iterable of such arrays
+        Velocities. Arrays (also ``numpy.memmap`` or ``h5py`` datasets) are
+        read in chunks of `chunksize` steps, iterables (e.g. a generator
+        which parses a file) are consumed chunk by chunk.
+    nperseg : int
+        segment length (number of steps)
+    dt : time step
+    m : 1d array (natoms,)
+        atomic masses
+    chunksize : int, optional
+        for array input, default: `nperseg`
+    **kwds : passed to :class:`WelchPDOS`
+
+    Returns
+    -------
+    ``(faxis, pdos)``
+    """
+    wp = WelchPDOS(nperseg, dt=dt, m=m, **kwds)
+    chunksize = nperseg if chunksize is None else chunksize
+    for chunk in _iter_vel_chunks(vel, chunksize):
+        wp.update(chunk)
+    return wp.get()
+
+
+def pdos_spectrogram(vel, dt=1.0, window=256, hop=None, m=None, taper=True,
+                     nfft=None, area=1.0, chunksize=None, workers=None):
+    """Time-resolved phonon DOS: mass-weighted spectra of short, overlapping
+    segments of the velocities.
+
+    All segments in a chunk of velocities are strided views, which are
+    transformed by one batched FFT. Arrays are read in chunks, iterables of
+    chunks are consumed one by one (see :func:`pdos_welch`), so the memory
+    is ``O((window + chunksize) * natoms)`` plus the result.
+
+    Parameters
+    ----------
+    vel : 3d array (nstep, natoms, 3) or iterable of such arrays
+        atomic velocities
+    dt : time step
+    window : int
+        segment length (number of steps), the frequency resolution is
+        ``1/(window*dt)``
+    hop : int, optional
+        steps between segment starts, default ``window//2``
+    m : 1d array (natoms,),
+        atomic mass array, if None then mass=1.0 for all atoms is used
+    taper : bool or 1d array (window,)
+        True: Welch window as in :func:`pdos`, False: none
+    nfft : int, optional
+        FFT length (zero padded segments), default `window`
+    area : float or None
+        Normalize each spectrum to this area. None: no normalization, the
+        spectra are then proportional to the kinetic energy in each segment.
+    chunksize : int, optional
+        for array input, default ``max(window, 64*hop)``
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    ``(taxis, faxis, sgram)``
+    taxis : 1d array (ntime,)
+        center of each segment [unit(dt)]
+    faxis : 1d array (nfreq,) [1/unit(dt)]
+    sgram : 2d array (ntime, nfreq)
+
+    Examples
+    --------
+    >>> t, f, sg = pdos_spectrogram(tr.velocity, dt=tr.timestep, m=tr.mass,
+    ...                             window=1024)
+    >>> pcolormesh(t, f, sg.T)
+    """
+    hop = window//2 if hop is None else hop
+    assert hop > 0, "hop must be > 0"
+    nfft = window if nfft is None else nfft
+    if taper is True:
+        taper = welch(window)
+    elif taper is False:
+        taper = None
+    chunksize = max(window, 64*hop) if chunksize is None else chunksize
+    m = None if m is None else np.asarray(m, dtype=float)
+    rows = []
+    buf = None
+    # steps to drop before the next segment start if hop > window
+    skip = 0
+    for chunk in _iter_vel_chunks(vel, chunksize):
+        chunk = np.asarray(chunk)
+        if skip > 0:
+            nskip = min(skip, chunk.shape[0])
+            chunk = chunk[nskip:,...]
+            skip -= nskip
+        buf = chunk if buf is None or len(buf) == 0 else \
+            np.concatenate((buf, chunk), axis=0)
+        power = _segment_power(buf, window, hop, window=taper, nfft=nfft, m=m,
+                               workers=workers)
+        rows.append(power)
+        nxt = power.shape[0]*hop
+        skip = max(nxt - buf.shape[0], 0)
+        buf = buf[nxt:,...].copy()
+    if len(rows) == 0:
+        sgram = np.empty((0, nfft//2), dtype=float)
+    else:
+        sgram = np.concatenate(rows, axis=0)
+    taxis = (np.arange(sgram.shape[0])*hop + 0.5*(window-1)) * dt
+    faxis = np.fft.fftfreq(nfft, dt)[:nfft//2]
+    if area is not None:
+        for row in sgram:
+            row[:] = num.norm_int(row, faxis, area=area)
+    return taxis, faxis, sgram
+
+
 def vacf_pdos(vel, *args, **kwds):
     """Wrapper for ``pdos(..., method='vacf', mirr=True, npad=None)``"""
     if 'mirr' not in kwds:
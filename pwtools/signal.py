@@ -6,8 +6,10 @@ reference implementations plus some utilities.
 from itertools import product
 import numpy as np
 from scipy.fftpack import fft, ifft
+from scipy import fft as sfft
 from scipy.signal import fftconvolve, gaussian, kaiserord, firwin, lfilter, freqz
 from scipy.integrate import trapz
+from scipy.interpolate import splrep, PPoly
 from pwtools import _flib, num
 
 
@@ -206,6 +208,59 @@ def fft_1d_loop(arr, axis=-1):
 
 
 
+# Default number of threads for scipy.fft in this module and in pydos if no
+# `workers` argument is given. None: scipy's default (1), -1: all CPUs.
+FFT_WORKERS = None
+
+
+def _workers(workers):
+    return FFT_WORKERS if workers is None else workers
+
+
+def fast_len(n, real=True):
+    """Smallest FFT length >= `n` which is fast, i.e. has only small prime
+    factors (2,3,5 for real FFTs), see ``scipy.fft.next_fast_len``.
+
+    Much less padding than the next power of two: for ``n=2*10**6-1`` we get
+    2000000 instead of 2097152.
+    """
+    return sfft.next_fast_len(int(n), real=real)
+
+
+def power_spectrum(arr, n=None, axis=0, workers=None, out=None):
+    """One-sided power spectrum ``abs(rfft(arr, n, axis))**2`` of a real
+    array.
+
+    Parameters
+    ----------
+    arr : nd array, real
+    n : int, optional
+        FFT length, zero-pad `arr` along `axis`, use :func:`fast_len`
+    axis : int
+    workers : int, optional
+        number of threads for ``scipy.fft``, default :data:`FFT_WORKERS`
+    out : nd array, optional
+        float array of the result's shape (may be a view), re-use in loops to
+        save allocations
+
+    Returns
+    -------
+    nd array, ``n//2+1`` long along `axis`
+    """
+    fv = sfft.rfft(arr, n=n, axis=axis, workers=_workers(workers))
+    # no temporaries as with fv.real**2 + fv.imag**2
+    out = np.abs(fv, out=out)
+    del fv
+    return np.square(out, out=out)
+
+
+def _full_spectrum(arr, n, axis=0):
+    """One-sided spectrum of length n//2+1 of a real signal of length n ->
+    two-sided (length n, same order as ``fft``)."""
+    tail = num.slicetake(arr, slice(n-n//2-1, 0, -1), axis=axis)
+    return np.concatenate((arr, tail), axis=axis)
+
+
 def pad_zeros(arr, axis=0, where='end', nadd=None, upto=None, tonext=None,
               tonext_min=None):
     """Pad an nd-array with zeros. Default is to append an array of zeros of
@@ -220,11 +275,13 @@ def pad_zeros(arr, axis=0, where='end', nadd=None, upto=None, tonext=None,
     nadd : number of items to padd (i.e. nadd=3 means padd w/ 3 zeros in case
         of an 1d array)
     upto : pad until arr.shape[axis] == upto
-    tonext : bool, pad up to the next power of two (pad so that the padded
-        array has a length of power of two)
+    tonext : bool or 'fast', pad up to the next power of two (pad so that the
+        padded array has a length of power of two), 'fast': pad to the next
+        fast FFT length (:func:`fast_len`), which is usually much shorter
     tonext_min : int, when using `tonext`, pad the array to the next possible
-        power of two for which the resulting array length along `axis` is at
-        least `tonext_min`; the default is tonext_min = arr.shape[axis]
+        power of two (or fast length) for which the resulting array length
+        along `axis` is at least `tonext_min`; the default is tonext_min =
+        arr.shape[axis]
 
     Use only one of nadd, upto, tonext.
 
@@ -272,6 +329,10 @@ def pad_zeros(arr, axis=0, where='end', nadd=None, upto=None, tonext=None,
             if (tonext is None) or (not tonext):
                 # default
                 nadd = arr.shape[axis]
+            elif tonext == 'fast':
+                tonext_min = arr.shape[axis] if (tonext_min is None) \
+                             else tonext_min
+                nadd = fast_len(tonext_min) - arr.shape[axis]
             else:
                 tonext_min = arr.shape[axis] if (tonext_min is None) \
                              else tonext_min
@@ -485,10 +546,10 @@ def acorr(v, method=7, norm=True):
     elif method == 6:
         return _flib.acorr(v, c, 2, _norm)
     elif method == 7:
-        # Correlation via fft. After ifft, the imaginary part is (in theory) =
-        # 0, in practise < 1e-16, so we are safe to return the real part only.
-        vv = np.concatenate((v, np.zeros((nstep,),dtype=float)))
-        c = ifft(np.abs(fft(vv))**2.0)[:nstep].real
+        # Correlation via fft. Zero-pad to >= 2*nstep-1 for the linear (not
+        # circular) correlation, real FFTs of a fast length.
+        nfft = fast_len(2*nstep-1)
+        c = sfft.irfft(power_spectrum(v, n=nfft), n=nfft)[:nstep]
     else:
         raise ValueError('unknown method: %s' %method)
     if norm:
@@ -497,6 +558,109 @@ def acorr(v, method=7, norm=True):
         return c
 
 
+def _fftcorr(a, b=None, axis=0, norm=True, average=False, dtype=None,
+             workers=None):
+    """Correlation of `a` and `b` (or `a` with itself if b is None) along
+    `axis`, see :func:`acorr_nd` and :func:`xcorr`."""
+    a = np.asarray(a, dtype=dtype)
+    nstep = a.shape[axis]
+    workers = _workers(workers)
+    # pad to >= 2*nstep-1 to get the linear (not circular) correlation
+    nfft = fast_len(2*nstep-1)
+    if b is None:
+        spec = power_spectrum(a, n=nfft, axis=axis, workers=workers)
+    else:
+        b = np.asarray(b, dtype=dtype)
+        assert b.shape == a.shape, "a and b must have the same shape"
+        spec = sfft.rfft(a, n=nfft, axis=axis, workers=workers)
+        np.conjugate(spec, out=spec)
+        spec *= sfft.rfft(b, n=nfft, axis=axis, workers=workers)
+    caxis = axis
+    if average:
+        # linear: average spectra, one inverse FFT
+        spec = np.moveaxis(spec, axis, 0).reshape(spec.shape[axis],
+                                                  -1).mean(axis=1)
+        caxis = 0
+    c = sfft.irfft(spec, n=nfft, axis=caxis, workers=workers)
+    del spec
+    sl = [slice(None)]*c.ndim
+    sl[caxis] = slice(0, nstep)
+    c = c[tuple(sl)]
+    if norm:
+        sl[caxis] = slice(0, 1)
+        if b is None:
+            c0 = c[tuple(sl)]
+        else:
+            # sqrt(<a(0)**2> <b(0)**2>)
+            a2 = (a*a).sum(axis=axis, keepdims=True)
+            b2 = (b*b).sum(axis=axis, keepdims=True)
+            if average:
+                a2 = a2.mean()
+                b2 = b2.mean()
+            c0 = np.sqrt(a2*b2)
+        c /= c0
+    return c
+
+
+def acorr_nd(arr, axis=0, norm=True, average=False, dtype=None, workers=None):
+    """Autocorrelation of all 1d arrays along `axis` of `arr` by one batched
+    FFT (:func:`acorr` method 7 for nd arrays).
+
+    Parameters
+    ----------
+    arr : nd array
+    axis : int
+        time axis
+    norm : bool
+        normalize such that ``c[0] = 1``
+    average : bool
+        Average over all other axes ("channels"), return a 1d array. With
+        `norm`, the average is normalized.
+    dtype : numpy dtype, optional
+        Use ``np.float32`` to half memory and FFT time, at the cost of
+        precision (relative error ~1e-6).
+    workers : int, optional
+        number of threads for ``scipy.fft``
+
+    Returns
+    -------
+    c : array with ``arr.shape``, 1d array (nstep,) if `average`
+        ``c[0]`` is lag 0 along `axis`
+
+    Examples
+    --------
+    >>> # VACF of each atom and component
+    >>> c = acorr_nd(vel, axis=0)
+    >>> (c[:,0,0] == acorr(vel[:,0,0])).all()  # up to numerical noise
+    """
+    return _fftcorr(arr, axis=axis, norm=norm, average=average, dtype=dtype,
+                    workers=workers)
+
+
+def xcorr(a, b, axis=0, norm=False, average=False, dtype=None, workers=None):
+    """Cross-correlation ``c(t) = sum_j a(j) b(j+t)``, t = 0 ... nstep-1, of
+    all 1d arrays along `axis` by one batched FFT. Negative lags are
+    ``xcorr(b, a)``.
+
+    Parameters
+    ----------
+    a, b : nd arrays of the same shape
+    axis : int
+        time axis
+    norm : bool
+        Divide by ``sqrt(sum(a**2) * sum(b**2))``, i.e. the correlation
+        coefficient for lag 0, ``xcorr(a, a, norm=True) == acorr_nd(a)``.
+    average, dtype, workers :
+        see :func:`acorr_nd`
+
+    Returns
+    -------
+    c : array with ``a.shape``, 1d array (nstep,) if `average`
+    """
+    return _fftcorr(a, b, axis=axis, norm=norm, average=average, dtype=dtype,
+                    workers=workers)
+
+
 def gauss(x, std=1.0, norm=False):
     """Gaussian function.
 
@@ -582,10 +746,185 @@ def find_peaks(y, x=None, k=3, spread=2, ymin=None):
     return idx0, pos0
 
 
-def smooth(data, kern, axis=0, edge='m', norm=True):
+def _spline_coeffs(npts, k):
+    """Piecewise polynomial coefficients of the interpolating spline (as in
+    :func:`find_peaks`) through ``npts`` points at ``t=0,1,...,npts-1`` as a
+    linear map of the data values.
+
+    Returns
+    -------
+    bp, cmap
+    bp : 1d array (nint+1,), breakpoints of the non-empty intervals
+    cmap : 3d array (npts, k+1, nint), coeffs of ``PPoly`` for data
+        ``y`` are ``np.tensordot(y, cmap, axes=1)``
+    """
+    tt = np.arange(npts, dtype=float)
+    cmap = []
+    for ii in range(npts):
+        pp = PPoly.from_spline(splrep(tt, np.eye(npts)[ii], k=k, s=0))
+        keep = np.diff(pp.x) > 0
+        cmap.append(pp.c[:,keep])
+    bp = np.unique(pp.x)
+    return bp, np.array(cmap)
+
+
+def _ppoly_eval(bp, coeffs, tt, der=0):
+    """Evaluate piecewise polynomials with shared breakpoints `bp` and
+    individual coeffs (npoly, k+1, nint) at points `tt` (npoly,...)."""
+    k = coeffs.shape[1] - 1
+    iv = np.clip(np.searchsorted(bp, tt, side='right') - 1, 0, len(bp) - 2)
+    dx = tt - bp[iv]
+    idx = np.arange(coeffs.shape[0]).reshape((-1,) + (1,)*(tt.ndim-1))
+    ret = np.zeros(tt.shape, dtype=float)
+    # Horner, c[m] belongs to dx**(k-m)
+    for m in range(k + 1 - der):
+        fac = 1.0
+        for jj in range(der):
+            fac *= k - m - jj
+        ret = ret*dx + fac*coeffs[idx,m,iv]
+    return ret
+
+
+def find_peaks_nd(y, x=None, axis=-1, k=3, spread=2, ymin=None):
+    """Vectorized :func:`find_peaks` for many spectra at once, e.g. a stack
+    of phonon DOS curves for many q-points, species or temperatures.
+
+    Peaks are local maxima ``y[i-1] < y[i] > y[i+1]`` along `axis`. All 1d
+    arrays along `axis` are treated at once, the result is stored in CSR
+    format (as in ``scipy.sparse.csr_matrix``): the peaks of spectrum ``j``
+    are ``idx[offsets[j]:offsets[j+1]]``.
+
+    Parameters
+    ----------
+    y : nd array
+        data with peaks along `axis`, all other axes are spectra
+    x : 1d array (y.shape[axis],), optional
+        x axis, if given then refine peak positions and heights with a spline
+        of order `k` through ``2*spread+1`` points around each peak
+    axis : int
+    k : int
+        order of spline
+    spread : int
+        Use ``2*spread+1`` points around each peak to fit a spline, shifted
+        inwards at the ends of `x`. We need ``2*spread+1 > k``.
+    ymin : float or array, optional
+        Find all peaks with ``y >= ymin``, an array must broadcast to
+        ``y.shape`` without `axis` (one value per spectrum).
+
+    Returns
+    -------
+    offsets, idx, pos, height
+    offsets : 1d int array (nspec+1,), nspec = number of spectra in C order
+        of the axes other than `axis`, ``np.unravel_index(j, shape)`` gives
+        the index of spectrum ``j``
+    idx : 1d int array (npeaks,), peak indices along `axis`
+    pos : 1d array (npeaks,), refined peak positions if `x` given, else None
+    height : 1d array (npeaks,), ``y`` at `idx` or the spline maximum if `x`
+        given
+
+    Notes
+    -----
+    Per spectrum, `idx` and `pos` are the same as from :func:`find_peaks`,
+    except for the `ymin` test which is applied to the peak value here.
+
+    For equidistant `x`, all splines are done at once with the spline
+    coefficients as a fixed linear map of the ``2*spread+1`` data values.
+    Otherwise, we fit one :class:`~pwtools.num.Spline` per peak as in
+    :func:`find_peaks`.
+
+    Examples
+    --------
+    >>> x = linspace(0,10,300)
+    >>> y = array([gauss(x-2,.1), gauss(x-3,0.1) + gauss(x-6,1)])
+    >>> offsets, idx, pos, height = find_peaks_nd(y, x)
+    >>> pos[offsets[1]:offsets[2]]
+    array([3.00056821, 5.99999806])
+    """
+    y = np.moveaxis(np.asarray(y, dtype=float), axis, -1)
+    shape = y.shape[:-1]
+    npts = y.shape[-1]
+    y = y.reshape(-1, npts)
+    mask = np.zeros(y.shape, dtype=bool)
+    mask[:,1:-1] = (y[:,1:-1] > y[:,:-2]) & (y[:,1:-1] > y[:,2:])
+    if ymin is not None:
+        ymin = np.broadcast_to(np.asarray(ymin, dtype=float), shape).reshape(-1)
+        mask &= y >= ymin[:,None]
+    # row major -> sorted by spectrum, then index
+    spec, idx = np.nonzero(mask)
+    offsets = np.zeros((y.shape[0]+1,), dtype=int)
+    np.cumsum(np.bincount(spec, minlength=y.shape[0]), out=offsets[1:])
+    height = y[spec,idx]
+    pos = None
+    nwin = 2*spread + 1
+    if x is None or len(idx) == 0 or npts < nwin:
+        if x is not None:
+            pos = np.asarray(x, dtype=float)[idx]
+        return offsets, idx, pos, height
+    assert nwin > k, "need 2*spread+1 > k"
+    x = np.asarray(x, dtype=float)
+    dx = np.diff(x)
+    start = np.clip(idx - spread, 0, npts - nwin)
+    if not np.allclose(dx, dx[0]):
+        pos = np.empty(idx.shape, dtype=float)
+        for ii, (i0, j0) in enumerate(zip(start, spec)):
+            sl = slice(i0, i0+nwin)
+            spl = num.Spline(x[sl], y[j0,sl], k=k, s=None)
+            # bracket the max between the peak's neighbors
+            xg = np.linspace(x[idx[ii]-1], x[idx[ii]+1], 33)
+            ib = min(max(spl(xg).argmax(), 1), len(xg) - 2)
+            xab = xg[ib-1], xg[ib+1]
+            if spl(xab[0], der=1) > 0 > spl(xab[1], der=1):
+                pos[ii] = spl.get_max(xab=xab)
+            else:
+                pos[ii] = xg[ib]
+            height[ii] = spl(pos[ii])
+        return offsets, idx, pos, height
+    # all windows in local coords t = 0,1,...,nwin-1
+    bp, cmap = _spline_coeffs(nwin, k)
+    win = y[spec[:,None], start[:,None] + np.arange(nwin)[None,:]]
+    coeffs = np.tensordot(win, cmap, axes=1)
+    # max of the spline between the peak's neighbors: grid search + Newton
+    center = (idx - start)[:,None]
+    tt = center + np.linspace(-1, 1, 33)[None,:]
+    best = _ppoly_eval(bp, coeffs, tt).argmax(axis=1)
+    tt = tt[np.arange(len(idx)),best]
+    lo, hi = center[:,0] - 1.0, center[:,0] + 1.0
+    for ii in range(20):
+        d1 = _ppoly_eval(bp, coeffs, tt, der=1)
+        d2 = _ppoly_eval(bp, coeffs, tt, der=2)
+        step = np.where(d2 < 0, d1 / np.where(d2 < 0, d2, 1.0), 0.0)
+        tt = np.clip(tt - step, lo, hi)
+        if np.abs(step).max() < 1e-12:
+            break
+    pos = x[start] + tt*dx[0]
+    height = _ppoly_eval(bp, coeffs, tt)
+    return offsets, idx, pos, height
+
+
+def _fftconvolve_valid(sig, kern, axis=0, workers=None):
+    """Same as ``scipy.signal.fftconvolve(sig, kern, 'valid')``. For real
+    kernels which are 1d along `axis` (e.g. shape (M,1,1)), we do only 1d
+    real FFTs along `axis` of fast length, instead of FFTs along all axes."""
+    if kern.ndim != sig.ndim or kern.size != kern.shape[axis] or \
+            np.iscomplexobj(sig) or np.iscomplexobj(kern):
+        return fftconvolve(sig, kern, 'valid')
+    nsig = sig.shape[axis]
+    nkern = kern.shape[axis]
+    nfft = fast_len(nsig + nkern - 1)
+    workers = _workers(workers)
+    fsig = sfft.rfft(sig, n=nfft, axis=axis, workers=workers)
+    shape = [1]*sig.ndim
+    shape[axis] = -1
+    fsig *= sfft.rfft(kern.ravel(), n=nfft).reshape(shape)
+    ret = sfft.irfft(fsig, n=nfft, axis=axis, workers=workers)
+    return num.slicetake(ret, slice(nkern-1, nsig), axis=axis)
+
+
+def smooth(data, kern, axis=0, edge='m', norm=True, workers=None):
     """Smooth N-dim `data` by convolution with a kernel `kern`.
 
-    Uses scipy.signal.fftconvolve().
+    Uses scipy.signal.fftconvolve() or, for kernels which are 1d along
+    `axis`, real FFTs along `axis` only.
 
     Note that due to edge effect handling (padding) and kernal normalization,
     the convolution identity convolve(data,kern) == convolve(kern,data) doesn't
@@ -613,6 +952,8 @@ def smooth(data, kern, axis=0, edge='m', norm=True):
         signal lies within the data. Note that this is not True for kernels
         with very big spread (i.e. ``hann(N*10)`` or ``gaussian(N/2,
         std=N*10)``. Then the kernel is effectively a constant.
+    workers : int, optional
+        number of threads for ``scipy.fft``, default :data:`FFT_WORKERS`
 
     Returns
     -------
@@ -791,7 +1132,7 @@ def smooth(data, kern, axis=0, edge='m', norm=True):
         raise Exception("unknown value for edge")
     sig = np.concatenate((dleft, data, dright), axis=axis)
     kk = kern/float(kern.sum()) if norm else kern
-    ret = fftconvolve(sig, kk, 'valid')
+    ret = _fftconvolve_valid(sig, kk, axis=axis, workers=workers)
     assert ret.shape[axis] == N+M+1, "unexpected convolve result shape"
     del sig
     if M % 2 == 0:
@@ -805,6 +1146,172 @@ def smooth(data, kern, axis=0, edge='m', norm=True):
     return ret
 
 
+class StreamingSmoother(object):
+    """Streaming version of :func:`smooth`: smooth data which arrive in
+    chunks along `axis` (e.g. from a trajectory iterator) or which don't fit
+    into memory.
+
+    Overlap-save convolution: only the last ``len(kern)`` points of the padded
+    signal are kept between chunks. The concatenated output of all
+    :meth:`update` calls and :meth:`finish` is the same as ``smooth(data,
+    kern, ...)`` for the concatenated chunks (up to numerical noise). Output
+    lags behind input by about ``len(kern)//2`` points because the right edge
+    padding is only known at the end.
+
+    Examples
+    --------
+    >>> sm = StreamingSmoother(scipy.signal.hann(21)[:,None,None])
+    >>> for coords in coords_chunks:  # (nstep_chunk, natoms, 3)
+    ...     out = sm.update(coords)
+    ...     ...
+    >>> out = sm.finish()
+    >>> # generator, e.g. frames from a trajectory iterator
+    >>> chunks = (st.coords[None,...] for st in io.iter_pdb(filename))
+    >>> ret = np.concatenate(list(sm.stream(chunks)), axis=0)
+
+    See Also
+    --------
+    :func:`smooth`
+    :meth:`FIRFilter.stream`
+    """
+    def __init__(self, kern, axis=0, edge='m', norm=True, workers=None):
+        """
+        Parameters
+        ----------
+        kern, axis, edge, norm, workers :
+            see :func:`smooth`
+        """
+        if edge not in ['m', 'c']:
+            raise Exception("unknown value for edge")
+        self.kern = kern
+        self.axis = axis
+        self.edge = edge
+        self.norm = norm
+        self.workers = workers
+        self._kk = kern/float(kern.sum()) if norm else kern
+        self._nkern = kern.shape[axis]
+        # output y[i] = valid convolution of padded signal at i + shift, see
+        # smooth()
+        if self._nkern % 2 == 0:
+            self._shift = self._nkern//2
+        else:
+            self._shift = self._nkern//2 + 1
+        self.reset()
+
+    def reset(self):
+        """Start a new signal."""
+        # chunks before the left edge padding is known
+        self._raw = []
+        # not yet used part of the padded signal, starts at index self._pos
+        self._sig = None
+        self._pos = 0
+        # last len(kern)+1 data points for the right edge padding
+        self._tail = None
+        self._ndata = 0
+        self._nout = 0
+
+    def _take(self, arr, sl):
+        return num.slicetake(arr, sl, axis=self.axis)
+
+    def _cat(self, arrs):
+        return np.concatenate(arrs, axis=self.axis)
+
+    def _empty(self, chunk):
+        return self._take(chunk, slice(0,0)).astype(float)
+
+    def _edge(self, data, where):
+        M = self._nkern
+        if self.edge == 'm':
+            # data[M:0:-1] and data[-2:-(M+2):-1] as in smooth() for N > M
+            sl = slice(M,0,-1) if where == 'start' else slice(-2,None,-1)
+            return self._take(data, sl)
+        else:
+            sl = slice(0,1) if where == 'start' else slice(-1,None)
+            return np.repeat(self._take(data, sl), M, axis=self.axis)
+
+    def _convolve(self, final):
+        M = self._nkern
+        nret = self._sig.shape[self.axis] - M + 1
+        iend = self._pos + nret - self._shift
+        if final:
+            iend = min(iend, self._ndata)
+        if iend <= self._nout:
+            return self._empty(self._sig)
+        start = self._nout + self._shift - self._pos
+        stop = iend - 1 + self._shift - self._pos + M
+        ret = _fftconvolve_valid(self._take(self._sig, slice(start, stop)),
+                                 self._kk, axis=self.axis,
+                                 workers=self.workers)
+        self._sig = self._take(self._sig, slice(iend - self._nout + start,
+                                                None)).copy()
+        self._pos = iend + self._shift
+        self._nout = iend
+        return ret
+
+    def update(self, chunk):
+        """Add the next chunk of data.
+
+        Parameters
+        ----------
+        chunk : nd array
+            next ``chunk.shape[axis]`` points of the signal
+
+        Returns
+        -------
+        ret : nd array
+            the next smoothed points, can be empty (length 0 along `axis`)
+        """
+        chunk = np.asarray(chunk)
+        self._ndata += chunk.shape[self.axis]
+        if self._tail is None:
+            self._tail = chunk
+        else:
+            self._tail = self._cat((self._tail, chunk))
+        self._tail = self._take(self._tail, slice(-(self._nkern+1), None))
+        if self._sig is None:
+            self._raw.append(chunk)
+            if self._ndata < self._nkern + 1:
+                return self._empty(chunk)
+            data = self._cat(self._raw)
+            self._raw = None
+            self._sig = self._cat((self._edge(data, 'start'), data))
+        else:
+            self._sig = self._cat((self._sig, chunk))
+        return self._convolve(final=False)
+
+    def finish(self):
+        """Pad the right edge and return the remaining smoothed points.
+        Call :meth:`reset` before using the object for a new signal.
+
+        Returns
+        -------
+        ret : nd array or None (no data at all)
+        """
+        if self._sig is None:
+            # signal shorter than the kernel
+            if len(self._raw) == 0:
+                return None
+            ret = smooth(self._cat(self._raw), self.kern, axis=self.axis,
+                         edge=self.edge, norm=self.norm, workers=self.workers)
+            self._raw = []
+            self._nout = self._ndata
+            return ret
+        self._sig = self._cat((self._sig, self._edge(self._tail, 'end')))
+        return self._convolve(final=True)
+
+    def stream(self, chunks):
+        """Generator: smooth an iterable of chunks, yield non-empty smoothed
+        chunks. Calls :meth:`reset` first and :meth:`finish` at the end."""
+        self.reset()
+        for chunk in chunks:
+            ret = self.update(chunk)
+            if ret.shape[self.axis] > 0:
+                yield ret
+        ret = self.finish()
+        if ret is not None and ret.shape[self.axis] > 0:
+            yield ret
+
+
 def odd(n, add=1):
     """Return next odd integer to `n`.
 
@@ -934,3 +1441,40 @@ class FIRFilter(object):
         axis : int
         """
         return lfilter(self.taps, 1.0, x, axis=axis)
+
+    def stream(self, chunks, axis=-1, workers=None):
+        """Generator: apply the filter to a signal which arrives in chunks
+        along `axis`, yield filtered chunks of the same length.
+
+        Overlap-save FFT convolution, the last ``ntaps-1`` points are carried
+        over to the next chunk. The concatenated output is the same as
+        ``self(x, axis)`` (up to numerical noise).
+
+        Parameters
+        ----------
+        chunks : iterable of nd arrays
+        axis : int
+        workers : int, optional
+            number of threads for ``scipy.fft``, default :data:`FFT_WORKERS`
+
+        Examples
+        --------
+        >>> f = FIRFilter(cutoff=10, nyq=50, ntaps=101)
+        >>> for y in f.stream(x_chunks):
+        ...     ...
+        """
+        M = len(self.taps)
+        hist = None
+        for x in chunks:
+            x = np.asarray(x)
+            if hist is None:
+                shape = list(x.shape)
+                shape[axis] = M - 1
+                hist = np.zeros(shape, dtype=x.dtype)
+                kshape = [1]*x.ndim
+                kshape[axis] = M
+                kern = self.taps.reshape(kshape)
+            sig = np.concatenate((hist, x), axis=axis)
+            yield _fftconvolve_valid(sig, kern, axis=axis, workers=workers)
+            hist = num.slicetake(sig, slice(sig.shape[axis] - (M - 1), None),
+                                 axis=axis).copy()
@@ -1,5 +1,9 @@
 import numpy as np
-from pwtools.signal import acorr
+from scipy.signal import fftconvolve
+from scipy.signal.windows import gaussian
+from pwtools.signal import acorr, acorr_nd, xcorr, fast_len, pad_zeros, \
+    power_spectrum, smooth
+from pwtools import signal
 
 def test_acorr():
     arr = np.random.rand(100)
@@ -10,3 +14,84 @@ def test_acorr():
             np.testing.assert_array_almost_equal(acorr(arr, method=m,
                                                        norm=norm),
                                                  ref)
+
+
+def test_acorr_nd():
+    arr = np.random.rand(50, 4, 3)
+    for norm in [True, False]:
+        c = acorr_nd(arr, norm=norm)
+        assert c.shape == arr.shape
+        for ii in range(4):
+            for jj in range(3):
+                ref = acorr(arr[:,ii,jj], method=1, norm=norm)
+                np.testing.assert_array_almost_equal(c[:,ii,jj], ref)
+        ref = acorr_nd(arr, norm=False).mean(axis=(1,2))
+        if norm:
+            ref /= ref[0]
+        np.testing.assert_array_almost_equal(acorr_nd(arr, norm=norm,
+                                                      average=True), ref)
+    # other axis, float32
+    c = acorr_nd(arr, axis=1, norm=False)
+    np.testing.assert_array_almost_equal(c[3,:,1],
+                                         acorr(arr[3,:,1], norm=False))
+    c32 = acorr_nd(arr, dtype=np.float32)
+    assert c32.dtype == np.float32
+    assert np.allclose(c32, acorr_nd(arr), atol=1e-5)
+
+
+def test_xcorr():
+    a = np.random.rand(40, 3)
+    b = np.random.rand(40, 3)
+    c = xcorr(a, b)
+    for t in [0, 1, 17, 39]:
+        assert np.allclose(c[t,:], (a[:40-t,:]*b[t:,:]).sum(axis=0))
+    # negative lags
+    assert np.allclose(xcorr(b, a)[5,:], (b[:35,:]*a[5:,:]).sum(axis=0))
+    assert np.allclose(xcorr(a, a, norm=True), acorr_nd(a))
+    cn = xcorr(a, b, norm=True)
+    assert np.allclose(cn[0,:], (a*b).sum(0) / np.sqrt((a*a).sum(0) *
+                                                       (b*b).sum(0)))
+    assert np.allclose(xcorr(a, b, average=True), c.mean(axis=1))
+    # normalize along axis != 0
+    a = np.random.rand(3, 40, 2)
+    assert np.allclose(xcorr(a, a, axis=1, norm=True, average=True)[0], 1.0)
+
+
+def test_fft_lengths():
+    for n in [1, 7, 97, 1001, 2001]:
+        nn = fast_len(n)
+        assert nn >= n
+        assert nn <= 2**int(np.ceil(np.log2(n)))
+        assert pad_zeros(np.ones((n,2)), tonext='fast').shape == (nn,2)
+        assert pad_zeros(np.ones(n), tonext='fast',
+                         tonext_min=2*n).shape[0] == fast_len(2*n)
+    assert fast_len(2001) == 2025
+    # power spectrum == |fft|^2, with and without output buffer
+    a = np.random.rand(20, 50, 3)
+    ref = np.abs(np.fft.fft(a, n=64, axis=1))**2.0
+    assert np.allclose(power_spectrum(a, n=64, axis=1), ref[:,:33,:])
+    out = np.empty((20,33,3))
+    ret = power_spectrum(a, n=64, axis=1, out=out)
+    assert ret is out
+    assert np.allclose(out, ref[:,:33,:])
+    assert np.allclose(signal._full_spectrum(out, 64, axis=1), ref)
+    assert np.allclose(signal._full_spectrum(power_spectrum(a[:,:49,:],
+                                                            axis=1),
+                                             49, axis=1),
+                       np.abs(np.fft.fft(a[:,:49,:], axis=1))**2.0)
+
+
+def test_smooth_fft_axis():
+    # real FFTs along axis only vs. fftconvolve() over all axes
+    kern = gaussian(31, 5)
+    for sig, kk, axis in [(np.random.rand(200,4,3), kern[:,None,None], 0),
+                          (np.random.rand(4,200), kern[None,:], 1),
+                          (np.random.rand(200), kern, 0)]:
+        assert np.allclose(signal._fftconvolve_valid(sig, kk, axis=axis),
+                           fftconvolve(sig, kk, 'valid'))
+        assert smooth(sig, kk, axis=axis).shape == sig.shape
+    # kernel not 1d along axis -> fallback
+    sig = np.random.rand(50,10)
+    kk = np.random.rand(5,3)
+    assert np.allclose(signal._fftconvolve_valid(sig, kk),
+                       fftconvolve(sig, kk, 'valid'))
@@ -1,8 +1,8 @@
-import os
+import os, shutil, tempfile
 import numpy as np
 import subprocess as sp
 from pwtools.parse import CifFile
-from pwtools import io
+from pwtools import io, parse, common
 from .testenv import testdir
 from pwtools.test import tools
 
@@ -42,3 +42,60 @@ def test_cif2sgroup():
     cmd = '{e} files/cif_struct.cif > cif2sgroup.log'.format(e=exe)
     sp.run(cmd, check=True, shell=True)
 
+
+
+def test_iter_cif():
+    # multi-block file: the test structure with different a
+    txt = common.file_read('files/cif_struct.cif')
+    body = txt.split('\n', 1)[1]
+    alst = [7.659, 7.7, 7.8]
+    dr = tempfile.mkdtemp(dir=testdir, prefix=__file__)
+    fn = os.path.join(dr, 'multi.cif')
+    common.file_write(fn, '\n'.join('data_b%i\n' %ii +
+                                    body.replace('7.65900', '%.5f' %aa)
+                                    for ii,aa in enumerate(alst)))
+    shutil.copy('files/cif_cart_struct.cif', dr)
+    ref_frac = np.loadtxt(txt.splitlines()[31:42], usecols=(2,3,4))
+    tr = io.read_cif_traj(fn)
+    assert tr.nstep == 3
+    assert np.allclose(tr.cryst_const[:,0], alst)
+    assert np.allclose(tr.coords_frac, ref_frac[None,...])
+    assert tr.symbols == ['Al', 'Al', 'O', 'O', 'O', 'Al', 'Si', 'Al',
+                          'Si', 'N', 'N']
+    for nprocs in [1, 2]:
+        lst = list(io.iter_cif(dr, nprocs=nprocs, names=True))
+        assert [x[1] for x in lst] == ['I', 'b0', 'b1', 'b2']
+        assert lst[0][0] == os.path.join(dr, 'cif_cart_struct.cif')
+        assert lst[0][2].natoms == 62
+        assert np.allclose(lst[0][2].coords[0,:], [1.01167, 7.44625, 3.06577])
+        assert np.allclose(lst[1][2].cell, tr.cell[0,...])
+
+
+def test_cif_tokenizer():
+    txt = """
+global_
+_x 1
+data_a
+_publ_title
+;
+title with data_ and loop_ inside
+;
+_name 'O'Brien's thing'
+_cell_length_a 5.0(2)  # comment
+_CELL_LENGTH_B "b 'q'"
+loop_
+_atom_site_label _atom_site_fract_x
+Si1 0.1 O1 '0.2'
+data_b
+_k v
+"""
+    blocks = list(parse.cif_parse_blocks(txt))
+    assert [x[0] for x in blocks] == ['a', 'b']
+    dct = blocks[0][1]
+    assert dct['_publ_title'].strip() == 'title with data_ and loop_ inside'
+    assert dct['_name'] == "O'Brien's thing"
+    assert dct['_cell_length_a'] == '5.0(2)'
+    assert dct['_cell_length_b'] == "b 'q'"
+    assert dct['_atom_site_label'] == ['Si1', 'O1']
+    assert dct['_atom_site_fract_x'] == ['0.1', '0.2']
+    assert blocks[1][1] == {'_k': 'v'}
@@ -0,0 +1,102 @@
+import os, shutil, tempfile
+import numpy as np
+from pwtools import io, parse, common, dcd
+from pwtools.test import tools
+from pwtools.test.testenv import testdir
+
+EXTS = list(common.COMPRESSION_OPENERS.keys())
+
+
+def compress(fn, ext):
+    """Write fn + ext, keep fn."""
+    with open(fn, 'rb') as fdi:
+        with common.file_open(fn + ext, 'wb') as fdo:
+            shutil.copyfileobj(fdi, fdo)
+    return fn + ext
+
+
+def compress_dir(src, ext):
+    """Copy dir `src` and compress all files in it, remove plain files."""
+    dst = tempfile.mkdtemp(dir=testdir, prefix=__file__)
+    for name in os.listdir(src):
+        compress(common.pj(src, name), ext)
+        shutil.move(common.pj(src, name + ext), common.pj(dst, name + ext))
+    return dst
+
+
+def assert_traj_equal(tr1, tr2):
+    for name in tr1.attr_lst:
+        x1 = getattr(tr1, name)
+        x2 = getattr(tr2, name)
+        if isinstance(x1, np.ndarray):
+            assert np.allclose(x1, x2)
+        else:
+            assert x1 == x2
+
+
+def test_file_open_backtick():
+    fn = os.path.join(testdir, 'test_compressed_input.txt')
+    txt = ''.join('step %i\nfoo\n' %ii for ii in range(100000))
+    common.file_write(fn, txt)
+    ref_cnt = common.backtick('grep -c step %s' %fn)
+    ref_last = common.backtick('grep step %s | tail -n1' %fn)
+    for ext in EXTS:
+        fnz = compress(fn, ext)
+        assert common.file_read(fnz) == txt
+        assert common.backtick('grep -c step %s' %fnz,
+                               decompress=True) == ref_cnt
+        assert common.backtick('grep step %s | tail -n1' %fnz,
+                               decompress=True) == ref_last
+        # command stops reading early
+        assert common.backtick('grep -m1 step %s' %fnz,
+                               decompress=True) == 'step 0\n'
+        assert common.backtick('head -n1 %s' %fnz,
+                               decompress=True) == 'step 0\n'
+    assert common.find_file(fn + '.foo') == fn + '.foo'
+    os.remove(fn)
+    assert common.find_file(fn) == fn + EXTS[0]
+
+
+def test_pw_md():
+    fn = tools.unpack_compressed('files/pw.md.out.gz', prefix=__file__)
+    ref = io.read_pw_md(fn)
+    for ext in EXTS:
+        assert_traj_equal(ref, io.read_pw_md(compress(fn, ext)))
+
+
+def test_cp2k_md_aux_files():
+    dr = 'files/cp2k/md/npt_f_print_low'
+    common.system('tar -C {0} -xzf {1}.tgz'.format(os.path.dirname(dr), dr))
+    ref = io.read_cp2k_md(common.pj(dr, 'cp2k.out'))
+    drz = compress_dir(dr, '.xz')
+    tr = io.read_cp2k_md(common.pj(drz, 'cp2k.out.xz'))
+    assert_traj_equal(ref, tr)
+
+
+def test_lammps_md_aux_files():
+    tgz = 'files/lammps/md-npt.tgz'
+    dr = tgz.replace('.tgz', '')
+    common.system('tar -C {0} -xzf {1}'.format(os.path.dirname(tgz), tgz))
+    ref_txt = io.read_lammps_md_txt(common.pj(dr, 'log.lammps'))
+    ref_dcd = io.read_lammps_md_dcd(common.pj(dr, 'log.lammps'))
+    drz = compress_dir(dr, '.gz')
+    assert_traj_equal(ref_txt,
+                      io.read_lammps_md_txt(common.pj(drz, 'log.lammps.gz')))
+    assert_traj_equal(ref_dcd,
+                      io.read_lammps_md_dcd(common.pj(drz, 'log.lammps.gz')))
+
+
+def test_dcd():
+    fn = 'files/lammps/md-npt/lmp.out.dcd'
+    common.system('tar -C files/lammps -xzf files/lammps/md-npt.tgz')
+    cc, co = dcd.read_dcd_data(fn)
+    for ext in EXTS:
+        fnz = compress(fn, ext)
+        assert dcd.read_dcd_header(fnz)['natoms'] == co.shape[1]
+        ccz, coz = dcd.read_dcd_data(fnz)
+        assert (ccz == cc).all()
+        assert (coz == co).all()
+        ccz, coz = dcd.read_dcd_data_ref(fnz)
+        assert (ccz == cc).all()
+        assert (coz == co).all()
+        os.remove(fnz)
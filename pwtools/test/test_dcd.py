@@ -2,7 +2,8 @@ import numpy as np
 from numpy import array, int32, int64, float32, float64, string_
 from pwtools.common import pj
 from pwtools.test import tools
-from pwtools import dcd, _dcd
+from pwtools.test.testenv import testdir
+from pwtools import dcd, _dcd, io, crys
 
 # dcd header order from dcd.py
 header_types = [\
@@ -117,3 +118,76 @@ def test_dcd():
         # -1 and 1, make sure the angle conversion works
         print(">>> ... angles")
         assert (cc_py_fast[:,3:] > 50).all()
+
+
+def test_dcd_file():
+    dir_lmp = tools.unpack_compressed('files/lammps/md-npt.tgz')
+    fn_lmp = pj(dir_lmp, 'lmp.out.dcd')
+    dir_cp2k = tools.unpack_compressed('files/cp2k/dcd/npt_dcd.tgz')
+    fn_cp2k = pj(dir_cp2k, 'PROJECT-pos-1.dcd')
+    for fn,convang,nstep,natoms in [(fn_lmp,True,101,16),
+                                    (fn_cp2k,False,16,57)]:
+        cc, co = dcd.read_dcd_data(fn, convang=convang)
+        dd = dcd.DcdFile(fn, convang=convang)
+        assert dd.nstep == len(dd) == nstep
+        assert dd.natoms == natoms
+        assert dd.coords.shape == (nstep,natoms,3)
+        assert dd.cryst_const.shape == (nstep,6)
+        tools.assert_array_equal(np.asarray(dd.coords), co)
+        tools.assert_array_equal(dd.cryst_const[:], cc)
+        for sl in [slice(2,11,3), slice(None,None,-4), [0,-1,3], -1, 5]:
+            tools.assert_array_equal(dd.coords[sl], co[sl])
+            tools.assert_array_equal(dd.cryst_const[sl], cc[sl])
+        tools.assert_array_equal(dd.coords[3,:,1], co[3,:,1])
+        tools.assert_array_equal(dd.coords[...,2], co[...,2])
+        cc2, co2 = dd.read(frames=slice(1,None,5))
+        tools.assert_array_equal(cc2, cc[1::5])
+        tools.assert_array_equal(co2, co[1::5])
+        # truncated last frame
+        fn_trunc = fn + '.trunc'
+        with open(fn, 'rb') as fdi, open(fn_trunc, 'wb') as fdo:
+            fdo.write(fdi.read()[:-20])
+        dd = dcd.DcdFile(fn_trunc, convang=convang)
+        assert dd.nstep == nstep - 1
+        tools.assert_array_equal(dd.coords[:], co[:-1])
+
+
+def test_write_dcd():
+    nstep, natoms = 30, 5
+    cell = np.array([[3,0,0], [1,3,0], [0.5,0.7,4.0]])
+    traj = crys.Trajectory(coords_frac=np.random.rand(nstep,natoms,3),
+                           cell=cell[None,...] + np.random.rand(nstep,3,3)*0.1,
+                           symbols=['H']*natoms,
+                           timestep=2.0)
+    fn = pj(testdir, 'test_write_dcd.dcd')
+    for convang in [False, True]:
+        io.write_dcd(fn, traj, convang=convang)
+        cc, co = dcd.read_dcd_data(fn, convang=convang)
+        assert np.allclose(cc, traj.cryst_const, rtol=0, atol=1e-10)
+        assert (co == traj.coords.astype(np.float32)).all()
+        hdr = dcd.read_dcd_header(fn)
+        ref = dict(hdr_lmp_ref)
+        ref['9int'] = array([nstep,0,1,nstep-1,0,0,0,0,0], dtype=int32)
+        ref['timestep'] = array([2.0], dtype=float32)[0]
+        ref['natoms'] = array([natoms], dtype=int32)[0]
+        tools.assert_dict_with_all_types_equal(ref, hdr,
+                                               keys=list(ref.keys()),
+                                               strict=True)
+    # streaming: append in chunks, start with a Structure
+    io.write_dcd(fn, traj[0], convang=True)
+    io.write_dcd(fn, traj[1:17], convang=True, append=True, chunksize=3)
+    io.write_dcd(fn, traj[17:], convang=True, append=True)
+    cc, co = dcd.read_dcd_data(fn, convang=True)
+    assert np.allclose(cc, traj.cryst_const, rtol=0, atol=1e-10)
+    assert (co == traj.coords.astype(np.float32)).all()
+    assert dcd.read_dcd_header(fn)['9int'][0] == nstep
+    # no cell, e.g. from read_xyz()
+    tr = crys.Trajectory(coords=traj.coords, symbols=traj.symbols)
+    assert tr.cryst_const is None
+    for func, args in [(io.write_dcd, (fn, tr)),
+                       (dcd.write_dcd_data, (fn, None, tr.coords))]:
+        try:
+            func(*args)
+            assert False, "no exception raised"
+        except ValueError as err:
+            assert 'cell' in str(err)
@@ -0,0 +1,36 @@
+import numpy as np
+from pwtools.signal import gauss, find_peaks, find_peaks_nd
+
+
+def test_find_peaks_nd():
+    x = np.linspace(0,10,300)
+    y = np.array([gauss(x-2,.1),
+                  np.zeros_like(x),
+                  gauss(x-3,0.1) + gauss(x-6,1),
+                  0.2*gauss(x-0.5,.1) + gauss(x-2,.1) + 0.7*gauss(x-3,0.1) +
+                  gauss(x-6,1)])
+    offsets, idx, pos, height = find_peaks_nd(y, x)
+    assert (offsets == [0,1,1,3,7]).all()
+    for jj in range(y.shape[0]):
+        sl = slice(offsets[jj], offsets[jj+1])
+        idx0, pos0 = find_peaks(y[jj,:], x)
+        assert (idx[sl] == idx0).all()
+        assert np.allclose(pos[sl], pos0)
+    assert np.allclose(pos[3:], [0.5,2,3,6], atol=1e-3)
+    assert np.allclose(height[3:], y[3,idx[3:]], atol=0.02)
+    # axis, per-spectrum ymin, no x
+    yy = np.random.rand(2,3,50)
+    ref = find_peaks_nd(yy, x=np.arange(50.0), axis=-1)
+    ret = find_peaks_nd(np.moveaxis(yy, -1, 1), x=np.arange(50.0), axis=1)
+    for aa, bb in zip(ref, ret):
+        assert np.allclose(aa, bb)
+    ymin = yy.mean(axis=-1)
+    offsets, idx, pos, height = find_peaks_nd(yy, ymin=ymin)
+    assert pos is None
+    assert (height >= np.repeat(ymin.flat, np.diff(offsets))).all()
+    assert len(idx) < len(ref[1])
+    # non-equidistant x: one spline per peak
+    xn = np.sort(np.random.rand(300))*10
+    offsets, idx, pos, height = find_peaks_nd(y[3:,:], xn)
+    assert (pos > xn[idx-1]).all() and (pos < xn[idx+1]).all()
+    assert (height >= y[3,idx] - 1e-8).all()
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+from pwtools import io, crys, common, frameindex
+from pwtools.test.testenv import testdir
+rand = np.random.rand
+
+
+def get_traj(nstep=20, natoms=5):
+    cell = np.eye(3)[None,...]*3 + rand(nstep,3,3)*0.1
+    return crys.Trajectory(coords_frac=rand(nstep,natoms,3),
+                           cell=cell,
+                           forces=rand(nstep,natoms,3),
+                           symbols=['Al']*2 + ['N']*(natoms-2))
+
+
+def test_find_offsets():
+    fn = os.path.join(testdir, 'test_find_offsets.txt')
+    txt = "head\n" + "a\nb\nc\n"*4
+    common.file_write(fn, txt)
+    ref = [5, 11, 17, 23, 29]
+    for chunksize in [1, 3, 2**24]:
+        offsets,size = frameindex.find_line_offsets(fn, period=3, nskip=1,
+                                                    chunksize=chunksize)
+        assert (offsets == ref).all()
+        assert size == len(txt)
+        offsets,size = frameindex.find_marker_offsets(fn, b'a',
+                                                      chunksize=chunksize)
+        assert (offsets == ref[:-1]).all()
+    # last line w/o newline is terminated by the end of the file
+    common.file_write(fn, txt[:-1])
+    for chunksize in [1, 3, 2**24]:
+        offsets,size = frameindex.find_line_offsets(fn, period=3, nskip=1,
+                                                    chunksize=chunksize)
+        assert (offsets == ref[:-1] + [len(txt)-1]).all()
+    # last frame with missing lines is incomplete
+    common.file_write(fn, txt[:-3])
+    offsets,size = frameindex.find_line_offsets(fn, period=3, nskip=1)
+    assert (offsets == ref[:-1]).all()
+
+
+def test_xyz():
+    tr = get_traj()
+    fn = os.path.join(testdir, 'test_frameindex.xyz')
+    io.write_xyz(fn, tr)
+    if os.path.exists(fn + '.idx'):
+        os.remove(fn + '.idx')
+    xyz = frameindex.XyzFile(fn)
+    assert os.path.exists(fn + '.idx')
+    assert xyz.nstep == tr.nstep
+    assert xyz.natoms == tr.natoms
+    assert xyz.symbols == tr.symbols
+    assert np.allclose(xyz.read(), tr.coords)
+    sl = slice(3,17,4)
+    trs = io.read_xyz(fn, frames=sl)
+    assert np.allclose(trs.coords, tr.coords[sl,...])
+    assert trs.symbols == tr.symbols
+    assert np.allclose(xyz[[-1,2]], tr.coords[[-1,2],...])
+    # index from sidecar file
+    xyz2 = frameindex.XyzFile(fn)
+    assert (xyz2.offsets == xyz.offsets).all()
+    # changed file -> outdated sidecar -> new index
+    tr2 = get_traj(nstep=7)
+    io.write_xyz(fn, tr2)
+    xyz3 = frameindex.XyzFile(fn)
+    assert xyz3.nstep == 7
+    assert np.allclose(xyz3.read(), tr2.coords)
+    # no newline at the end of the file
+    txt = common.file_read(fn)
+    common.file_write(fn, txt.rstrip('\n'))
+    xyz5 = frameindex.XyzFile(fn, use_index_file=False)
+    assert xyz5.nstep == 7
+    assert np.allclose(xyz5.read(), tr2.coords)
+    trs = io.read(fn)
+    assert trs.nstep == 7
+    assert np.allclose(trs.coords, tr2.coords)
+    # truncated last frame: last line missing, previous one cut
+    common.file_write(fn, txt[:txt[:-1].rfind('\n')-20])
+    xyz4 = frameindex.XyzFile(fn, use_index_file=False)
+    assert xyz4.nstep == 6
+    assert np.allclose(xyz4.read(), tr2.coords[:-1,...])
+
+
+def test_axsf():
+    tr = get_traj()
+    fn = os.path.join(testdir, 'test_frameindex.axsf')
+    io.write_axsf(fn, tr)
+    axsf = frameindex.AxsfFile(fn, use_index_file=False)
+    assert axsf.nstep == tr.nstep
+    assert axsf.natoms == tr.natoms
+    sl = slice(1,None,3)
+    trs = io.read_axsf(fn, frames=sl)
+    assert trs.symbols == tr.symbols
+    for name in ['coords', 'cell', 'forces']:
+        assert np.allclose(getattr(trs, name), getattr(tr, name)[sl,...])
+    # no forces
+    tr.forces = None
+    io.write_axsf(fn, tr)
+    dct = frameindex.AxsfFile(fn, use_index_file=False).read(frames=-1)
+    assert dct['forces'] is None
+    assert np.allclose(dct['coords'], tr.coords[-1:,...])
+    trs = io.read_axsf(fn, use_index_file=False)
+    assert trs.forces is None
+    assert np.allclose(trs.coords, tr.coords)
+    # no newline at the end of the file
+    txt = common.file_read(fn)
+    common.file_write(fn, txt.rstrip('\n'))
+    trs = io.read_axsf(fn, use_index_file=False)
+    assert trs.nstep == tr.nstep
+    assert np.allclose(trs.coords, tr.coords)
+    # truncated last frame: last line missing, previous one cut
+    common.file_write(fn, txt[:txt[:-1].rfind('\n')-20])
+    assert frameindex.AxsfFile(fn, use_index_file=False).nstep == tr.nstep - 1
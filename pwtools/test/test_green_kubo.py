@@ -0,0 +1,44 @@
+import numpy as np
+from scipy.signal import lfilter
+from pwtools import crys, constants
+
+
+def test_green_kubo_viscosity():
+    # Ornstein-Uhlenbeck stress components: <p(0)p(t)> = s2*exp(-t/tau),
+    # integral known
+    rng = np.random.RandomState(42)
+    nstep, dt, tau, s2 = 100000, 2.0, 50.0, 0.3
+    aa = np.exp(-dt/tau)
+    pp = lfilter([np.sqrt(s2*(1-aa**2))], [1,-aa], rng.randn(5,nstep), axis=1)
+    stress = np.empty((nstep,3,3))
+    stress[:,0,1] = stress[:,1,0] = pp[0]
+    stress[:,0,2] = stress[:,2,0] = pp[1]
+    stress[:,1,2] = stress[:,2,1] = pp[2]
+    # (xx-yy)/2 = pp[3], (yy-zz)/2 = pp[4]
+    stress[:,0,0] = 1.0
+    stress[:,1,1] = 1.0 - 2*pp[3]
+    stress[:,2,2] = 1.0 - 2*pp[3] - 2*pp[4]
+    cell = np.eye(3)*12.0
+    temp = 500.0
+    traj = crys.Trajectory(coords_frac=np.zeros((nstep,1,3)),
+                           cell=np.array([cell]*nstep),
+                           symbols=['Ar'], stress=stress, timestep=dt,
+                           temperature=np.ones(nstep)*temp)
+    integral = s2*dt*(1+aa)/(2*(1-aa))
+    ref = 12.0**3 * constants.Ang**3 * constants.GPa**2 * constants.fs * \
+        integral / (constants.kb * temp) * 1e3
+    eta, err, time, acf, eta_t, plateau = \
+        crys.green_kubo_viscosity(traj, full_out=True)
+    assert time.shape == acf.shape == eta_t.shape == (nstep,)
+    assert np.allclose(time[:3], [0, dt, 2*dt])
+    assert abs(acf[0] / s2 - 1) < 0.05
+    assert np.allclose(eta, eta_t[plateau].mean())
+    assert 0 < err < 0.2*ref
+    assert abs(eta - ref) < 3*err
+    eta5, err5 = crys.green_kubo_viscosity(traj, diagonal=True)
+    assert abs(eta5 - ref) < 0.1*ref
+    assert 0 < err5 < 0.2*ref
+    # eta ~ V/T
+    eta2, err2 = crys.green_kubo_viscosity(traj, volume=2*12.0**3,
+                                           temperature=2*temp)
+    assert np.allclose([eta2, err2], [eta, err])
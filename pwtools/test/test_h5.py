@@ -51,3 +51,91 @@ def test_h5():
 
     except ImportError:
         tools.skip("skipping test_h5, no h5py importable")
+
+
+def test_traj_h5():
+    try:
+        import h5py
+    except ImportError:
+        tools.skip("skipping test_traj_h5, no h5py importable")
+    from pwtools import crys
+    nstep = 100
+    natoms = 5
+    traj = crys.Trajectory(coords_frac=rand(nstep,natoms,3),
+                           cell=rand(nstep,3,3),
+                           symbols=['Al']*2 + ['N']*3,
+                           etot=rand(nstep),
+                           timestep=2.0)
+    h5fn = os.path.join(testdir, 'test_traj.h5')
+    io.write_traj_h5(h5fn, traj[:60], mode='w', compression='gzip',
+                     chunk_nstep=7)
+    io.write_traj_h5(h5fn, traj[60:], append=True)
+    with h5py.File(h5fn, 'r') as fh:
+        assert fh['coords'].chunks == (7,natoms,3)
+        assert fh['coords'].compression == 'gzip'
+    tr = io.read_traj_h5(h5fn)
+    assert isinstance(tr.coords, h5py.Dataset)
+    assert tr.nstep == nstep
+    assert tr.natoms == natoms
+    assert tr.symbols == traj.symbols
+    assert tr.nspecies == traj.nspecies
+    assert tr.timestep == traj.timestep
+    for name in ['coords', 'coords_frac', 'cell', 'etot', 'volume']:
+        assert np.allclose(getattr(tr, name)[()], getattr(traj, name))
+    win = tr[40:70:2]
+    assert isinstance(win.coords, np.ndarray)
+    assert np.allclose(win.coords, traj.coords[40:70:2])
+    assert win.timestep == 4.0
+    win = io.read_traj_h5(h5fn, frames=slice(40,70,2))
+    assert win.nstep == 15
+    assert np.allclose(win.cryst_const, traj.cryst_const[40:70:2])
+    assert win.timestep == 4.0
+    tr = io.read_traj_h5(h5fn, lazy=False)
+    for name in traj.attr_lst:
+        x1, x2 = getattr(traj, name), getattr(tr, name)
+        if isinstance(x1, np.ndarray):
+            assert np.allclose(x1, x2)
+        else:
+            assert x1 == x2, name
+    # several trajs in one file, append to non-existing group creates it
+    io.write_traj_h5(h5fn, traj, group='/run2', append=True)
+    assert io.read_traj_h5(h5fn, group='/run2').nstep == nstep
+    assert io.read_traj_h5(h5fn).nstep == nstep
+    # append to '/' which has the sub-group '/run2'
+    io.write_traj_h5(h5fn, traj[:10], append=True)
+    assert io.read_traj_h5(h5fn).nstep == nstep + 10
+    assert io.read_traj_h5(h5fn, group='/run2').nstep == nstep
+
+
+def test_open_h5():
+    try:
+        import h5py
+    except ImportError:
+        tools.skip("skipping test_open_h5, no h5py importable")
+    dct = {'/a/b/x1': rand(10,3),
+           'a/x2': 3.0,
+           '/c': np.arange(5),
+           }
+    h5fn = os.path.join(testdir, 'test_open_h5.h5')
+    io.write_h5(h5fn, dct, mode='w')
+    ref = io.read_h5(h5fn)
+    with io.open_h5(h5fn, cache=2) as lazy:
+        assert sorted(lazy.keys()) == sorted(ref.keys())
+        assert len(lazy) == 3
+        assert 'a/x2' in lazy and '/a/x2' in lazy
+        assert '/a' not in lazy
+        for key in ref.keys():
+            assert np.allclose(lazy[key], ref[key])
+        # LRU: last 2 accessed keys are kept
+        assert len(lazy._cache) == 2
+        lazy['/c']
+        assert list(lazy._cache.keys())[-1] == '/c'
+        assert np.allclose(lazy['/a/b/x1', 2:5, 1], ref['/a/b/x1'][2:5,1])
+        assert np.allclose(lazy['a/b/x1', 3], ref['/a/b/x1'][3])
+        assert isinstance(lazy.dataset('/c'), h5py.Dataset)
+        try:
+            lazy['/nonexistent']
+            assert False, "KeyError not raised"
+        except KeyError:
+            pass
+    assert not lazy.fh
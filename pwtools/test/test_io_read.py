@@ -0,0 +1,94 @@
+import os
+import numpy as np
+from pwtools import io, common, crys
+from pwtools.test import tools
+from pwtools.test.testenv import testdir
+
+
+def test_sniff():
+    for fn, fmt in [('files/pw.scf.out.gz', 'pw_scf'),
+                    ('files/pw.md.out.gz', 'pw_md'),
+                    ('files/pw.vc_relax.out.gz', 'pw_md'),
+                    ('files/cif_struct.cif', 'cif'),
+                    ('files/pdb_struct.pdb', 'pdb'),
+                    # test_cp2k.py gunzips this one
+                    (common.find_file('files/cp2k/scf/cp2k.scf.out.print_low'),
+                     'cp2k_scf'),
+                    ]:
+        assert io.sniff(fn) == (fmt, fn)
+    common.system('tar -C files/lammps -xzf files/lammps/md-npt.tgz')
+    common.system('tar -C files/lammps -xzf files/lammps/mix_output.tgz')
+    dr = 'files/lammps/md-npt'
+    # dcd and text dump present, prefer dcd
+    assert io.sniff(dr) == ('lammps_md_dcd', os.path.join(dr, 'log.lammps'))
+    assert io.sniff('files/lammps/mix_output')[0] == 'lammps_md_txt'
+    tr = io.read(dr)
+    ref = io.read_lammps_md_dcd(os.path.join(dr, 'log.lammps'))
+    assert np.allclose(tr.coords, ref.coords)
+    tr = io.read(os.path.join(dr, 'log.lammps'), fmt='lammps_md_txt')
+    assert np.allclose(tr.coords, ref.coords, atol=1e-5)
+    # kwds are passed to the reader
+    tr = io.read('files/pw.md.out.gz', attrs=['etot'])
+    assert tr.etot is not None
+    assert tr.coords is None
+    try:
+        io.sniff(os.path.join(dr, 'lmp.struct.symbols'))
+        assert False, "no exception raised"
+    except Exception as err:
+        assert 'cannot determine file format' in str(err)
+
+
+def test_sniff_scan_limit():
+    # pw.x markers far into the file (after a big first SCF cycle)
+    fn = os.path.join(testdir, 'test_sniff_scan_limit.out')
+    common.file_write(fn, 'Program PWSCF\n' + 'x'*(2**21) +
+                      '\nMolecular Dynamics Calculation\n')
+    assert io.sniff(fn)[0] == 'pw_md'
+    for chunksize in [7, 2**20, 2**24]:
+        assert io._file_contains(fn, 'Molecular Dynamics Calculation',
+                                 chunksize=chunksize)
+        assert not io._file_contains(fn, 'Ekin = ', chunksize=chunksize)
+        assert io._file_contains(fn, 'PWSCF', chunksize=chunksize)
+    # changed file -> new scan
+    common.file_write(fn, 'Program PWSCF\n' + 'x'*(2**21) + '\nEkin = 1.0\n')
+    assert io.sniff(fn)[0] == 'pw_vcmd'
+    common.file_write(fn, 'Program PWSCF\n' + 'x'*(2**21) + '\n')
+    assert io.sniff(fn)[0] == 'pw_scf'
+
+
+def test_sniff_h5():
+    try:
+        import h5py
+    except ImportError:
+        tools.skip("skipping test_sniff_h5, no h5py importable")
+    traj = crys.Trajectory(coords_frac=np.random.rand(10,2,3),
+                           cell=np.identity(3)*3,
+                           symbols=['H']*2)
+    fn = os.path.join(testdir, 'test_sniff_traj.h5')
+    io.write_traj_h5(fn, traj, mode='w')
+    assert io.sniff(fn) == ('traj_h5', fn)
+    # plain write_h5() dump is not a Trajectory
+    fn = os.path.join(testdir, 'test_sniff_plain.h5')
+    io.write_h5(fn, {'/a': np.ones(3)}, mode='w')
+    try:
+        io.sniff(fn)
+        assert False, "no exception raised"
+    except Exception as err:
+        assert 'cannot determine file format' in str(err)
+
+
+def test_register_reader():
+    fn = os.path.join(testdir, 'test_register_reader.foo')
+    common.file_write(fn, 'FOO-MD\n1.0 2.0 3.0\n')
+    def read_foo(filename):
+        return crys.Structure(coords=np.loadtxt(filename, skiprows=1)[None,:],
+                              cell=np.identity(3),
+                              symbols=['H'])
+    io.register_reader('foo', read_foo,
+                       lambda filename, head: head.startswith('FOO-MD'))
+    try:
+        assert io.sniff(fn) == ('foo', fn)
+        st = io.read(fn)
+        assert np.allclose(st.coords, [[1,2,3]])
+    finally:
+        io.READERS.pop('foo')
@@ -90,3 +90,42 @@ def test_traj_from_txt():
                   arr3d.shape, written_shape, arr3d_orig.shape))
     assert (arr3d == arr3d_orig).all()
 
+
+
+def test_readtxt_chunks_npy():
+    shape = (11, 4, 3)
+    arr = rand(*shape)
+    for axis in [0, 1, 2]:
+        fn = pj(testdir, 'a3d_chunks_axis%i.txt' %axis)
+        arrayio.writetxt(fn, arr, axis=axis)
+        # fast path and np.loadtxt() path
+        assert (arrayio.readtxt(fn) == arr).all()
+        assert (arrayio.readtxt(fn, comments='#') == arr).all()
+        chunks = list(arrayio.iter_readtxt(fn, nblocks=3))
+        assert [x.shape[axis] for x in chunks] == \
+            [3]*(shape[axis] // 3) + ([shape[axis] % 3] if shape[axis] % 3 else [])
+        assert (np.concatenate(chunks, axis=axis) == arr).all()
+        if os.path.exists(fn + '.npy'):
+            os.remove(fn + '.npy')
+        a1 = arrayio.readtxt(fn, use_npy=True)
+        assert isinstance(a1, np.memmap)
+        assert os.path.exists(fn + '.npy')
+        a2 = arrayio.readtxt(fn, use_npy=True)
+        assert isinstance(a2, np.memmap)
+        assert (a2 == arr).all()
+        assert (a2[2:5,...] == arr[2:5,...]).all()
+
+    # comment lines in data -> np.loadtxt()
+    fn = pj(testdir, 'a2d_comments.txt')
+    # > HEADER_MAXLINES, else the comment is taken as header
+    arr = rand(30,3)
+    arrayio.writetxt(fn, arr)
+    with open(fn, 'a') as fd:
+        fd.write('# trailing comment\n')
+    assert (arrayio.readtxt(fn) == arr).all()
+    # 1 column / 1 row, squeezed like np.loadtxt()
+    for arr in [rand(5,1), rand(1,5)]:
+        fn = pj(testdir, 'a2d_squeeze.txt')
+        arrayio.writetxt(fn, arr)
+        assert (arrayio.readtxt(fn) == np.loadtxt(fn)).all()
+        assert arrayio.readtxt(fn).shape == np.loadtxt(fn).shape
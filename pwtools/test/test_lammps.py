@@ -1,6 +1,6 @@
 import os, tempfile
 import numpy as np
-from pwtools import io, common, crys, parse
+from pwtools import io, common, crys, parse, lammps
 from pwtools.test import tools
 from pwtools.test.testenv import testdir
 rand = np.random.rand
@@ -79,8 +79,9 @@ def test_mix_output():
     # "Step..." and "Loop..." from each command.
     #
     # In this test, we have 3 commands (minimize, run (short MD), minimize),
-    # which are all set to perform 10 steps, so we have 30 in total. Due to
-    # redundant printing by lammps, the result arrays are a bit longer.
+    # which are all set to perform 10 steps, so we have 30 in total. Lammps
+    # prints the last step of each command again as first step of the next
+    # one, which we skip.
     tgz = 'files/lammps/mix_output.tgz'
     tgz_path = os.path.dirname(tgz)
     unpack_path = tgz.replace('.tgz','')
@@ -88,5 +89,109 @@ def test_mix_output():
     tr = io.read_lammps_md_txt("{0}/log.lammps".format(unpack_path))
     assert tr.nstep == 31
     assert tr.coords.shape == (31,4,3)
-    assert tr.stress.shape == (33,3,3)
-    assert tr.temperature.shape == (33,)
+    assert tr.stress.shape == (31,3,3)
+    assert tr.temperature.shape == (31,)
+
+def _dump_frame_str(step, ids, arr, box, cols='id type xu yu zu'):
+    txt = "ITEM: TIMESTEP\n%i\nITEM: NUMBER OF ATOMS\n%i\n" %(step, len(ids))
+    txt += "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+    txt += '\n'.join(' '.join('%g' %x for x in row) for row in box) + '\n'
+    txt += "ITEM: ATOMS %s \n" %cols
+    for idx,row in zip(ids, arr):
+        txt += "%i 1 %s \n" %(idx, ' '.join('%.10e' %x for x in row))
+    return txt
+
+def test_dump_file():
+    tgz = 'files/lammps/md-npt.tgz'
+    tgz_path = os.path.dirname(tgz)
+    unpack_path = tgz.replace('.tgz','')
+    common.system("tar -C {0} -xzf {1}".format(tgz_path,tgz))
+    fn = "{0}/lmp.out.dump".format(unpack_path)
+    pp = parse.LammpsTextMDOutputFile("{0}/log.lammps".format(unpack_path))
+    coords = pp.get_coords()
+    # frame index must not depend on the read chunk size
+    for chunksize in [7, 100, 2**24]:
+        dump = lammps.DumpFile(fn, chunksize=chunksize,
+                                use_index_file=False)
+        assert dump.nstep == 101
+        assert (dump.natoms == 16).all()
+        assert (dump.timestep == np.arange(101)).all()
+        assert dump.columns[:5] == ['id', 'type', 'xu', 'yu', 'zu']
+        assert np.allclose(dump.read(cols=['xu','yu','zu']), coords)
+    sl = slice(10,90,7)
+    assert np.allclose(dump.read(cols=['xu','yu','zu'], frames=sl),
+                       coords[sl,...])
+    assert np.allclose(dump.read(cols=['zu','xu'], frames=5),
+                       coords[5,:,[2,0]].T[None,...])
+    for arr,ref in zip(dump.iterframes(cols=['xu','yu','zu'], frames=[3,1]),
+                       coords[[3,1],...]):
+        assert np.allclose(arr, ref)
+
+def test_dump_file_sort_natoms_truncated():
+    box = np.array([[0,5,0],[0,5,0],[0,5,0.]])
+    c0 = rand(4,3)
+    c1 = rand(3,3)
+    txt = _dump_frame_str(0, [3,1,4,2], c0, box)
+    # atom 2 is missing in the 2nd frame
+    txt += _dump_frame_str(10, [4,1,3], c1, box)
+    # truncated last frame from a crashed run
+    txt += _dump_frame_str(20, [1,2,3,4], c0, box)[:-60]
+    fn = os.path.join(testdir, 'test_dump_file.dump')
+    common.file_write(fn, txt)
+    dump = lammps.DumpFile(fn)
+    assert dump.nstep == 2
+    assert (dump.natoms == [4,3]).all()
+    arr = dump.read(cols=['xu','yu','zu'])
+    assert arr.shape == (2,4,3)
+    assert np.allclose(arr[0,[2,0,3,1],:], c0)
+    assert np.allclose(arr[1,[3,0,2],:], c1)
+    assert np.isnan(arr[1,1,:]).all()
+    arr = dump.read(cols=['id','xu'], frames=0)
+    assert (arr[0,:,0] == [1,2,3,4]).all()
+    arr = dump.read(cols=['id'], frames=0, sort=False)
+    assert (arr[0,:,0] == [3,1,4,2]).all()
+    # complete last frame w/o newline at the end of the file
+    txt = _dump_frame_str(0, [3,1,4,2], c0, box) + \
+          _dump_frame_str(10, [4,1,3], c1, box)
+    common.file_write(fn, txt.rstrip())
+    dump = lammps.DumpFile(fn, use_index_file=False)
+    assert dump.nstep == 2
+    arr = dump.read(cols=['xu','yu','zu'])
+    assert np.allclose(arr[0,[2,0,3,1],:], c0)
+    assert np.allclose(arr[1,[3,0,2],:], c1)
+
+def test_log_thermo():
+    # two runs with different thermo_style, new-style indented header in the
+    # 2nd, a warning inside a block, duplicate step 2, truncated last run
+    txt = """LAMMPS (29 Oct 2020)
+thermo_style custom step temp pe
+run 2
+Step Temp PotEng
+       0          300   -10.5
+       1          290   -10.4
+       2          280   -10.3
+Loop time of 0.1 on 1 procs for 2 steps with 4 atoms
+
+thermo_style custom step pe temp vol
+run 3
+   Step         PotEng          Temp          Volume
+         2   -10.3          285             40.0
+WARNING: something (src/foo.cpp:42)
+         3   -10.2          270             40.1
+
+         4   -10.1          260             40.2
+         5   -10.0"""
+    fn = os.path.join(testdir, 'test_log_thermo.lammps')
+    common.file_write(fn, txt)
+    for chunksize in [7, 50, 2**24]:
+        blocks = list(lammps.iter_log_thermo_blocks(fn, chunksize=chunksize))
+        assert [hdr for hdr,arr in blocks] == [['Step', 'Temp', 'PotEng'],
+            ['Step', 'PotEng', 'Temp', 'Volume']]
+        assert [arr.shape for hdr,arr in blocks] == [(3,3), (3,4)]
+        dct = lammps.read_log_thermo(fn, chunksize=chunksize)
+        assert sorted(dct.keys()) == ['PotEng', 'Step', 'Temp']
+        assert (dct['Step'] == [0,1,2,3,4]).all()
+        assert np.allclose(dct['Temp'], [300,290,280,270,260])
+        assert np.allclose(dct['PotEng'], [-10.5,-10.4,-10.3,-10.2,-10.1])
+    common.file_write(fn, 'no thermo here\n')
+    assert lammps.read_log_thermo(fn) is None
@@ -1,6 +1,8 @@
+import os
 import numpy as np
 from pwtools.parse import PDBFile
-from pwtools import common
+from pwtools import common, io
+from pwtools.test.testenv import testdir
 
 def test_pdb():
     struct = PDBFile('files/pdb_struct.pdb',
@@ -25,3 +27,35 @@ def test_pdb():
     cryst_const = np.array([10.678, 10.678,10.678,90.00,90.00, 90.00])
     assert np.allclose(coords, struct.coords)
     assert np.allclose(cryst_const, struct.cryst_const)
+
+
+def test_pdb_models():
+    lines = common.file_read('files/pdb_struct.pdb').splitlines()
+    atoms = [x for x in lines if x.startswith(('ATOM', 'HETATM'))]
+    ref = PDBFile('files/pdb_struct.pdb').get_struct()
+    nstep = 4
+    coords = np.random.rand(nstep, len(atoms), 3) * 200 - 100
+    # 2nd CRYST1 valid for models 3 and 4
+    txt = lines[:3]
+    for istep in range(nstep):
+        if istep == 2:
+            txt.append(lines[2].replace('10.678', '11.000'))
+        txt.append('MODEL     %4i' %(istep+1))
+        txt += [x[:30] + '%8.3f%8.3f%8.3f' %tuple(coords[istep,ii]) + x[54:]
+                for ii,x in enumerate(atoms)]
+        txt.append('ENDMDL')
+    txt.append('END')
+    fn = os.path.join(testdir, 'test_pdb_models.pdb')
+    common.file_write(fn, '\n'.join(txt) + '\n')
+    tr = io.read_pdb_traj(fn)
+    assert tr.nstep == nstep
+    assert tr.symbols == ref.symbols
+    assert np.allclose(tr.coords, coords, atol=1e-3, rtol=0)
+    assert np.allclose(tr.cryst_const[:,0], [10.678, 10.678, 11, 11])
+    lst = list(io.iter_pdb(fn))
+    assert len(lst) == nstep
+    assert np.allclose(lst[-1].coords, tr.coords[-1,...])
+    # no MODEL records
+    st, = io.iter_pdb('files/pdb_struct.pdb')
+    assert np.allclose(st.coords, ref.coords)
+    assert np.allclose(st.cryst_const, ref.cryst_const)
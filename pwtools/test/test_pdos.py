@@ -1,8 +1,8 @@
 import numpy as np
 import os, tempfile
-from pwtools import parse, common, constants, common
+from pwtools import parse, common, constants, num
 from pwtools import pydos as pd
-from pwtools.signal import pad_zeros, welch, mirror, acorr
+from pwtools.signal import pad_zeros, welch, mirror, acorr, fast_len
 from scipy.signal import correlate
 from scipy.fftpack import fft,ifft
 from pwtools.test.tools import aae
@@ -63,6 +63,17 @@ def test_pdos():
     # If `tonext` is used, full fft array lengths must be a power of two.
     assert len(ffd) >= 2*V.shape[timeaxis] - 1
     assert np.log2(len(ffd)) % 1.0 == 0.0
+    # full spectrum from the one-sided one (real FFT)
+    vv = pad_zeros(V*welch(V.shape[timeaxis])[:,None,None], nadd=len(ffd) -
+                   V.shape[timeaxis])
+    ref = (np.abs(fft(vv, axis=0))**2.0 * mass[None,:,None]).sum(axis=(1,2))
+    assert np.allclose(fdd.squeeze(), ref)
+    # 'fast': shorter, same resolution as 'tonext' would give w/ fast_len
+    fd2, dd2, ffd2, fdd2, si2 = pd.direct_pdos(V, m=mass, dt=dt, npad=1,
+                                               tonext='fast', full_out=True)
+    assert 2*V.shape[timeaxis] - 1 <= len(ffd2) <= len(ffd)
+    assert len(ffd2) == fast_len(2*V.shape[timeaxis] - 1)
+    assert len(fd2) == len(dd2) == si2
 
 
 def test_pdos_1d():
@@ -89,3 +100,137 @@ def test_pdos_1d():
     p2=(abs(fft(mirror(acorr(v*w,norm=False)))))[:n]
     assert np.allclose(p1, p2)
 
+
+
+def test_pdos_projected():
+    nstep, natoms = 201, 8
+    vel = rand(nstep, natoms, 3)
+    mass = rand(natoms) + 1.0
+    symbols = ['N']*3 + ['Al']*5
+    for kwds in [dict(npad=1), dict(npad=None), dict(npad=1, tonext=True)]:
+        ff, dd = pd.pdos(vel, dt=2.0, m=mass, method='direct', **kwds)
+        arr = pd.pdos_projected(vel, symbols, dt=2.0, m=mass,
+                                groups=[[0,1], np.arange(natoms) >= 6],
+                                directions=True, chunksize=3, **kwds)
+        assert arr.shape == (len(ff), 9)
+        assert np.allclose(arr[:,0], ff)
+        assert np.allclose(arr[:,1], dd)
+        # species (Al, N) and x,y,z add up to the total
+        assert np.allclose(arr[:,2] + arr[:,3], dd)
+        assert np.allclose(arr[:,6:].sum(axis=1), dd)
+        # all projections have the same scaling: sum of unnormalized power
+        # spectra
+        ref = lambda sl: pd.pdos(vel[:,sl,:], dt=2.0, m=mass[sl],
+                                 method='direct', full_out=True, **kwds)[3]
+        fac = dd.sum() / ref(slice(None))[:len(ff)].sum()
+        for col, sl in [(2, slice(3,None)), (3, slice(0,3)),
+                        (4, slice(0,2)), (5, slice(6,None))]:
+            assert np.allclose(arr[:,col], ref(sl)[:len(ff)] * fac)
+    # only total
+    arr = pd.pdos_projected(vel, dt=2.0)
+    assert arr.shape[1] == 2
+    assert np.allclose(arr[:,1], pd.direct_pdos(vel, dt=2.0)[1])
+
+
+def test_pdos_welch():
+    nstep, natoms = 1000, 4
+    vel = rand(nstep, natoms, 3)
+    mass = rand(natoms) + 1.0
+    # one segment = whole signal -> pdos()
+    ff, dd = pd.pdos(vel, dt=2.0, m=mass, method='direct', npad=None)
+    fw, dw = pd.pdos_welch(vel, nperseg=nstep, dt=2.0, m=mass)
+    assert np.allclose(ff, fw)
+    assert np.allclose(dd, dw)
+    # average over segments by hand
+    nperseg, noverlap = 200, 50
+    pw = 0.0
+    starts = range(0, nstep-nperseg+1, nperseg-noverlap)
+    for start in starts:
+        pw = pw + pd.pdos(vel[start:start+nperseg,...], m=mass,
+                          method='direct', npad=None, full_out=True)[3]
+    ref_f = np.fft.fftfreq(nperseg, 2.0)[:nperseg//2]
+    ref_d = num.norm_int(pw[:nperseg//2], ref_f)
+    # array, generator of chunks of any length
+    chunks = lambda: (vel[ii:ii+77,...] for ii in range(0, nstep, 77))
+    for arg, kwds in [(vel, {}), (vel, dict(chunksize=13)), (chunks(), {})]:
+        fw, dw = pd.pdos_welch(arg, nperseg=nperseg, noverlap=noverlap,
+                               dt=2.0, m=mass, **kwds)
+        assert np.allclose(fw, ref_f)
+        assert np.allclose(dw, ref_d)
+    wp = pd.WelchPDOS(nperseg=nperseg, noverlap=noverlap, dt=2.0, m=mass)
+    for chunk in chunks():
+        wp.update(chunk)
+    assert wp.nsegments == len(starts)
+    assert np.allclose(wp.get()[1], ref_d)
+    # zero-padded segments
+    fw, dw = pd.pdos_welch(vel, nperseg=100, nfft=256, window=False)
+    assert len(fw) == 128
+
+
+def test_pdos_multitaper():
+    from scipy.signal import windows
+    nstep, natoms = 300, 5
+    vel = rand(nstep, natoms, 3)
+    mass = rand(natoms) + 1.0
+    tapers = windows.dpss(nstep, 3, 5)
+    # by hand: average of direct spectra, one per taper
+    pw = 0.0
+    for taper in tapers:
+        pw = pw + pd.pdos(vel*taper[:,None,None], m=mass, window=False,
+                          npad=1, method='direct', full_out=True)[3]
+    ff = np.fft.fftfreq(2*nstep-1, 2.0)[:nstep-1]
+    ref = num.norm_int(pw[:nstep-1], ff)
+    fm, dm, lo, hi = pd.pdos(vel, dt=2.0, m=mass, npad=1, method='multitaper',
+                             nw=3, ntapers=5, full_out=True)
+    assert np.allclose(fm, ff)
+    assert np.allclose(dm, ref)
+    assert (lo < dm).all() and (dm < hi).all()
+    # wider interval for higher level
+    _, _, lo2, hi2 = pd.pdos(vel, dt=2.0, m=mass, npad=1, method='multitaper',
+                             nw=3, ntapers=5, full_out=True, ci=0.99)
+    assert (lo2 < lo).all() and (hi2 > hi).all()
+    # atom chunks
+    assert np.allclose(pd.multitaper_power(vel, m=mass, chunksize=2),
+                       pd.multitaper_power(vel, m=mass))
+
+
+def test_pdos_spectrogram():
+    nstep, natoms = 1000, 3
+    vel = rand(nstep, natoms, 3)
+    mass = rand(natoms) + 1.0
+    window, hop = 128, 50
+    nseg = (nstep - window)//hop + 1
+    tt, ff, sg = pd.pdos_spectrogram(vel, dt=2.0, window=window, hop=hop,
+                                     m=mass)
+    assert sg.shape == (nseg, window//2)
+    assert np.allclose(tt, (np.arange(nseg)*hop + 0.5*(window-1))*2.0)
+    for ii in [0, 7, nseg-1]:
+        fr, dr = pd.pdos(vel[ii*hop:ii*hop+window,...], dt=2.0, m=mass,
+                         method='direct', npad=None)
+        assert np.allclose(ff, fr)
+        assert np.allclose(sg[ii,:], dr)
+    # chunked array, generator of chunks
+    chunks = (vel[ii:ii+77,...] for ii in range(0, nstep, 77))
+    for arg, kwds in [(vel, dict(chunksize=13)), (chunks, {})]:
+        assert np.allclose(pd.pdos_spectrogram(arg, dt=2.0, window=window,
+                                               hop=hop, m=mass, **kwds)[2],
+                           sg)
+    # frequency increases with time
+    t = np.arange(4000)
+    vel = np.sin(2*np.pi*(0.05 + 0.1*t/4000.0)*t)[:,None,None] * \
+          np.ones((1,2,3))
+    tt, ff, sg = pd.pdos_spectrogram(vel, window=256, area=None)
+    fmax = ff[sg.argmax(axis=1)]
+    assert (np.diff(fmax) >= 0).all()
+    assert fmax[-1] > fmax[0] + 0.15
+    # hop > window: chunking must not change the segment positions
+    vel = np.random.rand(1000,2,3)
+    ref = pd.pdos_spectrogram(vel, window=64, hop=100, chunksize=1000)
+    assert ref[2].shape[0] == 10
+    for chunksize in [30, 80, 150]:
+        ret = pd.pdos_spectrogram(vel, window=64, hop=100, chunksize=chunksize)
+        for aa, bb in zip(ret, ref):
+            assert np.allclose(aa, bb)
+    tt, ff, sg = pd.pdos_spectrogram(iter([]), window=64)
+    assert sg.shape == (0, 32)
+    assert len(tt) == 0
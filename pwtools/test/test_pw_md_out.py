@@ -1,7 +1,7 @@
 import numpy as np
 import tempfile, os
 from pwtools.parse import PwMDOutputFile
-from pwtools import common
+from pwtools import common, io
 from pwtools.constants import Bohr, Ang
 from pwtools.test.tools import assert_attrs_not_none, adae
 from pwtools.test import tools
@@ -37,3 +37,24 @@ def test_pw_md_out():
 
     pp3 = PwMDOutputFile(filename=filename)
     assert alat == pp3.get_alat() # self.use_alat=True default
+
+
+def test_pw_md_out_attrs():
+    filename = tools.unpack_compressed('files/pw.md.out.gz', prefix=__file__)
+    ref = io.read_pw_md(filename)
+    tr = io.read_pw_md(filename, attrs=['etot', 'stress'])
+    assert np.allclose(tr.etot, ref.etot)
+    assert np.allclose(tr.stress, ref.stress)
+    for name in ['coords', 'forces', 'cell', 'ekin', 'temperature']:
+        assert getattr(tr, name) is None
+    # volume is calculated by the Trajectory from cell -> parse cell
+    tr = io.read_pw_md(filename, attrs=['volume'])
+    assert np.allclose(tr.volume, ref.volume)
+    assert tr.forces is None
+    pp = PwMDOutputFile(filename=filename)
+    assert '_etot_raw' in pp.get_attr_deps('etot')
+    assert pp.resolve_attr_deps(['etot']) == ['etot', '_etot_raw']
+    pp.parse(attr_lst=['etot'])
+    assert not pp.parse_called
+    assert pp.is_set_attr('etot')
+    assert not pp.is_set_attr('forces')
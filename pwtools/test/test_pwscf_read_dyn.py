@@ -1,6 +1,8 @@
+import os, shutil, tempfile
 import numpy as np
-from pwtools import pwscf, parse, kpath
+from pwtools import pwscf, parse, kpath, common
 from pwtools.test.tools import aae, aaae, unpack_compressed
+from pwtools.test.testenv import testdir
 
 # matdyn.freq
 kpoints_ref = \
@@ -65,6 +67,30 @@ def test_read_matdyn():
     aae(vecs.real, vecs_real_ref)
     aaae(vecs.imag, vecs_imag_ref)
 
+    # natoms from file, q-point subset
+    for idx in [1, [1], slice(1,None)]:
+        qpoints, freqs, vecs = pwscf.read_matdyn_modes('files/matdyn.modes',
+                                                       qpoints_idx=idx)
+        aae(qpoints, qpoints_ref[1:,:])
+        aae(freqs, freqs_modes_ref[1:,:])
+        aae(vecs.real, vecs_real_ref[1:,...])
+        aaae(vecs.imag, vecs_imag_ref[1:,...])
+
+    # no q-points: empty file, other text, empty selection
+    for txt in ['', 'diagonalizing the dynamical matrix ...\n']:
+        fn = os.path.join(testdir, 'test_read_matdyn_empty.modes')
+        common.file_write(fn, txt)
+        try:
+            pwscf.read_matdyn_modes(fn)
+            assert False, "no exception raised"
+        except ValueError as err:
+            assert 'no q-points' in str(err)
+    try:
+        pwscf.read_matdyn_modes('files/matdyn.modes', qpoints_idx=slice(5,6))
+        assert False, "no exception raised"
+    except ValueError as err:
+        assert 'selects no q-points' in str(err)
+
 def test_read_all_dyn():
     # matdyn modes: read_all_dyn()
     qpoints, freqs, vecs = pwscf.read_all_dyn('files/dyn/', nqpoints=2,
@@ -75,6 +101,34 @@ def test_read_all_dyn():
     aaae(vecs.imag, vecs_imag_ref)
 
 
+def test_read_all_dyn_parallel_cache():
+    dr = tempfile.mkdtemp(dir=testdir, prefix=__file__)
+    for name in ['ph.dyn1', 'ph.dyn2']:
+        shutil.copy(os.path.join('files/dyn', name), dr)
+    for kwds in [dict(nthreads=2), dict(nprocs=2), dict(cache=True),
+                 dict(cache=True)]:
+        qpoints, freqs, vecs = pwscf.read_all_dyn(dr, **kwds)
+        aae(qpoints, qpoints_ref)
+        aae(freqs, freqs_modes_ref)
+        aae(vecs.real, vecs_real_ref)
+        aaae(vecs.imag, vecs_imag_ref)
+    assert os.path.exists(os.path.join(dr, 'ph.dyn.npz'))
+    # cache is stale after a file changed, re-parse
+    txt = common.file_read(os.path.join(dr, 'ph.dyn2'))
+    common.file_write(os.path.join(dr, 'ph.dyn2'),
+                      txt.replace('0.500000', '0.250000') + '\n')
+    qpoints, freqs, vecs = pwscf.read_all_dyn(dr, cache=True)
+    aae(qpoints[1,:], np.array([0, 0, 0.25]))
+    aae(freqs, freqs_modes_ref)
+    # wrong base: error, no empty cache file
+    try:
+        pwscf.read_all_dyn(dr, base='ph.dn', cache=True)
+        assert False, "no exception raised"
+    except ValueError as err:
+        assert 'no files' in str(err)
+    assert not os.path.exists(os.path.join(dr, 'ph.dn.npz'))
+
+
 def test_read_dynmat():
     table_txt = """
 # mode   [cm-1]    [THz]      IR          Raman   depol.fact
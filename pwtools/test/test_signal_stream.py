@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.signal.windows import gaussian, hann
+from pwtools.signal import smooth, StreamingSmoother, FIRFilter
+
+
+def split(arr, nchunk, axis=0):
+    idx = np.arange(nchunk, arr.shape[axis], nchunk)
+    return np.split(arr, idx, axis=axis)
+
+
+def test_streaming_smoother():
+    for N in [1, 5, 11, 12, 100]:
+        for M in [1, 2, 11, 12]:
+            kern = gaussian(M, max(M/4.0, 1))[:,None,None]
+            x = np.random.rand(N,2,3)
+            for edge in ['m', 'c']:
+                ref = smooth(x, kern, edge=edge)
+                sm = StreamingSmoother(kern, edge=edge)
+                for nchunk in [1, 7, 1000]:
+                    ret = np.concatenate(list(sm.stream(split(x, nchunk))),
+                                         axis=0)
+                    assert np.allclose(ret, ref)
+    # axis=1, update() + finish()
+    x = np.random.rand(3,200)
+    kern = hann(21)[None,:]
+    sm = StreamingSmoother(kern, axis=1)
+    rets = [sm.update(xx) for xx in split(x, 13, axis=1)]
+    assert rets[0].shape == (3,0)
+    rets.append(sm.finish())
+    assert np.allclose(np.concatenate(rets, axis=1), smooth(x, kern, axis=1))
+
+
+def test_fir_filter_stream():
+    f = FIRFilter(cutoff=10, nyq=50, ntaps=101)
+    x = np.random.rand(3,1000)
+    for nchunk in [1, 37, 2000]:
+        rets = list(f.stream(split(x, nchunk, axis=1)))
+        assert rets[0].shape == (3, min(nchunk, 1000))
+        assert np.allclose(np.concatenate(rets, axis=1), f(x))
+    rets = list(f.stream(split(x.T, 50), axis=0))
+    assert np.allclose(np.concatenate(rets, axis=0), f(x.T, axis=0))
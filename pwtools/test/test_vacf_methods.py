@@ -49,3 +49,12 @@ def test_vacf_methods():
     assrt(p2m,  f2m)
     assrt(p3m,  f2m)
 
+    f3 = pydos.fvacf(a, method=3)
+    f3m = pydos.fvacf(a, method=3, m=m)
+    assrt(p1, f3)
+    assrt(p1m, f3m)
+    # atom chunks
+    assrt(p1m, pydos.fftvacf(a, m=m, chunksize=3))
+    c = pydos.fftvacf(a, m=m, norm=False)
+    assrt(c / c[0], p1m)
+    assrt(c[1], (a[:-1,...] * a[1:,...] * m[None,:,None]).sum())
@@ -161,3 +161,41 @@ def test_write_mol():
     arr2 = coords2d_cart
     np.testing.assert_array_almost_equal(arr, arr2)
 
+
+
+def test_write_mol_bulk():
+    # Chunked bulk writers produce the same text as the old per-frame loops
+    # using pwscf.atpos_str_fast() and common.str_arr().
+    from pwtools import pwscf
+    nstep = 11
+    natoms = 3
+    traj = Trajectory(coords=np.random.rand(nstep,natoms,3),
+                      cell=np.random.rand(nstep,3,3),
+                      symbols=['H','Al','N'],
+                      forces=np.random.rand(nstep,natoms,3))
+    traj.cell[:,0,1] = 1e-20
+    ref_xyz = ''
+    for istep in range(nstep):
+        ref_xyz += "%i\n%s\n%s" %(natoms, 'foo.%i' %(istep + 1),
+                                  pwscf.atpos_str_fast(traj.symbols,
+                                                       traj.coords[istep,...]))
+    ccf = np.concatenate((traj.coords, traj.forces*eV/Ha), axis=-1)
+    ref_axsf = "ANIMSTEPS %i\nCRYSTAL" %nstep
+    for istep in range(nstep):
+        ref_axsf += "\nPRIMVEC %i\n%s" %(istep+1,
+                                         common.str_arr(traj.cell[istep,...]))
+        ref_axsf += "\nPRIMCOORD %i\n%i 1\n%s" %(istep+1, natoms,
+            pwscf.atpos_str_fast(traj.symbols, ccf[istep,...]))
+    chunksize = io.WRITE_CHUNKSIZE
+    try:
+        # 11 steps in chunks of 2 frames
+        io.WRITE_CHUNKSIZE = 2*natoms*6
+        for write, ref in [(io.write_xyz, ref_xyz), (io.write_axsf, ref_axsf)]:
+            fn = pj(testdir, 'test_write_mol_bulk')
+            if write is io.write_xyz:
+                write(fn, traj, name='foo')
+            else:
+                write(fn, traj)
+            assert common.file_read(fn) == ref
+    finally:
+        io.WRITE_CHUNKSIZE = chunksize